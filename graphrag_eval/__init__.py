@@ -1,2 +1,5 @@
 from .aggregation import compute_aggregates
-from .evaluation import run_evaluation
+from .evaluation import iter_evaluation, run_evaluation
+from .sharding import merge_shard_results
+from .steps.references import CompiledReferences, compile_references
+from .steps.result_digest import compute_result_digest
@@ -97,7 +97,12 @@ def update_steps_summary(
         if name not in seen:
             seen.add(name)
             template_steps_summary["once_per_sample"][name] += 1
-        if step["status"] != "error":
+        if step["status"] != "error" and "output" not in step \
+            and "output_digest" in step:
+            digest = step["output_digest"]
+            if digest.get("boolean") is None and not digest.get("num_rows"):
+                template_steps_summary["empty_results"][name] += 1
+        elif step["status"] != "error":
             try:
                 res = json.loads(step["output"])
                 if isinstance(res, dict) and "results" in res and "bindings" in res["results"]:
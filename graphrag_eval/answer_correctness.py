@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 
 from graphrag_eval.util import compute_f1
 from .evaluator import Evaluator
+from .llm_cache import ResponseCache, cached_generate
 
 if TYPE_CHECKING:
     from ragas.llms.base import InstructorBaseRagasLLM
@@ -36,27 +37,36 @@ class InvalidPromptException(Exception):
 
 
 class AnswerCorrectnessEvaluator:
+    name = "answer_correctness"
+
     def __init__(
         self,
         ragas_llm: InstructorBaseRagasLLM,
         config: AnswerCorrectnessConfig | None = None,
+        response_cache: ResponseCache | None = None,
     ):
         self.config = config or AnswerCorrectnessConfig()
         self.__validate_prompt_template(self.config.prompt)
         self.prompt_template = self.config.prompt
         self.ragas_llm = ragas_llm
+        self.response_cache = response_cache
 
     @classmethod
     def from_config(
         cls,
         ragas_llm: InstructorBaseRagasLLM | None,
-        config: AnswerCorrectnessConfig | None
+        config: AnswerCorrectnessConfig | None,
+        response_cache: ResponseCache | None = None,
     ) -> Self | None:
         if ragas_llm is None:
             return None
         if config is None or not config.enabled:
             return None
-        return cls(ragas_llm=ragas_llm, config=config)
+        return cls(
+            ragas_llm=ragas_llm,
+            config=config,
+            response_cache=response_cache,
+        )
 
     @staticmethod
     def __validate_prompt_template(prompt_template: str):
@@ -95,7 +105,9 @@ class AnswerCorrectnessEvaluator:
             reference_answer=reference_answer,
             actual_answer=actual_answer,
         )
-        response_str = await self._agenerate(prompt)
+        response_str = await cached_generate(
+            self.response_cache, prompt, self._agenerate
+        )
         return self.extract_response_values(response_str)
 
     async def evaluate(
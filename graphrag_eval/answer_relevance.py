@@ -16,6 +16,8 @@ class AnswerRelevanceConfig(BaseModel):
 
 
 class AnswerRelevanceEvaluator:
+    name = "answer_relevance"
+
     def __init__(
         self,
         ragas_llm: InstructorBaseRagasLLM,
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def compute_fingerprint(config_json: str) -> str:
+    return hashlib.sha256(config_json.encode("utf-8")).hexdigest()
+
+
+def has_evaluator_error(eval_result: dict[str, Any]) -> bool:
+    return any(key.endswith("_error") for key in eval_result)
+
+
+class CheckpointJournal:
+    """
+    An append-only JSON lines journal of evaluation results.
+
+    Each line holds the question id, the fingerprint of the config that
+    produced the result, and the result itself. When a run is restarted with
+    the same journal, the results recorded with the same fingerprint are
+    reused instead of evaluating their questions again. Results in which an
+    evaluator failed, with a `<name>_error` key such as a timeout, are not
+    reused, so that their questions are evaluated again.
+    """
+
+    def __init__(self, path: str | Path, fingerprint: str):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self._file = None
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        results = {}
+        if not self.path.exists():
+            return results
+        with open(self.path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line is incomplete if the process was killed
+                    # while writing it
+                    logger.warning(
+                        "Skipping malformed checkpoint line %d in %s",
+                        line_number,
+                        self.path,
+                    )
+                    continue
+                if entry.get("fingerprint") != self.fingerprint:
+                    continue
+                if has_evaluator_error(entry["result"]):
+                    # Failed judgements, e.g. timeouts and provider errors,
+                    # are retried
+                    continue
+                results[entry["question_id"]] = entry["result"]
+        return results
+
+    def record(self, question_id: str, eval_result: dict[str, Any]) -> None:
+        if self._file is None:
+            self._open()
+        entry = {
+            "question_id": question_id,
+            "fingerprint": self.fingerprint,
+            "result": eval_result,
+        }
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=str))
+        self._file.write("\n")
+        self._file.flush()
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        needs_newline = False
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, 2)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(self.path, "a", encoding="utf-8")
+        if needs_newline:
+            # Terminate an incomplete line left by an interrupted run
+            self._file.write("\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
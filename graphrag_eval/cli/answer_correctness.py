@@ -108,6 +108,7 @@ def run(
     evaluator = AnswerCorrectnessEvaluator(
         ragas_llm=ragas_llm,
         config=config.answer_correctness,
+        response_cache=llm_factory.create_response_cache(config.llm),
     )
     asyncio.run(evaluate_and_write(
         input_tsv_file_path,
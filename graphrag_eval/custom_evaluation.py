@@ -6,6 +6,7 @@ from typing import Literal, Self, TYPE_CHECKING, Any
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from .evaluator import Evaluator
+from .llm_cache import ResponseCache, cached_generate
 
 if TYPE_CHECKING:
     from ragas.llms.base import InstructorBaseRagasLLM
@@ -31,6 +32,7 @@ RESERVED_KEYS = {
     "answer_relevance",
     "answer_relevance_error",
     "steps_score",
+    "steps_error",
     "input_tokens",
     "output_tokens",
     "total_tokens",
@@ -106,6 +108,7 @@ class CustomEvaluator:
         self,
         ragas_llm: InstructorBaseRagasLLM,
         config: EvaluatorConfig,
+        response_cache: ResponseCache | None = None,
     ):
         self.name = config.name
         self.input_variables = config.inputs
@@ -117,16 +120,18 @@ class CustomEvaluator:
             self.output_variables
         )
         self.ragas_llm = ragas_llm
+        self.response_cache = response_cache
 
     @classmethod
     def from_config(
         cls,
         ragas_llm: InstructorBaseRagasLLM | None,
-        evaluation_configs: list[EvaluatorConfig] | None
+        evaluation_configs: list[EvaluatorConfig] | None,
+        response_cache: ResponseCache | None = None,
     ) -> list[Self]:
         if ragas_llm and evaluation_configs:
             return [
-                cls(ragas_llm, evaluation_config)
+                cls(ragas_llm, evaluation_config, response_cache)
                 for evaluation_config in evaluation_configs
             ]
         return []
@@ -213,7 +218,9 @@ class CustomEvaluator:
                 return self.error("Malformed actual step JSON")
             inputs["actual_steps"] = formatted_steps_lists
         prompt = self.prompt_template.format(**inputs)
-        response = await self._agenerate(prompt)
+        response = await cached_generate(
+            self.response_cache, prompt, self._agenerate
+        )
         return self.parse_outputs(response)
 
 
@@ -0,0 +1,106 @@
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Any
+
+from ragas.embeddings.base import BaseRagasEmbedding
+
+from .llm_cache import compute_cache_key
+
+
+class CachedEmbedding(BaseRagasEmbedding):
+    """
+    Wraps an embedder so that the vector of each text is computed once.
+
+    Vectors are held in memory, keyed by a hash of the text and the embedding
+    config. If `path` is given, they are also stored in a SQLite database, so
+    they are reused across runs.
+    """
+
+    def __init__(
+        self,
+        embedder: BaseRagasEmbedding,
+        namespace: dict[str, Any],
+        path: str | Path | None = None,
+    ):
+        super().__init__()
+        self.embedder = embedder
+        self.namespace = namespace
+        self.vectors: dict[str, list[float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.connection = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(path, isolation_level=None)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+
+    def _key(self, text: str, kwargs: dict[str, Any]) -> str:
+        return compute_cache_key({**self.namespace, **kwargs}, text)
+
+    def _lookup(self, key: str) -> list[float] | None:
+        vector = self.vectors.get(key)
+        if vector is None and self.connection is not None:
+            row = self.connection.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                vector = array("d", row[0]).tolist()
+                self.vectors[key] = vector
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    def _store(self, key: str, vector: list[float]) -> list[float]:
+        vector = [float(v) for v in vector]
+        self.vectors[key] = vector
+        if self.connection is not None:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                (key, array("d", vector).tobytes()),
+            )
+        return vector
+
+    def embed_text(self, text: str, **kwargs: Any) -> list[float]:
+        key = self._key(text, kwargs)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(
+                key, self.embedder.embed_text(text, **kwargs)
+            )
+        return vector
+
+    async def aembed_text(self, text: str, **kwargs: Any) -> list[float]:
+        key = self._key(text, kwargs)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(
+                key, await self.embedder.aembed_text(text, **kwargs)
+            )
+        return vector
+
+    async def aembed_texts(
+        self,
+        texts: list[str],
+        **kwargs: Any
+    ) -> list[list[float]]:
+        keys = [self._key(text, kwargs) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Embed the missing texts in one batch
+            computed = await self.embedder.aembed_texts(
+                [texts[i] for i in missing], **kwargs
+            )
+            for i, vector in zip(missing, computed):
+                vectors[i] = self._store(keys[i], vector)
+        return vectors
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,25 +1,49 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Self, TYPE_CHECKING
+from typing import ClassVar, Self, TYPE_CHECKING
 
 import yaml
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, PositiveFloat, model_validator
 
 from .answer_correctness import (
     AnswerCorrectnessConfig,
     AnswerCorrectnessEvaluator,
 )
 from .answer_relevance import AnswerRelevanceConfig, AnswerRelevanceEvaluator
+from .checkpoint import CheckpointJournal, compute_fingerprint
 from .custom_evaluation import EvaluatorConfig, CustomEvaluator
 from .evaluator import Evaluator
-from .llm_factory import LLMConfig, create_llm, create_embedder
-from .steps.evaluation import evaluate_steps
+from .llm_factory import (
+    LLMConfig,
+    create_llm,
+    create_embedder,
+    create_response_cache,
+)
+from .sharding import ShardKey, get_shard_index, validate_shard
+from .steps.evaluation import StepsConfig, evaluate_steps
+from .steps.references import CompiledReferences
 
 if TYPE_CHECKING:
     from ragas.llms.base import InstructorBaseRagasLLM
     from ragas.embeddings.base import BaseRagasEmbeddings, BaseRagasEmbedding
 
+logger = logging.getLogger(__name__)
+
+
+class TimeoutConfig(BaseModel):
+    # All timeouts are in seconds
+    question: PositiveFloat | None = None
+    evaluator: PositiveFloat | None = None
+    evaluators: dict[str, PositiveFloat] = Field(default_factory=dict)
+
+    def for_evaluator(self, name: str) -> float | None:
+        return self.evaluators.get(name, self.evaluator)
+
 
 class Config(BaseModel):
     llm: LLMConfig | None = None
@@ -29,6 +53,24 @@ class Config(BaseModel):
     )
     answer_correctness: AnswerCorrectnessConfig | None = None
     answer_relevance: AnswerRelevanceConfig | None = None
+    max_concurrency: int = Field(default=1, ge=1)
+    timeouts: TimeoutConfig | None = None
+    steps: StepsConfig = Field(default_factory=StepsConfig)
+
+    # Settings which affect how the evaluation runs, but not its results
+    RUNTIME_SETTINGS: ClassVar[dict] = {
+        "max_concurrency": True,
+        "timeouts": True,
+        "steps": {
+            "process_pool_workers": True,
+            "columnar_row_threshold": True,
+        },
+        "llm": {
+            "cache": True,
+            "embedding": {"cache": True},
+            "generation": {"rate_limit": True},
+        },
+    }
 
     @model_validator(mode="after")
     def validate_config_and_set_defaults(self) -> Self:
@@ -72,53 +114,263 @@ class Config(BaseModel):
             return cls(**config_dict)
         return cls()
 
+    def fingerprint(self) -> str:
+        return compute_fingerprint(
+            self.model_dump_json(exclude=self.RUNTIME_SETTINGS)
+        )
+
 
 async def run_evaluation(
     qa_dataset: list[dict],
     responses_dict: dict,
     config_file_path: str | Path | None = None,
+    max_concurrency: int | None = None,
+    checkpoint_path: str | Path | None = None,
+    shard_index: int | None = None,
+    shard_count: int | None = None,
+    shard_key: ShardKey = "question_id",
+    compiled_references: CompiledReferences | None = None,
 ) -> list[dict]:
-    evaluators, ragas_llm = parse_config_and_init_evaluators(config_file_path)
+    """
+    Evaluate the actual responses against the Q&A dataset.
 
+    Up to `max_concurrency` questions are evaluated at the same time. If it is
+    not given, the value from the config is used. The results are returned in
+    the order of the questions in the dataset.
+
+    If `checkpoint_path` is given, each result is appended to a journal at
+    this path, and questions already recorded there with the same config are
+    not evaluated again.
+
+    If `shard_index` and `shard_count` are given, only the questions in this
+    shard are evaluated. Questions are assigned to shards by a stable hash of
+    their `shard_key`. Use `merge_shard_results` to combine the results of
+    all shards.
+
+    `compiled_references`, made by `compile_references` from the same
+    dataset, saves parsing the outputs of the SPARQL reference steps.
+    """
     # Output metrics are not nested, for simpler aggregation
-    evaluation_results = []
-    for template in qa_dataset:
-        template_id = template["template_id"]
-        for question in template["questions"]:
-            actual_result = responses_dict[question["id"]]
-            eval_result = {
-                "template_id": template_id,
-                "question_id": actual_result["question_id"],
-                "question_text": question["question_text"]
-            }
-            for key in ("input_tokens", "output_tokens", "total_tokens",
-                        "elapsed_sec"):
-                if key in actual_result:
-                    eval_result[key] = actual_result[key]
-            if "actual_answer" in actual_result:
-                eval_result["actual_answer"] = actual_result["actual_answer"]
-            if "reference_answer" in question:
-                eval_result["reference_answer"] = question["reference_answer"]
-            if "reference_steps" in question:
-                eval_result["reference_steps"] = question["reference_steps"]
-            if "error" in actual_result:
-                eval_result.update({
-                    "status": "error",
-                    "error": actual_result["error"],
-                })
-            else:
-                eval_result["status"] = "success"
-
-            eval_result.update(
-                await evaluate_steps(question, actual_result, ragas_llm)
+    return [
+        eval_result
+        async for eval_result in iter_evaluation(
+            qa_dataset,
+            responses_dict,
+            config_file_path,
+            max_concurrency=max_concurrency,
+            checkpoint_path=checkpoint_path,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            shard_key=shard_key,
+            compiled_references=compiled_references,
+        )
+    ]
+
+
+async def iter_evaluation(
+    qa_dataset: list[dict],
+    responses_dict: dict,
+    config_file_path: str | Path | None = None,
+    max_concurrency: int | None = None,
+    preserve_order: bool = True,
+    max_buffered_results: int | None = None,
+    checkpoint_path: str | Path | None = None,
+    shard_index: int | None = None,
+    shard_count: int | None = None,
+    shard_key: ShardKey = "question_id",
+    compiled_references: CompiledReferences | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Evaluate the actual responses against the Q&A dataset, yielding each
+    result as soon as it is available.
+
+    If `preserve_order` is true, the results are yielded in the order of the
+    questions in the dataset, otherwise in the order in which they complete.
+    At most `max_concurrency` questions are evaluated at the same time.
+    Results which complete before those of earlier questions wait to be
+    yielded; if `max_buffered_results` is given, no more questions are
+    started while this many results are waiting, so memory use does not grow
+    with the size of the dataset.
+
+    If `checkpoint_path` is given, each result is appended to a journal at
+    this path, and questions already recorded there with the same config are
+    not evaluated again.
+
+    If `shard_index` and `shard_count` are given, only the questions in this
+    shard are evaluated.
+
+    `compiled_references`, made by `compile_references` from the same
+    dataset, saves parsing the outputs of the SPARQL reference steps.
+    """
+    config = Config.parse(config_file_path)
+    if max_concurrency is None:
+        max_concurrency = config.max_concurrency
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be a positive integer")
+    if max_buffered_results is not None and max_buffered_results < 1:
+        raise ValueError("max_buffered_results must be a positive integer")
+    validate_shard(shard_index, shard_count)
+    evaluators, ragas_llm = parse_config_and_init_evaluators(config_file_path)
+    executor = None
+    if config.steps.process_pool_workers:
+        executor = ProcessPoolExecutor(config.steps.process_pool_workers)
+    journal = None
+    checkpointed_results = {}
+    if checkpoint_path:
+        journal = CheckpointJournal(checkpoint_path, config.fingerprint())
+        checkpointed_results = journal.load()
+
+    async def evaluate(template_id: str, question: dict) -> dict:
+        if question["id"] in checkpointed_results:
+            return checkpointed_results.pop(question["id"])
+        eval_result = await evaluate_question(
+            template_id,
+            question,
+            responses_dict[question["id"]],
+            evaluators,
+            ragas_llm,
+            timeouts=config.timeouts,
+            executor=executor,
+            steps_config=config.steps,
+            compiled_references=compiled_references,
+        )
+        if journal:
+            journal.record(question["id"], eval_result)
+        return eval_result
+
+    def is_in_shard(template_id: str, question: dict) -> bool:
+        if shard_count is None:
+            return True
+        key = template_id if shard_key == "template_id" else question["id"]
+        return get_shard_index(key, shard_count) == shard_index
+
+    questions = enumerate(
+        (template["template_id"], question)
+        for template in qa_dataset
+        for question in template["questions"]
+        if is_in_shard(template["template_id"], question)
+    )
+    pending: dict[asyncio.Task, int] = {}
+    completed: dict[int, dict] = {}
+    next_index = 0
+    try:
+        while True:
+            while len(pending) < max_concurrency and (
+                max_buffered_results is None
+                or len(completed) < max_buffered_results
+            ):
+                item = next(questions, None)
+                if item is None:
+                    break
+                index, (template_id, question) = item
+                task = asyncio.create_task(evaluate(template_id, question))
+                pending[task] = index
+            if not pending:
+                break
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
             )
-            for evaluator in evaluators:
-                eval_result.update(
-                    await evaluator.evaluate(question, actual_result)
-                )
+            for task in sorted(done, key=pending.get):
+                index = pending.pop(task)
+                if preserve_order:
+                    completed[index] = task.result()
+                else:
+                    yield task.result()
+            while next_index in completed:
+                yield completed.pop(next_index)
+                next_index += 1
+    finally:
+        for task in pending:
+            task.cancel()
+        if journal:
+            journal.close()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        log_response_cache_stats(evaluators)
+
+
+async def evaluate_question(
+    template_id: str,
+    question: dict,
+    actual_result: dict,
+    evaluators: list[Evaluator],
+    ragas_llm: InstructorBaseRagasLLM | None,
+    timeouts: TimeoutConfig | None = None,
+    executor: Executor | None = None,
+    steps_config: StepsConfig | None = None,
+    compiled_references: CompiledReferences | None = None,
+) -> dict:
+    eval_result = {
+        "template_id": template_id,
+        "question_id": actual_result["question_id"],
+        "question_text": question["question_text"]
+    }
+    for key in ("input_tokens", "output_tokens", "total_tokens",
+                "elapsed_sec"):
+        if key in actual_result:
+            eval_result[key] = actual_result[key]
+    if "actual_answer" in actual_result:
+        eval_result["actual_answer"] = actual_result["actual_answer"]
+    if "reference_answer" in question:
+        eval_result["reference_answer"] = question["reference_answer"]
+    if "reference_steps" in question:
+        eval_result["reference_steps"] = question["reference_steps"]
+    if "error" in actual_result:
+        eval_result.update({
+            "status": "error",
+            "error": actual_result["error"],
+        })
+    else:
+        eval_result["status"] = "success"
+
+    timeouts = timeouts or TimeoutConfig()
+    names = ["steps"] + [evaluator.name for evaluator in evaluators]
+    coroutines = [
+        evaluate_steps(
+            question,
+            actual_result,
+            ragas_llm,
+            executor,
+            steps_config,
+            compiled_references,
+        )
+    ] + [
+        evaluator.evaluate(question, actual_result)
+        for evaluator in evaluators
+    ]
+    # The evaluations are independent, so run them concurrently
+    tasks = [
+        asyncio.create_task(asyncio.wait_for(
+            coroutine, timeouts.for_evaluator(name)
+        ))
+        for name, coroutine in zip(names, coroutines)
+    ]
+    try:
+        await asyncio.wait(tasks, timeout=timeouts.question)
+    finally:
+        # Cancel what is left after the question deadline
+        for task in tasks:
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Merging in a fixed order keeps key collisions resolved as with
+    # sequential updates
+    for name, task in zip(names, tasks):
+        if task.cancelled() or isinstance(task.exception(), TimeoutError):
+            eval_result[f"{name}_error"] = "timeout"
+        else:
+            eval_result.update(task.result())
+    return eval_result
+
 
-            evaluation_results.append(eval_result)
-    return evaluation_results
+def log_response_cache_stats(evaluators: list[Evaluator]) -> None:
+    caches = []
+    for evaluator in evaluators:
+        cache = getattr(evaluator, "response_cache", None)
+        if cache is not None and all(cache is not c for c in caches):
+            caches.append(cache)
+    for cache in caches:
+        logger.info("LLM response cache stats: %s", cache.stats)
 
 
 def parse_config_and_init_evaluators(
@@ -132,6 +384,7 @@ def parse_config_and_init_evaluators(
     ragas_embedder: BaseRagasEmbeddings | BaseRagasEmbedding | None = (
         create_embedder(config.llm)
     )
+    response_cache = create_response_cache(config.llm)
 
     evaluators: list[Evaluator] = []
 
@@ -142,13 +395,15 @@ def parse_config_and_init_evaluators(
         evaluators.append(answer_relevance_evaluator)
 
     answer_correctness_evaluator = AnswerCorrectnessEvaluator.from_config(
-        ragas_llm, config.answer_correctness
+        ragas_llm, config.answer_correctness, response_cache
     )
     if answer_correctness_evaluator:
         evaluators.append(answer_correctness_evaluator)
 
     evaluators.extend(
-        CustomEvaluator.from_config(ragas_llm, config.custom_evaluations)
+        CustomEvaluator.from_config(
+            ragas_llm, config.custom_evaluations, response_cache
+        )
     )
 
     return evaluators, ragas_llm
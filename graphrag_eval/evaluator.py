@@ -2,6 +2,9 @@ from typing import Protocol, Any
 
 
 class Evaluator(Protocol):
+    # Prefix of the error key if the evaluation fails
+    name: str
+
     async def evaluate(
         self,
         reference: dict[str, Any],
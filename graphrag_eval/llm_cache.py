@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any, Protocol
+
+
+class ResponseCache(Protocol):
+    def get(self, prompt: str) -> str | None:
+        """Return the cached response to the prompt, or None if missing"""
+        ...
+
+    def set(self, prompt: str, response: str) -> None:
+        ...
+
+    @property
+    def stats(self) -> dict[str, int]:
+        ...
+
+
+def compute_cache_key(namespace: dict[str, Any], prompt: str) -> str:
+    """
+    Hash the prompt together with the namespace, which holds everything
+    else that determines the response, such as provider, model and
+    generation parameters.
+    """
+    payload = json.dumps(
+        {"namespace": namespace, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteResponseCache:
+    """
+    A persistent LLM response cache stored in a SQLite database.
+
+    Entries older than `ttl_seconds` are treated as missing and deleted. When
+    there are more than `max_entries` entries, the least recently used ones
+    are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        namespace: dict[str, Any],
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+            "ON responses (accessed_at)"
+        )
+
+    def get(self, prompt: str) -> str | None:
+        key = compute_cache_key(self.namespace, prompt)
+        row = self.connection.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        now = self.clock()
+        if row is None:
+            self.misses += 1
+            return None
+        response, created_at = row
+        if self.ttl_seconds is not None \
+            and now - created_at > self.ttl_seconds:
+            self.connection.execute(
+                "DELETE FROM responses WHERE key = ?", (key,)
+            )
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.connection.execute(
+            "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        self.hits += 1
+        return response
+
+    def set(self, prompt: str, response: str) -> None:
+        key = compute_cache_key(self.namespace, prompt)
+        now = self.clock()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, response, now, now),
+        )
+        if self.max_entries is not None:
+            self._evict(self.max_entries)
+
+    def _evict(self, max_entries: int) -> None:
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM responses"
+        ).fetchone()
+        excess = count - max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+async def cached_generate(
+    cache: ResponseCache | None,
+    prompt: str,
+    generate: Callable[[str], Awaitable[str]],
+) -> str:
+    if cache is None:
+        return await generate(prompt)
+    response = cache.get(prompt)
+    if response is None:
+        response = await generate(prompt)
+        cache.set(prompt, response)
+    return response
@@ -4,6 +4,9 @@ from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from .llm_cache import ResponseCache, SQLiteResponseCache
+from .rate_limit import AdaptiveRateLimiter, RateLimitConfig
+
 if TYPE_CHECKING:
     from ragas.llms.base import InstructorBaseRagasLLM
     from ragas.embeddings.base import BaseRagasEmbeddings, BaseRagasEmbedding
@@ -14,18 +17,31 @@ class GenerationConfig(BaseModel):
     model: str
     temperature: float = Field(default=0.0, ge=0.0, le=2.0)
     max_tokens: int | None = Field(default=None, ge=1)
+    rate_limit: RateLimitConfig | None = None
     model_config = ConfigDict(extra='allow')
 
 
+class EmbeddingCacheConfig(BaseModel):
+    path: str | None = None
+
+
 class EmbeddingConfig(BaseModel):
     provider: str
     model: str
+    cache: EmbeddingCacheConfig | None = None
     model_config = ConfigDict(extra='allow')
 
 
+class ResponseCacheConfig(BaseModel):
+    path: str
+    max_entries: int | None = Field(default=None, ge=1)
+    ttl_seconds: float | None = Field(default=None, gt=0)
+
+
 class LLMConfig(BaseModel):
     generation: GenerationConfig
     embedding: EmbeddingConfig | None = None
+    cache: ResponseCacheConfig | None = None
 
 
 def create_llm(
@@ -36,11 +52,16 @@ def create_llm(
         from ragas.llms import llm_factory
 
         litellm.drop_params = True  # Remove unsupported params from requests
-        params = config.generation.model_dump()
+        params = config.generation.model_dump(exclude={"rate_limit"})
+        client = litellm.acompletion
+        if config.generation.rate_limit:
+            client = AdaptiveRateLimiter(config.generation.rate_limit).wrap(
+                client
+            )
         ragas_llm = llm_factory(
             provider="litellm",
             model=f"{params.pop('provider')}/{params.pop('model')}",
-            client=litellm.acompletion,
+            client=client,
             **params,
         )
         ragas_llm.is_async = True
@@ -56,12 +77,31 @@ def create_embedder(
         from ragas.embeddings.base import embedding_factory
 
         litellm.drop_params = True  # Remove unsupported params from requests
-        params = config.embedding.model_dump()
+        params = config.embedding.model_dump(exclude={"cache"})
+        namespace = dict(params)
         ragas_embedder = embedding_factory(
             provider="litellm",
             model=f"{params.pop('provider')}/{params.pop('model')}",
             client=litellm.acompletion,
             **params,
         )
+        if config.embedding.cache:
+            from .embedding_cache import CachedEmbedding
+            ragas_embedder = CachedEmbedding(
+                ragas_embedder, namespace, config.embedding.cache.path
+            )
         return ragas_embedder
     return None
+
+
+def create_response_cache(
+    config: LLMConfig | None
+) -> ResponseCache | None:
+    if config and config.cache:
+        return SQLiteResponseCache(
+            path=config.cache.path,
+            namespace=config.generation.model_dump(exclude={"rate_limit"}),
+            max_entries=config.cache.max_entries,
+            ttl_seconds=config.cache.ttl_seconds,
+        )
+    return None
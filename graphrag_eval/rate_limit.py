@@ -0,0 +1,184 @@
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Self
+
+from pydantic import BaseModel, Field, model_validator
+
+# Status codes of the litellm exceptions for rate limits and timeouts
+OVERLOAD_STATUS_CODES = {408, 429}
+
+
+class RateLimitConfig(BaseModel):
+    requests_per_minute: float | None = Field(default=None, gt=0)
+    tokens_per_minute: float | None = Field(default=None, gt=0)
+    initial_concurrency: int = Field(default=4, ge=1)
+    min_concurrency: int = Field(default=1, ge=1)
+    max_concurrency: int = Field(default=32, ge=1)
+    backoff_factor: float = Field(default=0.5, gt=0.0, lt=1.0)
+
+    @model_validator(mode="after")
+    def validate_concurrency_range(self) -> Self:
+        if not (
+            self.min_concurrency
+            <= self.initial_concurrency
+            <= self.max_concurrency
+        ):
+            raise ValueError(
+                "Expected min_concurrency <= initial_concurrency <= "
+                "max_concurrency"
+            )
+        return self
+
+
+class TokenBucket:
+    """A bucket holding up to `per_minute` units, refilled continuously"""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float]):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.clock = clock
+        self.updated_at = clock()
+
+    def refill(self) -> None:
+        now = self.clock()
+        self.level = min(
+            self.capacity,
+            self.level + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def seconds_until_available(self, amount: float) -> float:
+        self.refill()
+        # A request larger than the bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+def estimate_prompt_tokens(kwargs: dict[str, Any]) -> int:
+    """Roughly estimate the prompt tokens as 4 characters per token"""
+    num_chars = 0
+    for message in kwargs.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            num_chars += len(content)
+        elif isinstance(content, list):
+            num_chars += sum(
+                len(part.get("text", ""))
+                for part in content
+                if isinstance(part, dict)
+            )
+    return num_chars // 4 + 1
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    return isinstance(exc, TimeoutError) \
+        or getattr(exc, "status_code", None) in OVERLOAD_STATUS_CODES
+
+
+class AdaptiveRateLimiter:
+    """
+    Limits the calls to an LLM provider.
+
+    The number of concurrent calls is adjusted with additive increase and
+    multiplicative decrease (AIMD): each successful call raises the limit by
+    1 / limit, i.e. by about one per round of calls, and each rate limit or
+    timeout error multiplies it by the backoff factor. Independently, token
+    buckets cap the requests and the estimated prompt tokens per minute.
+    """
+
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config
+        self.concurrency = float(config.initial_concurrency)
+        self.in_flight = 0
+        self.clock = clock
+        self.request_bucket = None
+        self.token_bucket = None
+        if config.requests_per_minute:
+            self.request_bucket = TokenBucket(
+                config.requests_per_minute, clock
+            )
+        if config.tokens_per_minute:
+            self.token_bucket = TokenBucket(config.tokens_per_minute, clock)
+        self._condition = asyncio.Condition()
+        self._bucket_lock = asyncio.Lock()
+
+    async def acquire(self, num_tokens: int) -> None:
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self.in_flight < int(self.concurrency)
+            )
+            self.in_flight += 1
+        try:
+            await self._wait_for_buckets(num_tokens)
+        except BaseException:
+            await self.release()
+            raise
+
+    async def _wait_for_buckets(self, num_tokens: int) -> None:
+        while True:
+            async with self._bucket_lock:
+                delay = 0.0
+                if self.request_bucket:
+                    delay = self.request_bucket.seconds_until_available(1)
+                if self.token_bucket:
+                    delay = max(
+                        delay,
+                        self.token_bucket.seconds_until_available(num_tokens)
+                    )
+                if delay == 0.0:
+                    if self.request_bucket:
+                        self.request_bucket.take(1)
+                    if self.token_bucket:
+                        self.token_bucket.take(num_tokens)
+                    return
+            await asyncio.sleep(delay)
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.concurrency = min(
+            float(self.config.max_concurrency),
+            self.concurrency + 1 / self.concurrency,
+        )
+
+    def on_overload(self) -> None:
+        self.concurrency = max(
+            float(self.config.min_concurrency),
+            self.concurrency * self.config.backoff_factor,
+        )
+
+    def wrap(
+        self,
+        completion: Callable[..., Awaitable[Any]]
+    ) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(completion)
+        async def limited_completion(*args, **kwargs):
+            await self.acquire(estimate_prompt_tokens(kwargs))
+            try:
+                response = await completion(*args, **kwargs)
+            except Exception as exc:
+                if is_overload_error(exc):
+                    self.on_overload()
+                raise
+            else:
+                # The limit is raised before the waiters are notified, so
+                # they are admitted under the new limit
+                self.on_success()
+            finally:
+                await self.release()
+            return response
+
+        return limited_completion
@@ -0,0 +1,64 @@
+import hashlib
+from collections.abc import Iterable
+from typing import Literal
+
+ShardKey = Literal["template_id", "question_id"]
+
+
+def get_shard_index(key: str | int, shard_count: int) -> int:
+    """
+    Return the shard of the key. Unlike `hash()`, this is stable across
+    processes and machines. Keys are hashed as strings, as IDs read from
+    YAML may be integers.
+    """
+    digest = hashlib.sha256(str(key).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def validate_shard(shard_index: int | None, shard_count: int | None) -> None:
+    if (shard_index is None) != (shard_count is None):
+        raise ValueError(
+            "shard_index and shard_count must be given together"
+        )
+    if shard_count is not None and not 0 <= shard_index < shard_count:
+        raise ValueError(
+            f"Expected 0 <= shard_index < shard_count, got shard_index "
+            f"{shard_index} and shard_count {shard_count}"
+        )
+
+
+def merge_shard_results(
+    qa_dataset: list[dict],
+    shard_results: Iterable[list[dict]],
+) -> list[dict]:
+    """
+    Combine the evaluation results of all shards into one list, in the order
+    of the questions in the dataset, as if evaluated in a single run.
+    """
+    results_by_id = {}
+    for results in shard_results:
+        for eval_result in results:
+            key = (eval_result["template_id"], eval_result["question_id"])
+            if key in results_by_id:
+                raise ValueError(
+                    f"Duplicate result for question {key[1]} of template "
+                    f"{key[0]}"
+                )
+            results_by_id[key] = eval_result
+
+    merged_results = []
+    for template in qa_dataset:
+        for question in template["questions"]:
+            key = (template["template_id"], question["id"])
+            if key not in results_by_id:
+                raise ValueError(
+                    f"Missing result for question {key[1]} of template "
+                    f"{key[0]}"
+                )
+            merged_results.append(results_by_id.pop(key))
+    if results_by_id:
+        raise ValueError(
+            f"Results for questions not in the dataset: "
+            f"{sorted(question_id for _, question_id in results_by_id)}"
+        )
+    return merged_results
@@ -1,14 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from collections import defaultdict
 from collections.abc import Sequence
+from concurrent.futures import Executor
 from typing import Any, TYPE_CHECKING
 
+from pydantic import BaseModel, Field, PositiveFloat
+
 from .iri_discovery import do_iri_discovery_steps_equal
+from .output_cache import StepOutputCache
+from .rdf import RDF_PARSERS, RdfSyntaxError, graphs_are_isomorphic
 from .retrieval_context_ids import recall_at_k
-from .sparql import compare_sparql_results
+from .references import CompiledReferences, StepPosition
+from .result_digest import compare_result_digests, compute_result_digest
+from .sketch import (
+    DEFAULT_SKETCH_THRESHOLD,
+    ResultSketch,
+    compare_sketch,
+    sketch_columns,
+    sketch_reference_step,
+)
+from .sparql import (
+    ComparisonBudget,
+    SparqlResult,
+    Tolerance,
+    compare_sparql_results,
+    parse_sparql_results_json,
+)
 from .timeseries import (
     do_retrieve_time_series_steps_equal,
     do_retrieve_data_points_steps_equal,
@@ -20,21 +41,114 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 Match = tuple[int, int, int, float]
+BUDGET_EXCEEDED_KEY = "comparison_budget_exceeded"
+SKETCH_JACCARD_KEY = "sketch_jaccard"
+DIGEST_UNDECIDED_KEY = "output_digest_undecided"
+# Keys added to the actual steps when they are compared
+ANNOTATION_KEYS = (
+    BUDGET_EXCEEDED_KEY, SKETCH_JACCARD_KEY, DIGEST_UNDECIDED_KEY
+)
 Step = dict[str, Any]
 StepsGroup = Sequence[Step]  # We will index into a group
 
 
-def compare_steps(reference_step: Step, actual_step: Step) -> float:
+class StepsConfig(BaseModel):
+    # Number of worker processes for matching and scoring the steps. If not
+    # set, this CPU-bound work runs in the event loop thread.
+    process_pool_workers: int | None = Field(default=None, ge=1)
+    # SPARQL results with at least this many rows are compared with numpy,
+    # if it is installed. If not set, results are always compared by rows.
+    columnar_row_threshold: int | None = Field(default=10_000, ge=1)
+    # Limits on the column mappings tried and the CPU seconds spent when
+    # comparing two SPARQL results. When exceeded, the results are compared
+    # approximately and the actual step is annotated with
+    # "comparison_budget_exceeded". If not set, there is no limit.
+    max_column_mappings: int | None = Field(default=None, ge=1)
+    max_comparison_seconds: PositiveFloat | None = None
+
+
+def get_reference_digest(
+    reference_step: Step,
+    output_cache: StepOutputCache,
+) -> dict[str, Any]:
+    """
+    Return the `output_digest` of the reference step, or compute it over
+    the required columns of its output, once
+    """
+    if "output_digest" in reference_step:
+        return reference_step["output_digest"]
+    digest = output_cache.lookup(reference_step, compute_result_digest)
+    if digest is None:
+        digest = compute_result_digest(
+            output_cache.get(reference_step, parse_sparql_results_json),
+            reference_step["required_columns"],
+        )
+        output_cache.add(reference_step, compute_result_digest, digest)
+    return digest
+
+
+def compare_steps(
+    reference_step: Step,
+    actual_step: Step,
+    config: StepsConfig | None = None,
+    output_cache: StepOutputCache | None = None,
+) -> float:
+    """
+    Score the actual step against the reference step. The outputs of the
+    steps are parsed through `output_cache`, so a step compared many times
+    is parsed once.
+    """
+    config = config or StepsConfig()
+    output_cache = output_cache or StepOutputCache()
     reference_step_name = reference_step["name"]
     actual_step_name = actual_step["name"]
     reference_output = reference_step.get("output")
-    actual_output = actual_step["output"]
+    actual_output = actual_step.get("output")
     reference_output_media_type = reference_step.get("output_media_type")
 
     if reference_step_name == actual_step_name == "sparql_query" \
         and reference_output_media_type == "application/sparql-results+json":
+        tolerance = Tolerance(
+            reference_step.get("absolute_tolerance", 0.0),
+            reference_step.get("relative_tolerance", 0.0),
+        )
+        if "output_digest" in actual_step \
+            and not reference_step.get("ordered", False) \
+            and reference_step.get("comparison") != "sketch" \
+            and not tolerance:
+            try:
+                reference_digest = get_reference_digest(
+                    reference_step, output_cache
+                )
+            except json.decoder.JSONDecodeError as e:
+                logger.exception(
+                    "Failed to parse step output as json", exc_info=e
+                )
+                return False
+            score = compare_result_digests(
+                reference_digest,
+                actual_step["output_digest"],
+                reference_step.get("ignore_duplicates", True),
+            )
+            if score is not None:
+                return score
+        if actual_output is None:
+            if "output_digest" in actual_step:
+                # The step is not known to be wrong, only not comparable
+                actual_step[DIGEST_UNDECIDED_KEY] = True
+            logger.warning(
+                "Step %s can't be compared by its output digest, and has no "
+                "output",
+                actual_step.get("id"),
+            )
+            return 0.0
+        # The actual output is only sketched for sketch comparisons, so its
+        # rows are never kept
+        parse_actual = parse_sparql_results_json
+        if reference_step.get("comparison") == "sketch":
+            parse_actual = sketch_columns
         try:
-            actual_sparql_result = json.loads(actual_output)
+            actual_sparql_result = output_cache.get(actual_step, parse_actual)
         except json.decoder.JSONDecodeError as e:
             # This might happen, when the actual step is a DESCRIBE or CONSTRUCT query
             # in which case the output is string.
@@ -42,22 +156,71 @@ def compare_steps(reference_step: Step, actual_step: Step) -> float:
             # with DESCRIBE or CONSTRUCT queries.
             logger.warning("Failed to parse step output as json", exc_info=e)
             return False
+        if reference_step.get("comparison") == "sketch":
+            reference_sketch = output_cache.lookup(
+                reference_step, sketch_reference_step
+            )
+            if reference_sketch is None:
+                try:
+                    reference_sketch = sketch_reference_step(reference_step)
+                except json.decoder.JSONDecodeError as e:
+                    logger.exception(
+                        "Failed to parse step output as json", exc_info=e
+                    )
+                    return False
+                output_cache.add(
+                    reference_step, sketch_reference_step, reference_sketch
+                )
+            jaccard = compare_sketch(
+                reference_sketch, actual_sparql_result, actual_output
+            )
+            actual_step[SKETCH_JACCARD_KEY] = jaccard
+            return float(jaccard >= reference_step.get(
+                "sketch_threshold", DEFAULT_SKETCH_THRESHOLD
+            ))
         try:
-            reference_sparql_result = json.loads(reference_output)
+            reference_sparql_result = output_cache.get(
+                reference_step, parse_sparql_results_json
+            )
         except json.decoder.JSONDecodeError as e:
             # This is not expected, and might indicate a bug in the Q&A dataset.
             logger.exception("Failed to parse step output as json", exc_info=e)
             return False
-        return compare_sparql_results(
+        budget = ComparisonBudget(
+            config.max_column_mappings, config.max_comparison_seconds
+        )
+        score = compare_sparql_results(
             reference_sparql_result,
             actual_sparql_result,
             reference_step["required_columns"],
             reference_step.get("ordered", False),
             reference_step.get("ignore_duplicates", True),
+            config.columnar_row_threshold,
+            budget,
+            tolerance,
         )
+        if budget.exceeded:
+            actual_step[BUDGET_EXCEEDED_KEY] = True
+        return score
+    elif reference_step_name == actual_step_name == "sparql_query" \
+        and reference_output_media_type in RDF_PARSERS:
+        # CONSTRUCT and DESCRIBE results
+        parse = RDF_PARSERS[reference_output_media_type]
+        try:
+            actual_graph = output_cache.get(actual_step, parse)
+        except RdfSyntaxError as e:
+            # The actual step might be a SELECT or ASK query
+            logger.warning("Failed to parse step output as RDF", exc_info=e)
+            return 0.0
+        try:
+            reference_graph = output_cache.get(reference_step, parse)
+        except RdfSyntaxError as e:
+            logger.exception("Failed to parse step output as RDF", exc_info=e)
+            return 0.0
+        return float(graphs_are_isomorphic(reference_graph, actual_graph))
     elif reference_step_name == actual_step_name == "retrieval" and reference_output:
-        ref_contexts_ids = [c["id"] for c in json.loads(reference_output)]
-        act_contexts_ids = [c["id"] for c in json.loads(actual_output)]
+        ref_contexts_ids = [c["id"] for c in output_cache.get(reference_step)]
+        act_contexts_ids = [c["id"] for c in output_cache.get(actual_step)]
         k = actual_step["args"]["k"]
         return recall_at_k(ref_contexts_ids, act_contexts_ids, k)
     elif reference_step_name == actual_step_name == "retrieve_time_series":
@@ -71,10 +234,14 @@ def compare_steps(reference_step: Step, actual_step: Step) -> float:
             )
         )
     elif reference_step_name == "iri_discovery":
-        return float(do_iri_discovery_steps_equal(reference_step, actual_step))
+        return float(do_iri_discovery_steps_equal(
+            reference_step, actual_step, output_cache.get
+        ))
     elif reference_step_name == actual_step_name \
         and reference_output_media_type == "application/json":
-        return float(json.loads(reference_output) == json.loads(actual_output))
+        return float(
+            output_cache.get(reference_step) == output_cache.get(actual_step)
+        )
     return float(reference_output == actual_output)
 
 
@@ -83,7 +250,10 @@ def match_group(
     group_idx: int,
     actual_steps: Sequence[Step],
     search_upto: int,
+    config: StepsConfig | None = None,
+    output_cache: StepOutputCache | None = None,
 ) -> list[Match]:
+    output_cache = output_cache or StepOutputCache()
     used_actual_indices = set()
     matches = []
 
@@ -93,7 +263,12 @@ def match_group(
             if actual_idx in used_actual_indices or actual_step["status"] != "success":
                 continue
 
-            score = compare_steps(reference_step, actual_step)
+            score = compare_steps(
+                reference_step,
+                actual_step,
+                config,
+                output_cache,
+            )
             if score > 0.0:
                 matches.append((group_idx, reference_idx, actual_idx, score))
                 used_actual_indices.add(actual_idx)
@@ -104,6 +279,8 @@ def match_group(
 def match_groups(
     reference_groups: Sequence[StepsGroup],
     actual_steps: Sequence[Step],
+    config: StepsConfig | None = None,
+    output_cache: StepOutputCache | None = None,
 ) -> list[Match]:
     """
     Match the actual steps to the steps in the reference groups such that:
@@ -116,7 +293,14 @@ def match_groups(
     matches = []
     search_upto = len(actual_steps)
     for group_idx, group in reversed(list(enumerate(reference_groups))):
-        matched = match_group(reference_groups, group_idx, actual_steps, search_upto)
+        matched = match_group(
+            reference_groups,
+            group_idx,
+            actual_steps,
+            search_upto,
+            config,
+            output_cache,
+        )
         if len(matched) == len(group):
             matches.extend(matched)
             search_upto = min(actual_idx for (_, _, actual_idx, _) in matched)
@@ -128,16 +312,25 @@ def match_groups(
     return matches
 
 
+def annotate_matches(
+    reference_steps_groups: Sequence[StepsGroup],
+    actual_steps: Sequence[Step],
+    matches: Sequence[Match]
+) -> None:
+    for ref_group_idx, ref_match_idx, actual_idx, _ in matches:
+        reference_steps_groups[ref_group_idx][ref_match_idx]["matches"] \
+            = actual_steps[actual_idx]["id"]
+
+
 def calculate_steps_score(
     reference_steps_groups: Sequence[StepsGroup],
     actual_steps: Sequence[Step],
     matches: Sequence[Match]
 ) -> float:
+    annotate_matches(reference_steps_groups, actual_steps, matches)
     scores_by_group = defaultdict(float)
-    for ref_group_idx, ref_match_idx, actual_idx, score in matches:
+    for ref_group_idx, _, _, score in matches:
         scores_by_group[ref_group_idx] += score
-        reference_steps_groups[ref_group_idx][ref_match_idx]["matches"] \
-            = actual_steps[actual_idx]["id"]
 
     steps_score = 0
     for group_idx in range(len(reference_steps_groups)):
@@ -145,10 +338,58 @@ def calculate_steps_score(
     return steps_score / len(reference_steps_groups)
 
 
+def match_and_score_steps(
+    reference_steps_groups: Sequence[StepsGroup],
+    actual_steps: Sequence[Step],
+    config: StepsConfig | None = None,
+    reference_results: dict[StepPosition, SparqlResult | ResultSketch]
+    | None = None,
+) -> tuple[list[Match], float, dict[int, dict[str, Any]]]:
+    """
+    Match the actual steps to the reference steps and score them. Also
+    return the annotations added to the actual steps, by index. The
+    arguments and the result are picklable, so this can run in a worker
+    process.
+
+    `reference_results` are the compiled outputs of reference steps by
+    position, which are sketches for steps compared by sketches. Each step
+    output is parsed at most once.
+    """
+    output_cache = StepOutputCache()
+    for (group_idx, step_idx), result in (reference_results or {}).items():
+        output_cache.add(
+            reference_steps_groups[group_idx][step_idx],
+            sketch_reference_step
+            if isinstance(result, ResultSketch)
+            else parse_sparql_results_json,
+            result,
+        )
+    matches = match_groups(
+        reference_steps_groups, actual_steps, config, output_cache
+    )
+    logger.debug("Step output parsing stats: %s", output_cache.stats)
+    steps_score = calculate_steps_score(
+        reference_steps_groups, actual_steps, matches
+    )
+    annotations = {}
+    for actual_idx, actual_step in enumerate(actual_steps):
+        annotation = {
+            key: actual_step[key]
+            for key in ANNOTATION_KEYS
+            if key in actual_step
+        }
+        if annotation:
+            annotations[actual_idx] = annotation
+    return matches, steps_score, annotations
+
+
 async def evaluate_steps(
     reference: dict,
     actual: dict,
     ragas_llm: InstructorBaseRagasLLM | None,
+    executor: Executor | None = None,
+    config: StepsConfig | None = None,
+    compiled_references: CompiledReferences | None = None,
 ) -> dict:
     eval_result = {}
     actual_steps = actual.get("actual_steps", [])
@@ -169,8 +410,29 @@ async def evaluate_steps(
                 actual_step.update(result)
     if "reference_steps" in reference:
         reference_steps = reference["reference_steps"]
-        matches = match_groups(reference_steps, actual_steps)
-        eval_result["steps_score"] = calculate_steps_score(reference_steps, actual_steps, matches)
+        reference_results = None
+        if compiled_references is not None:
+            reference_results = compiled_references.for_question(reference)
+        if executor is None:
+            matches, steps_score, _ = match_and_score_steps(
+                reference_steps, actual_steps, config, reference_results
+            )
+        else:
+            matches, steps_score, annotations = \
+                await asyncio.get_running_loop() \
+                .run_in_executor(
+                    executor,
+                    match_and_score_steps,
+                    reference_steps,
+                    actual_steps,
+                    config,
+                    reference_results,
+                )
+            # The worker process annotated copies of the steps
+            annotate_matches(reference_steps, actual_steps, matches)
+            for actual_idx, annotation in annotations.items():
+                actual_steps[actual_idx].update(annotation)
+        eval_result["steps_score"] = steps_score
         if ragas_llm:
             for ref_group_idx, ref_match_idx, act_idx, _ in matches:
                 reference_step = reference_steps[ref_group_idx][ref_match_idx]
@@ -1,14 +1,19 @@
 import json
+from collections.abc import Callable
 from typing import Any
 
 
 def do_iri_discovery_steps_equal(
     reference_step: dict[str, Any],
     actual_step: dict[str, Any],
+    load_output: Callable[[dict[str, Any]], Any] | None = None,
 ) -> bool:
     if actual_step["name"] == "autocomplete_search":
         reference_iri = reference_step["output"]
-        actual_output = json.loads(actual_step["output"])
+        if load_output:
+            actual_output = load_output(actual_step)
+        else:
+            actual_output = json.loads(actual_step["output"])
 
         for binding in actual_output["results"]["bindings"]:
             for _, type_value in binding.items():
@@ -16,6 +21,6 @@ def do_iri_discovery_steps_equal(
                     return True
     elif actual_step["name"] == "sparql_query":
         reference_iri = reference_step["output"]
-        if reference_iri in actual_step["output"]:
+        if reference_iri in actual_step.get("output", ""):
             return True
     return False
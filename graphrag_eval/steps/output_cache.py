@@ -0,0 +1,63 @@
+import json
+from collections.abc import Callable
+from typing import Any
+
+
+class StepOutputCache:
+    """
+    The parsed outputs of the steps of one question, keyed by the identity
+    of the step and the parser, so each output is parsed at most once while
+    the steps are matched.
+
+    Parse errors are cached too, and raised again on each lookup.
+    """
+
+    def __init__(self):
+        self.outputs: dict[
+            tuple[int, Callable], tuple[dict, Any, Exception | None]
+        ] = {}
+        self.parses = 0
+        self.parses_avoided = 0
+
+    def get(
+        self,
+        step: dict,
+        parse: Callable[[str], Any] = json.loads,
+    ) -> Any:
+        key = (id(step), parse)
+        entry = self.outputs.get(key)
+        if entry is None:
+            self.parses += 1
+            try:
+                value, error = parse(step["output"]), None
+            except ValueError as e:
+                value, error = None, e
+            # The step is kept, so its id is not reused by another step
+            entry = self.outputs[key] = (step, value, error)
+        else:
+            self.parses_avoided += 1
+        _, value, error = entry
+        if error is not None:
+            raise error
+        return value
+
+    def lookup(self, step: dict, parse: Callable) -> Any | None:
+        """Return the cached output of the step, without parsing it"""
+        entry = self.outputs.get((id(step), parse))
+        if entry is None or entry[2] is not None:
+            return None
+        self.parses_avoided += 1
+        return entry[1]
+
+    def add(
+        self,
+        step: dict,
+        parse: Callable[[str], Any],
+        value: Any,
+    ) -> None:
+        """Add an output parsed in advance, such as a compiled reference"""
+        self.outputs[(id(step), parse)] = (step, value, None)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"parses": self.parses, "parses_avoided": self.parses_avoided}
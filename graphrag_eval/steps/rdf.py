@@ -0,0 +1,489 @@
+"""
+Parsing and comparison of RDF graphs, such as the outputs of CONSTRUCT and
+DESCRIBE queries, in N-Triples or Turtle.
+
+Terms are held as strings in N-Triples syntax, e.g. `<http://x>`, `"1"^^<...>`
+or `_:b0`, and a graph as a set of triples of terms. Graphs are compared up
+to the renaming of blank nodes, see `graphs_are_isomorphic`.
+"""
+import json
+import re
+from collections import Counter
+from collections.abc import Iterator
+from urllib.parse import urljoin
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+Triple = tuple[str, str, str]
+
+
+class RdfSyntaxError(ValueError):
+    pass
+
+
+TOKEN = re.compile(r"""
+    (?P<ws>(?:\s|\#[^\n]*)+)
+    |(?P<iri><[^<>"{}|^`\\\x00-\x20]*>)
+    |(?P<long_string>\"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"|'''(?:[^'\\]|\\.|'(?!''))*''')
+    |(?P<string>"(?:[^"\\\n\r]|\\.)*"|'(?:[^'\\\n\r]|\\.)*')
+    |(?P<bnode>_:[\w](?:[\w.-]*[\w-])?)
+    |(?P<at>@[a-zA-Z]+(?:-[a-zA-Z0-9]+)*)
+    |(?P<caret>\^\^)
+    |(?P<number>[+-]?(?:\d+\.\d*[eE][+-]?\d+|\.\d+[eE][+-]?\d+|\d+[eE][+-]?\d+
+        |\d*\.\d+|\d+))
+    |(?P<pname>(?:[^\W\d_](?:[\w.-]*[\w-])?)?:(?:[\w:%-](?:[\w.:%-]*[\w:%-])?)?)
+    |(?P<keyword>[A-Za-z]+)
+    |(?P<punct>[.;,\[\]()])
+""", re.VERBOSE)
+ECHAR = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))", re.DOTALL)
+ECHARS = {
+    "t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f",
+    '"': '"', "'": "'", "\\": "\\",
+}
+NTRIPLE = re.compile(r"""
+    \s*(<[^>]*>|_:\S+?)
+    \s*(<[^>]*>)
+    \s*(<[^>]*>|_:\S+?|"(?:[^"\\]|\\.)*"(?:@[a-zA-Z]+(?:-[a-zA-Z0-9]+)*|\^\^<[^>]*>)?)
+    \s*\.\s*(?:\#.*)?$
+""", re.VERBOSE)
+
+
+def unescape(text: str) -> str:
+    def replace(match: re.Match) -> str:
+        code = match.group(1) or match.group(2)
+        if code:
+            return chr(int(code, 16))
+        char = match.group(3)
+        if char not in ECHARS:
+            raise RdfSyntaxError(f"Invalid escape sequence \\{char}")
+        return ECHARS[char]
+
+    return ECHAR.sub(replace, text) if "\\" in text else text
+
+
+def literal(lexical: str, datatype: str | None = None,
+            language: str | None = None) -> str:
+    # RDF 1.1 simple literals are xsd:string literals
+    term = json.dumps(lexical, ensure_ascii=False)
+    if language:
+        return f"{term}@{language.lower()}"
+    if datatype and datatype != XSD + "string":
+        return f"{term}^^<{datatype}>"
+    return term
+
+
+class TurtleParser:
+    """
+    A parser of Turtle, which also accepts N-Triples. Blank node labels are
+    scoped to the document. RDF-star and escapes in prefixed names are not
+    supported.
+    """
+
+    def __init__(self, text: str):
+        self.tokens = self._tokenize(text)
+        self.token = next(self.tokens, None)
+        self.prefixes: dict[str, str] = {}
+        self.base: str | None = None
+        self.triples: set[Triple] = set()
+        self.terms: dict[str, str] = {}
+        self.num_blank_nodes = 0
+
+    @staticmethod
+    def _tokenize(text: str) -> Iterator[tuple[str, str]]:
+        pos = 0
+        while pos < len(text):
+            match = TOKEN.match(text, pos)
+            if match is None:
+                raise RdfSyntaxError(
+                    f"Unexpected character {text[pos]!r} at position {pos}"
+                )
+            pos = match.end()
+            if match.lastgroup != "ws":
+                yield match.lastgroup, match.group()
+
+    def _next(self) -> tuple[str, str]:
+        token = self.token
+        if token is None:
+            raise RdfSyntaxError("Unexpected end of document")
+        self.token = next(self.tokens, None)
+        return token
+
+    def _accept(self, value: str) -> bool:
+        if self.token is not None and self.token[1] == value:
+            self.token = next(self.tokens, None)
+            return True
+        return False
+
+    def _expect(self, value: str) -> None:
+        if not self._accept(value):
+            raise RdfSyntaxError(f"Expected {value!r}, got {self.token}")
+
+    def _intern(self, term: str) -> str:
+        return self.terms.setdefault(term, term)
+
+    def _new_blank_node(self) -> str:
+        self.num_blank_nodes += 1
+        # "#" can't occur in blank node labels, so these are always new
+        return f"_:#{self.num_blank_nodes}"
+
+    def _add(self, subject: str, predicate: str, object_: str) -> None:
+        self.triples.add((subject, predicate, self._intern(object_)))
+
+    def parse(self) -> set[Triple]:
+        while self.token is not None:
+            kind, value = self.token
+            if kind == "at" and value in ("@prefix", "@base"):
+                self._next()
+                self._directive(value[1:])
+                self._expect(".")
+            elif kind == "keyword" and value.lower() in ("prefix", "base"):
+                self._next()
+                self._directive(value.lower())
+            else:
+                self._triples()
+                self._expect(".")
+        return self.triples
+
+    def _directive(self, name: str) -> None:
+        if name == "prefix":
+            kind, prefix = self._next()
+            if kind != "pname" or not prefix.endswith(":"):
+                raise RdfSyntaxError(f"Expected a prefix, got {prefix!r}")
+            self.prefixes[prefix[:-1]] = self._iri(self._next())
+        else:
+            self.base = self._iri(self._next())
+
+    def _iri(self, token: tuple[str, str]) -> str:
+        kind, value = token
+        if kind == "iri":
+            iri = unescape(value[1:-1])
+            return urljoin(self.base, iri) if self.base else iri
+        if kind == "pname":
+            prefix, _, local = value.partition(":")
+            if prefix not in self.prefixes:
+                raise RdfSyntaxError(f"Undefined prefix {prefix!r}")
+            return self.prefixes[prefix] + local
+        raise RdfSyntaxError(f"Expected an IRI, got {value!r}")
+
+    def _triples(self) -> None:
+        if self.token == ("punct", "["):
+            subject = self._blank_node_property_list()
+            if self.token == ("punct", "."):
+                return
+        else:
+            subject = self._subject()
+        self._predicate_object_list(subject)
+
+    def _subject(self) -> str:
+        kind, value = self.token
+        if kind == "bnode":
+            self._next()
+            return self._intern(value)
+        if self.token == ("punct", "("):
+            return self._collection()
+        return self._intern(f"<{self._iri(self._next())}>")
+
+    def _predicate_object_list(self, subject: str) -> None:
+        while True:
+            if self._accept("a"):
+                predicate = f"<{RDF}type>"
+            else:
+                predicate = f"<{self._iri(self._next())}>"
+            predicate = self._intern(predicate)
+            self._add(subject, predicate, self._object())
+            while self._accept(","):
+                self._add(subject, predicate, self._object())
+            if not self._accept(";"):
+                return
+            # Repeated and trailing semicolons are allowed
+            while self._accept(";"):
+                pass
+            if self.token is None or self.token[1] in (".", "]"):
+                return
+
+    def _blank_node_property_list(self) -> str:
+        self._expect("[")
+        blank_node = self._new_blank_node()
+        if not self._accept("]"):
+            self._predicate_object_list(blank_node)
+            self._expect("]")
+        return blank_node
+
+    def _collection(self) -> str:
+        self._expect("(")
+        head = f"<{RDF}nil>"
+        last = None
+        while not self._accept(")"):
+            node = self._new_blank_node()
+            if last is None:
+                head = node
+            else:
+                self._add(last, f"<{RDF}rest>", node)
+            self._add(node, f"<{RDF}first>", self._object())
+            last = node
+        if last is not None:
+            self._add(last, f"<{RDF}rest>", f"<{RDF}nil>")
+        return head
+
+    def _object(self) -> str:
+        if self.token is None:
+            raise RdfSyntaxError("Unexpected end of document")
+        kind, value = self.token
+        if kind in ("string", "long_string"):
+            self._next()
+            quote_length = 3 if kind == "long_string" else 1
+            lexical = unescape(value[quote_length:-quote_length])
+            if self.token is not None and self.token[0] == "at":
+                return literal(lexical, language=self._next()[1][1:])
+            if self._accept("^^"):
+                return literal(lexical, self._iri(self._next()))
+            return literal(lexical)
+        if kind == "number":
+            self._next()
+            if "e" in value.lower():
+                datatype = "double"
+            elif "." in value:
+                datatype = "decimal"
+            else:
+                datatype = "integer"
+            return literal(value, XSD + datatype)
+        if kind == "keyword" and value in ("true", "false"):
+            self._next()
+            return literal(value, XSD + "boolean")
+        if value == "[":
+            return self._blank_node_property_list()
+        return self._subject()
+
+
+def parse_ntriples(text: str) -> set[Triple]:
+    """
+    Parses N-Triples line by line. Lines which don't have the simple form of
+    one triple per line are parsed as Turtle.
+    """
+    triples = set()
+    terms = {}
+    other_lines = []
+    for line in text.splitlines():
+        match = NTRIPLE.match(line)
+        if match is None:
+            if line.strip() and not line.lstrip().startswith("#"):
+                other_lines.append(line)
+            continue
+        subject, predicate, object_ = (
+            f"<{unescape(term[1:-1])}>" if term.startswith("<") else term
+            for term in match.groups()
+        )
+        if object_.startswith('"'):
+            object_ = normalize_ntriples_literal(object_)
+        triples.add((
+            terms.setdefault(subject, subject),
+            terms.setdefault(predicate, predicate),
+            terms.setdefault(object_, object_),
+        ))
+    if other_lines:
+        triples |= TurtleParser("\n".join(other_lines)).parse()
+    return triples
+
+
+def normalize_ntriples_literal(term: str) -> str:
+    end = term.rindex('"')
+    lexical = unescape(term[1:end])
+    suffix = term[end + 1:]
+    if suffix.startswith("@"):
+        return literal(lexical, language=suffix[1:])
+    if suffix.startswith("^^"):
+        return literal(lexical, suffix[3:-1])
+    return literal(lexical)
+
+
+def parse_turtle(text: str) -> set[Triple]:
+    return TurtleParser(text).parse()
+
+
+RDF_PARSERS = {
+    "text/turtle": parse_turtle,
+    "application/n-triples": parse_ntriples,
+}
+
+
+def parse_rdf(text: str, media_type: str = "text/turtle") -> set[Triple]:
+    """
+    Parses an RDF graph in N-Triples or Turtle.
+
+    Raises RdfSyntaxError if the text can't be parsed.
+    """
+    return RDF_PARSERS[media_type](text)
+
+
+def is_blank_node(term: str) -> bool:
+    return term.startswith("_:")
+
+
+class CanonicalGraph:
+    """
+    A form of an RDF graph which is the same for graphs that differ only in
+    the labels of their blank nodes.
+
+    Blank nodes are coloured by colour refinement: all blank nodes start
+    with the same colour, and a blank node is recoloured by a hash of its
+    colour and the multiset of its triples, with the other blank nodes in
+    them replaced by their colours. Only the blank nodes next to a blank
+    node whose colour changed are recoloured, until no colour changes. When
+    the nodes of a colour split into several colours, the largest part
+    keeps the colour, so the nodes next to it need not be recoloured. The
+    canonical form is the set of triples without blank nodes and the
+    multiset of the other triples, with blank nodes replaced by a final hash
+    of their colours and triples.
+
+    A blank node changes colour only when it is not in the largest part of a
+    split, so at most a logarithmic number of times, and the refinement
+    takes time linear in the number of triples up to a logarithmic factor,
+    even for long chains of blank nodes such as RDF collections.
+
+    Isomorphic graphs always have equal canonical forms. The converse holds
+    when the refinement gives each blank node its own colour, as for blank
+    nodes which are distinguished by their IRIs and literals or by their
+    position in a tree or chain of blank nodes, which covers CONSTRUCT and
+    DESCRIBE outputs in practice. It may fail for graphs with symmetric
+    structures of blank nodes which are not isomorphic, e.g. one cycle of
+    six blank nodes and two cycles of three, all with the same predicates.
+    Hash collisions may also, very rarely, make different graphs equal.
+    """
+
+    def __init__(self, triples: set[Triple]):
+        self.ground_triples = set()
+        blank_node_triples = []
+        # The triples of each blank node with other blank nodes, as pairs of
+        # a hash of the direction and predicate and the other blank node,
+        # and the hashes of its other triples
+        edges: dict[str, list[tuple[int, str]]] = {}
+        ground_edges: dict[str, list[int]] = {}
+        for triple in triples:
+            subject, predicate, object_ = triple
+            subject_is_blank = is_blank_node(subject)
+            object_is_blank = is_blank_node(object_)
+            if not (subject_is_blank or object_is_blank):
+                self.ground_triples.add(triple)
+                continue
+            blank_node_triples.append(triple)
+            if subject_is_blank and object_is_blank:
+                edges.setdefault(subject, []).append(
+                    (hash((0, predicate)), object_)
+                )
+                edges.setdefault(object_, []).append(
+                    (hash((1, predicate)), subject)
+                )
+            elif subject_is_blank:
+                ground_edges.setdefault(subject, []).append(
+                    hash((0, predicate, object_))
+                )
+            else:
+                ground_edges.setdefault(object_, []).append(
+                    hash((1, predicate, subject))
+                )
+
+        # Blank nodes start with the colours of their other triples
+        colours = {
+            blank_node: hash(tuple(sorted(ground_edges.get(blank_node, ()))))
+            for blank_node in edges.keys() | ground_edges.keys()
+        }
+
+        def recolour(blank_node: str) -> int:
+            return hash((colours[blank_node], tuple(sorted(
+                hash((key, colours[other]))
+                for key, other in edges.get(blank_node, ())
+            ))))
+
+        members: dict[int, set[str]] = {}
+        for blank_node, colour in colours.items():
+            members.setdefault(colour, set()).add(blank_node)
+        # The number of times a blank node changed colour
+        self.num_recolourings = 0
+        to_recolour = set(edges)
+        while to_recolour:
+            colour_to_parts: dict[int, dict[int, list[str]]] = {}
+            for blank_node in to_recolour:
+                colour = colours[blank_node]
+                # A blank node with its own colour can't be split further
+                if len(members[colour]) > 1:
+                    colour_to_parts.setdefault(colour, {}).setdefault(
+                        recolour(blank_node), []
+                    ).append(blank_node)
+            changed = []
+            for colour, parts in colour_to_parts.items():
+                num_recoloured = sum(map(len, parts.values()))
+                num_unchanged = len(members[colour]) - num_recoloured
+                if num_unchanged == 0 and len(parts) == 1:
+                    continue
+                # The largest part keeps the colour, with ties broken by the
+                # new colours, so the choice doesn't depend on the labels.
+                # The nodes which were not recoloured are a part too.
+                unchanged_colour = hash((colour, ()))
+                sizes = {
+                    new_colour: len(part) for new_colour, part in parts.items()
+                }
+                if num_unchanged:
+                    sizes[unchanged_colour] = num_unchanged
+                largest = max(
+                    sizes, key=lambda new_colour: (sizes[new_colour],
+                                                   new_colour)
+                )
+                if num_unchanged and largest != unchanged_colour:
+                    recoloured = {
+                        node for part in parts.values() for node in part
+                    }
+                    parts[unchanged_colour] = [
+                        node for node in members[colour]
+                        if node not in recoloured
+                    ]
+                for new_colour, part in parts.items():
+                    if new_colour == largest:
+                        continue
+                    members[colour].difference_update(part)
+                    members[new_colour] = set(part)
+                    for blank_node in part:
+                        colours[blank_node] = new_colour
+                    changed.extend(part)
+            self.num_recolourings += len(changed)
+            to_recolour = {
+                other
+                for blank_node in changed
+                for _, other in edges.get(blank_node, ())
+            }
+
+        # The colours are named by the history of the splits, so the final
+        # colours also cover the triples of the blank nodes
+        colours = {blank_node: recolour(blank_node) for blank_node in colours}
+        self.num_blank_nodes = len(colours)
+        self.num_colours = len(members)
+        self.blank_node_triples = Counter(
+            (colours.get(subject, subject), predicate,
+             colours.get(object_, object_))
+            for subject, predicate, object_ in blank_node_triples
+        )
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether each blank node has its own colour"""
+        return self.num_colours == self.num_blank_nodes
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CanonicalGraph):
+            return NotImplemented
+        return self.num_blank_nodes == other.num_blank_nodes \
+            and self.ground_triples == other.ground_triples \
+            and self.blank_node_triples == other.blank_node_triples
+
+
+def graphs_are_isomorphic(
+    triples: set[Triple],
+    other_triples: set[Triple],
+) -> bool:
+    """
+    Returns whether the graphs are equal up to the labels of their blank
+    nodes, as decided by comparing their `CanonicalGraph` forms
+    """
+    if len(triples) != len(other_triples):
+        return False
+    return CanonicalGraph(triples) == CanonicalGraph(other_triples)
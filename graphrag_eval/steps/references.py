@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+from .sketch import ResultSketch, sketch_reference_step
+from .sparql import SparqlResult, parse_sparql_results_json
+
+logger = logging.getLogger(__name__)
+
+SPARQL_RESULTS_MEDIA_TYPE = "application/sparql-results+json"
+FORMAT_VERSION = 1
+
+# The position of a reference step: (group index, step index)
+StepPosition = tuple[int, int]
+
+
+def is_compilable(reference_step: dict) -> bool:
+    return reference_step.get("name") == "sparql_query" \
+        and reference_step.get("output_media_type") == SPARQL_RESULTS_MEDIA_TYPE \
+        and isinstance(reference_step.get("output"), str)
+
+
+def compute_step_hash(reference_step: dict) -> str:
+    """Hash what the compiled result of a reference step is derived from"""
+    parts = [reference_step["output"], reference_step.get("required_columns")]
+    if "comparison" in reference_step:
+        parts.append(reference_step["comparison"])
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compile_reference_step(
+    reference_step: dict,
+) -> SparqlResult | ResultSketch:
+    """
+    Parse the output of a reference step and keep only the required columns,
+    which are the only ones compared. Steps compared by sketches are only
+    sketched.
+    """
+    if reference_step.get("comparison") == "sketch":
+        return sketch_reference_step(reference_step)
+    result = parse_sparql_results_json(reference_step["output"])
+    compiled = SparqlResult(result.vars, result.boolean)
+    compiled.num_rows = result.num_rows
+    for var in reference_step.get("required_columns") or []:
+        compiled.columns[var] = result.get_column(var)
+    return compiled
+
+
+class CompiledReferences:
+    """
+    The parsed outputs of the SPARQL reference steps of a Q&A dataset, by
+    question id and step position. The outputs of steps compared by
+    sketches are stored as their sketches.
+
+    Each entry is stored with a hash of the step output, required columns
+    and comparison mode. If the dataset has changed since it was compiled,
+    the stale entries are not used and those reference steps are parsed as
+    usual.
+    """
+
+    def __init__(
+        self,
+        entries: dict[
+            str,
+            dict[StepPosition, tuple[str, SparqlResult | ResultSketch]],
+        ] | None = None,
+    ):
+        self.entries = entries or {}
+
+    def for_question(
+        self,
+        question: dict,
+    ) -> dict[StepPosition, SparqlResult | ResultSketch]:
+        """Return the compiled results of the reference steps of a question"""
+        question_entries = self.entries.get(question.get("id"), {})
+        results = {}
+        for (group_idx, step_idx), (step_hash, result) in \
+            question_entries.items():
+            try:
+                reference_step = \
+                    question["reference_steps"][group_idx][step_idx]
+            except (KeyError, IndexError):
+                continue
+            if is_compilable(reference_step) \
+                and compute_step_hash(reference_step) == step_hash:
+                results[(group_idx, step_idx)] = result
+            else:
+                logger.warning(
+                    "Compiled reference step %d of group %d of question %s "
+                    "is stale",
+                    step_idx,
+                    group_idx,
+                    question.get("id"),
+                )
+        return results
+
+    def save(self, path: str | Path) -> None:
+        entries = []
+        for question_id, question_entries in self.entries.items():
+            for (group_idx, step_idx), (step_hash, result) in \
+                question_entries.items():
+                entry = {
+                    "question_id": question_id,
+                    "group": group_idx,
+                    "step": step_idx,
+                    "hash": step_hash,
+                }
+                if isinstance(result, ResultSketch):
+                    entry["sketch"] = result.to_json()
+                else:
+                    entry.update(
+                        vars=result.vars,
+                        boolean=result.boolean,
+                        num_rows=result.num_rows,
+                        columns=result.columns,
+                    )
+                entries.append(entry)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": FORMAT_VERSION, "entries": entries},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CompiledReferences":
+        with open(path, encoding="utf-8") as f:
+            data: dict[str, Any] = json.load(f)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported compiled references version "
+                f"{data.get('version')} in {path}"
+            )
+        entries = {}
+        for entry in data["entries"]:
+            if "sketch" in entry:
+                result = ResultSketch.from_json(entry["sketch"])
+            else:
+                result = SparqlResult(entry["vars"], entry["boolean"])
+                result.num_rows = entry["num_rows"]
+                result.columns = entry["columns"]
+            entries.setdefault(entry["question_id"], {})[
+                (entry["group"], entry["step"])
+            ] = (entry["hash"], result)
+        return cls(entries)
+
+
+def compile_references(qa_dataset: list[dict]) -> CompiledReferences:
+    """
+    Parse the outputs of the SPARQL reference steps of the Q&A dataset once,
+    so that evaluation runs only need to parse the actual steps. The result
+    can be saved and loaded for later runs.
+    """
+    entries = {}
+    for template in qa_dataset:
+        for question in template["questions"]:
+            for group_idx, group in enumerate(
+                question.get("reference_steps", [])
+            ):
+                for step_idx, reference_step in enumerate(group):
+                    if not is_compilable(reference_step):
+                        continue
+                    try:
+                        result = compile_reference_step(reference_step)
+                    except json.JSONDecodeError:
+                        # Reported when the step is compared
+                        continue
+                    entries.setdefault(question["id"], {})[
+                        (group_idx, step_idx)
+                    ] = (compute_step_hash(reference_step), result)
+    return CompiledReferences(entries)
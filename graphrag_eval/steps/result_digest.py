@@ -0,0 +1,169 @@
+"""
+Canonical digests of SPARQL SELECT and ASK results. A step can carry the
+digest of its output as `output_digest` instead of the output itself, and
+two results are equal as sets or multisets of rows, up to the names and
+order of their columns, exactly when their digests match.
+"""
+import hashlib
+import itertools
+import math
+from typing import Any
+
+from .sparql import SparqlResult, parse_sparql_results_json
+
+DIGEST_VERSION = 1
+# Results with more orders of columns with the same values than this have no
+# row digests, and are compared by their outputs
+MAX_DIGEST_ALTERNATIVES = 24
+MODULUS = 1 << 128
+
+
+def _cell_digests(values: list, digests: dict[str, bytes]) -> list[bytes]:
+    cells = []
+    for value in values:
+        # Values are compared by their string forms, as in `compare_values`
+        text = str(value)
+        cell = digests.get(text)
+        if cell is None:
+            cell = digests[text] = hashlib.blake2b(
+                text.encode("utf-8"), digest_size=16
+            ).digest()
+        cells.append(cell)
+    return cells
+
+
+def _sum_digests(digests) -> str:
+    """An order-independent digest of a multiset of digests"""
+    total = sum(int.from_bytes(digest, "big") for digest in digests)
+    return format(total % MODULUS, "032x")
+
+
+def _row_digest_alternatives(
+    cell_columns: list[list[bytes]],
+    column_digests: list[str],
+    ignore_duplicates: bool,
+) -> list[str] | None:
+    """
+    Digests the rows with the columns in the order of their digests. Columns
+    with the same digest can be in any order, so the rows are digested in
+    each of their orders.
+    """
+    groups = [
+        list(group)
+        for _, group in itertools.groupby(
+            sorted(range(len(cell_columns)), key=column_digests.__getitem__),
+            key=column_digests.__getitem__,
+        )
+    ]
+    num_alternatives = math.prod(
+        math.factorial(len(group)) for group in groups
+    )
+    if num_alternatives > MAX_DIGEST_ALTERNATIVES:
+        return None
+    alternatives = set()
+    for permutations in itertools.product(
+        *(itertools.permutations(group) for group in groups)
+    ):
+        order = [position for group in permutations for position in group]
+        row_digests = (
+            hashlib.blake2b(b"".join(row), digest_size=16).digest()
+            for row in zip(*(cell_columns[position] for position in order))
+        )
+        if ignore_duplicates:
+            row_digests = set(row_digests)
+        alternatives.add(_sum_digests(row_digests))
+    return sorted(alternatives)
+
+
+def compute_result_digest(
+    result: str | dict | SparqlResult,
+    vars_: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Computes the digest of a SELECT or ASK query result, given as SPARQL
+    JSON text, the decoded JSON or a `SparqlResult`, over the columns
+    `vars_`, by default all variables of the result. The digest of a
+    reference step must be over its `required_columns`.
+
+    The digest has the digests of the columns as sets and as multisets of
+    values, in sorted order, and of the rows as sets and as multisets, with
+    the columns in that order.
+    """
+    if isinstance(result, str):
+        result = parse_sparql_results_json(result)
+    elif isinstance(result, dict):
+        result = SparqlResult.from_json(result)
+    vars_ = list(result.vars if vars_ is None else vars_)
+    digest = {
+        "version": DIGEST_VERSION,
+        "boolean": result.boolean,
+        "num_rows": result.num_rows,
+        "num_columns": len(vars_),
+    }
+    if result.boolean is not None:
+        return digest
+
+    cell_digests: dict[str, bytes] = {}
+    cell_columns = [
+        _cell_digests(result.get_column(var), cell_digests) for var in vars_
+    ]
+    digest["columns"] = {}
+    digest["rows"] = {}
+    for mode, ignore_duplicates in (("set", True), ("multiset", False)):
+        column_digests = [
+            _sum_digests(set(cells) if ignore_duplicates else cells)
+            for cells in cell_columns
+        ]
+        digest["columns"][mode] = sorted(column_digests)
+        digest["rows"][mode] = _row_digest_alternatives(
+            cell_columns, column_digests, ignore_duplicates
+        )
+    return digest
+
+
+def compare_result_digests(
+    reference_digest: dict[str, Any],
+    actual_digest: dict[str, Any],
+    ignore_duplicates: bool = True,
+) -> float | None:
+    """
+    Scores the actual result against the reference result by their digests,
+    like `compare_sparql_results` for unordered results. Returns None if
+    the digests cannot decide, because of a different version, extra actual
+    columns or too many orders of columns with the same values.
+    """
+    if reference_digest.get("version") != DIGEST_VERSION \
+        or actual_digest.get("version") != DIGEST_VERSION:
+        return None
+
+    # ASK
+    if reference_digest["boolean"] is not None:
+        return float(
+            actual_digest["boolean"] is not None
+            and reference_digest["boolean"] == actual_digest["boolean"]
+        )
+
+    reference_num_rows = reference_digest["num_rows"]
+    actual_num_rows = actual_digest["num_rows"]
+    reference_num_columns = reference_digest["num_columns"]
+    actual_num_columns = actual_digest["num_columns"]
+    if not actual_num_rows and not reference_num_rows:
+        return float(actual_num_columns >= reference_num_columns)
+    elif not actual_num_rows or not reference_num_rows:
+        return 0.0
+    if reference_num_columns > actual_num_columns:
+        return 0.0
+    if reference_num_columns == 0:
+        return 1.0
+    if reference_num_columns < actual_num_columns:
+        # Which actual columns to drop is only known from the output
+        return None
+
+    mode = "set" if ignore_duplicates else "multiset"
+    if reference_digest["columns"][mode] != actual_digest["columns"][mode]:
+        return 0.0
+    reference_rows = reference_digest["rows"][mode]
+    actual_rows = actual_digest["rows"][mode]
+    if reference_rows is None or actual_rows is None:
+        return None
+    return float(not set(reference_rows).isdisjoint(actual_rows))
@@ -0,0 +1,274 @@
+"""
+Approximate comparison of SPARQL SELECT results by bottom-k MinHash
+sketches: the `size` smallest hashes of the distinct rows of a result, or of
+the distinct values of a column. The Jaccard similarity of two sets of rows
+is estimated from their sketches alone, so a reference result with millions
+of rows can be sketched once and stored in place of its rows.
+"""
+import hashlib
+import heapq
+from typing import Any
+
+from .sparql import (
+    SparqlResult,
+    TermDecoder,
+    parse_sparql_results_json,
+    parse_sparql_term,
+)
+
+SKETCH_SIZE = 1024
+DEFAULT_SKETCH_THRESHOLD = 0.95
+
+
+def digest(value: Any) -> bytes:
+    """A hash of the string form of a value, which is stable across runs"""
+    return hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+
+
+def value_hash(value: Any) -> int:
+    return int.from_bytes(digest(value), "big")
+
+
+def row_hash(digests: list[bytes]) -> int:
+    # Digests have a fixed length, so different rows never join to the same
+    # bytes
+    return int.from_bytes(
+        hashlib.blake2b(b"".join(digests), digest_size=8).digest(), "big"
+    )
+
+
+class BottomK:
+    """The `size` smallest distinct hashes added so far"""
+
+    def __init__(self, size: int, hashes: list[int] | None = None):
+        self.size = size
+        self.heap = [-h for h in hashes or []]
+        heapq.heapify(self.heap)
+        self.members = set(hashes or [])
+
+    def add(self, h: int) -> None:
+        if h in self.members:
+            return
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, -h)
+            self.members.add(h)
+        elif h < -self.heap[0]:
+            self.members.discard(-heapq.heapreplace(self.heap, -h))
+            self.members.add(h)
+
+    def hashes(self) -> list[int]:
+        return sorted(self.members)
+
+
+def estimate_jaccard(
+    hashes: list[int],
+    other_hashes: list[int],
+    size: int,
+) -> float:
+    """
+    Estimates the Jaccard similarity of two sets from their bottom-k
+    sketches: the fraction of the `size` smallest hashes of their union
+    which are in both sketches
+    """
+    union = heapq.nsmallest(size, set(hashes).union(other_hashes))
+    if not union:
+        return 1.0
+    both = set(hashes).intersection(other_hashes)
+    return sum(h in both for h in union) / len(union)
+
+
+class ResultSketch:
+    """
+    Sketches of a result: of its rows over `row_vars`, and of the values of
+    each of these columns, used to map the columns of another result to
+    them. It has the interface of `SparqlResult` used by
+    `parse_sparql_results_json`, so a result can be sketched while it is
+    parsed, in one pass and without keeping its rows.
+    """
+
+    def __init__(self, row_vars: list[str], size: int = SKETCH_SIZE):
+        self.row_vars = row_vars
+        self.size = size
+        self.vars: list[str] = []
+        self.boolean: bool | None = None
+        self.num_rows = 0
+        self.rows = BottomK(size)
+        self.columns = {var: BottomK(size) for var in row_vars}
+
+    def add_row(self, values: list) -> None:
+        digests = list(map(digest, values))
+        for column, value_digest in zip(self.columns.values(), digests):
+            column.add(int.from_bytes(value_digest, "big"))
+        self.rows.add(row_hash(digests))
+        self.num_rows += 1
+
+    def add_binding(self, binding: dict, decoder: TermDecoder) -> None:
+        # Decoded values are not memoized, as there may be too many of them
+        self.add_row([
+            parse_sparql_term(binding.get(var)) for var in self.row_vars
+        ])
+
+    def to_json(self) -> dict:
+        return {
+            "row_vars": self.row_vars,
+            "size": self.size,
+            "vars": self.vars,
+            "boolean": self.boolean,
+            "num_rows": self.num_rows,
+            "rows": self.rows.hashes(),
+            "columns": {
+                var: column.hashes() for var, column in self.columns.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ResultSketch":
+        sketch = cls(data["row_vars"], data["size"])
+        sketch.vars = data["vars"]
+        sketch.boolean = data["boolean"]
+        sketch.num_rows = data["num_rows"]
+        sketch.rows = BottomK(sketch.size, data["rows"])
+        sketch.columns = {
+            var: BottomK(sketch.size, hashes)
+            for var, hashes in data["columns"].items()
+        }
+        return sketch
+
+
+def sketch_result(
+    result: SparqlResult,
+    row_vars: list[str],
+    size: int = SKETCH_SIZE,
+) -> ResultSketch:
+    sketch = ResultSketch(row_vars, size)
+    sketch.vars = result.vars
+    sketch.boolean = result.boolean
+    for row in zip(*(result.get_column(var) for var in row_vars)):
+        sketch.add_row(list(row))
+    return sketch
+
+
+def sketch_reference_step(reference_step: dict) -> ResultSketch:
+    """
+    Sketch the output of a reference step over its required columns, while
+    it is parsed.
+
+    Raises json.JSONDecodeError if the output is not a JSON object.
+    """
+    return parse_sparql_results_json(
+        reference_step["output"],
+        ResultSketch(reference_step.get("required_columns") or []),
+    )
+
+
+class ColumnSketches:
+    """
+    Sketches of the distinct values of each column of a result, made while
+    it is parsed like a `ResultSketch`, so the columns of a result can be
+    mapped to those of a reference sketch without keeping its rows.
+    """
+
+    def __init__(self, size: int = SKETCH_SIZE):
+        self.size = size
+        self.vars: list[str] = []
+        self.boolean: bool | None = None
+        self.num_rows = 0
+        self.columns: dict[str, BottomK] = {}
+        self.num_bound: dict[str, int] = {}
+
+    def add_binding(self, binding: dict, decoder: TermDecoder) -> None:
+        for var, term in binding.items():
+            column = self.columns.get(var)
+            if column is None:
+                column = self.columns[var] = BottomK(self.size)
+            column.add(value_hash(parse_sparql_term(term)))
+            self.num_bound[var] = self.num_bound.get(var, 0) + 1
+        self.num_rows += 1
+
+    def column_hashes(self, var: str) -> list[int]:
+        column = self.columns.get(var)
+        hashes = column.hashes() if column is not None else []
+        if self.num_bound.get(var, 0) < self.num_rows:
+            # Unbound values are sketched as None, as in `ResultSketch`
+            hashes = sorted(set(hashes).union([value_hash(None)]))
+        return hashes[:self.size]
+
+
+def sketch_columns(text: str) -> ColumnSketches:
+    """
+    Sketch the columns of a SPARQL results JSON output while it is parsed.
+
+    Raises json.JSONDecodeError if the output is not a JSON object.
+    """
+    return parse_sparql_results_json(text, ColumnSketches())
+
+
+def map_columns(
+    reference_sketch: ResultSketch,
+    actual_columns: ColumnSketches,
+) -> list[str] | None:
+    """
+    Maps each reference column to a distinct actual column, taking the
+    pairs with the most similar values first. Returns None if there are
+    fewer actual columns than reference columns.
+    """
+    reference_vars = reference_sketch.row_vars
+    actual_vars = actual_columns.vars
+    if len(actual_vars) < len(reference_vars):
+        return None
+    size = min(reference_sketch.size, actual_columns.size)
+    actual_hashes = {
+        var: actual_columns.column_hashes(var) for var in actual_vars
+    }
+    pairs = sorted(
+        (
+            -estimate_jaccard(
+                reference_sketch.columns[reference_var].hashes(),
+                actual_hashes[actual_var],
+                size,
+            ),
+            reference_position,
+            actual_position,
+        )
+        for reference_position, reference_var in enumerate(reference_vars)
+        for actual_position, actual_var in enumerate(actual_vars)
+    )
+    mapping: list[str | None] = [None] * len(reference_vars)
+    used = set()
+    for _, reference_position, actual_position in pairs:
+        if mapping[reference_position] is None \
+            and actual_position not in used:
+            mapping[reference_position] = actual_vars[actual_position]
+            used.add(actual_position)
+    return mapping
+
+
+def compare_sketch(
+    reference_sketch: ResultSketch,
+    actual_columns: ColumnSketches,
+    actual_output: str,
+) -> float:
+    """
+    Returns the estimated Jaccard similarity of the sets of rows of the
+    results, under the mapping of the columns from `map_columns`. The rows
+    of the actual output are sketched in a second pass over it, once the
+    mapping is known. ASK results are compared exactly.
+    """
+    if reference_sketch.boolean is not None:
+        return float(
+            actual_columns.boolean is not None
+            and reference_sketch.boolean == actual_columns.boolean
+        )
+    if not reference_sketch.row_vars:
+        return 1.0
+    mapping = map_columns(reference_sketch, actual_columns)
+    if mapping is None:
+        return 0.0
+    actual_sketch = parse_sparql_results_json(
+        actual_output, ResultSketch(mapping, reference_sketch.size)
+    )
+    return estimate_jaccard(
+        reference_sketch.rows.hashes(),
+        actual_sketch.rows.hashes(),
+        reference_sketch.size,
+    )
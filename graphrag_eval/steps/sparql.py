@@ -1,7 +1,13 @@
-import itertools
+import json
+import logging
 import math
-from collections import Counter
-from typing import Union
+import re
+import time
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Iterable, Iterator
+from typing import Any, Callable, Union
+
+logger = logging.getLogger(__name__)
 
 XSD_NUMERIC_TYPES = {
     "http://www.w3.org/2001/XMLSchema#integer",
@@ -23,6 +29,10 @@ XSD_FLOAT_TYPES = {
 }
 XSD_BOOLEAN = "http://www.w3.org/2001/XMLSchema#boolean"
 
+NUMBER_TYPES = frozenset((int, float))
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+JSON_DECODER = json.JSONDecoder()
+
 
 def truncate(number: float, decimals: int = 0) -> float:
     """
@@ -39,96 +49,714 @@ def truncate(number: float, decimals: int = 0) -> float:
     return math.trunc(number * factor) / factor
 
 
+def decode_integer(value: str) -> Union[str, int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return value
+
+
+def decode_float(value: str) -> Union[str, float]:
+    try:
+        return truncate(float(value), 5)
+    except (ValueError, TypeError):
+        return value
+
+
+def decode_boolean(value: str) -> bool:
+    return value.lower() in ("true", "1")
+
+
+# Decoders of literal values by datatype IRI. Values of other datatypes are
+# kept as strings.
+DATATYPE_DECODERS: dict[str, Callable[[str], Any]] = {
+    **dict.fromkeys(XSD_NUMERIC_TYPES, decode_integer),
+    **dict.fromkeys(XSD_FLOAT_TYPES, decode_float),
+    XSD_BOOLEAN: decode_boolean,
+}
+LITERAL_TYPES = ("literal", "typed-literal")
+
+
 def parse_sparql_term(term: dict) -> Union[str, float, bool, None]:
     if not isinstance(term, dict):
         return term
 
-    term_type = term.get("type")
     value = term.get("value")
+    if term.get("type") in LITERAL_TYPES:
+        decoder = DATATYPE_DECODERS.get(term.get("datatype"))
+        if decoder:
+            return decoder(value)
+    return value
 
-    if term_type in ("literal", "typed-literal"):
-        datatype = term.get("datatype")
-        if not datatype:
-            return value
-
-        if datatype in XSD_NUMERIC_TYPES:
-            try:
-                return int(value)
-            except (ValueError, TypeError):
-                return value
-        elif datatype in XSD_FLOAT_TYPES:
-            try:
-                value = float(value)
-                return truncate(value, 5)
-            except (ValueError, TypeError):
-                return value
-        elif datatype == XSD_BOOLEAN:
-            return value.lower() in ("true", "1")
-        else:
-            return value
 
-    return value
+class TermDecoder:
+    """
+    Decodes the terms of a result like `parse_sparql_term`, but each distinct
+    value of a datatype is decoded once. Later occurrences get the same
+    object, so repeated IRIs and literals are stored once and numbers are
+    converted once.
+    """
+
+    def __init__(self):
+        # Decoded values by datatype and value. IRIs, blank nodes and plain
+        # literals all decode to their value, so they share the None entry.
+        self.decoded: dict[str | None, dict[str, Any]] = {None: {}}
+
+    def decode(self, term: dict) -> Union[str, float, bool, None]:
+        if not isinstance(term, dict):
+            return term
+
+        value = term.get("value")
+        datatype = None
+        if term.get("type") in LITERAL_TYPES:
+            datatype = term.get("datatype")
+            if datatype not in DATATYPE_DECODERS:
+                datatype = None
+        decoded = self.decoded.get(datatype)
+        if decoded is None:
+            decoded = self.decoded[datatype] = {}
+        try:
+            return decoded[value]
+        except KeyError:
+            pass
+        except TypeError:
+            # An unhashable value in a malformed term
+            return parse_sparql_term(term)
+        result = decoded[value] = DATATYPE_DECODERS[datatype](value) \
+            if datatype else value
+        return result
 
 
 def get_var_to_values(
     vars_: list[str],
     bindings: list[dict],
 ) -> dict[str, list]:
+    decoder = TermDecoder()
     var_to_values = {}
     for var in vars_:
         var_to_values[var] = []
         for binding in bindings:
             if var in binding:
-                var_to_values[var].append(parse_sparql_term(binding[var]))
+                var_to_values[var].append(decoder.decode(binding[var]))
             else:
                 var_to_values[var].append(None)
     return dict(var_to_values)
 
 
-def convert_table_dict2lines(
-    reference_vars: Union[list[str], tuple[str, ...]],
+class SparqlResult:
+    """
+    A SELECT or ASK query result, with the bindings held as columns of
+    parsed terms. `vars_` are the variables in the head of the result, while
+    `columns` has a column for each variable bound in any row.
+    """
+
+    def __init__(
+        self,
+        vars_: list[str] | None = None,
+        boolean: bool | None = None,
+    ):
+        self.vars = vars_ or []
+        self.boolean = boolean
+        self.columns: dict[str, list] = {}
+        self.num_rows = 0
+
+    @classmethod
+    def from_json(cls, sparql_result: dict) -> "SparqlResult":
+        result = cls(
+            sparql_result.get("head", {}).get("vars", []),
+            sparql_result.get("boolean"),
+        )
+        decoder = TermDecoder()
+        for binding in sparql_result.get("results", {}).get("bindings", []):
+            result.add_binding(binding, decoder)
+        return result
+
+    def add_binding(self, binding: dict, decoder: TermDecoder) -> None:
+        for var, term in binding.items():
+            column = self.columns.get(var)
+            if column is None:
+                column = self.columns[var] = [None] * self.num_rows
+            column.append(decoder.decode(term))
+        self.num_rows += 1
+        if len(binding) < len(self.columns):
+            for column in self.columns.values():
+                if len(column) < self.num_rows:
+                    column.append(None)
+
+    def get_column(self, var: str) -> list:
+        return self.columns.get(var) or [None] * self.num_rows
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    return WHITESPACE.match(text, pos).end()
+
+
+def _expect(text: str, pos: int, char: str) -> int:
+    pos = _skip_whitespace(text, pos)
+    if not text.startswith(char, pos):
+        raise json.JSONDecodeError(f"Expecting '{char}'", text, pos)
+    return pos + 1
+
+
+def _decode_value(text: str, pos: int) -> tuple[Any, int]:
+    return JSON_DECODER.raw_decode(text, _skip_whitespace(text, pos))
+
+
+def _parse_object(
+    text: str,
+    pos: int,
+    parse_member: Callable[[str, int], int],
+) -> int:
+    """
+    Parses the JSON object at `pos`. For each member, `parse_member` is
+    called with the key and the position of the value, and returns the
+    position after the value. Returns the position after the object.
+    """
+    pos = _expect(text, pos, "{")
+    if text.startswith("}", _skip_whitespace(text, pos)):
+        return _skip_whitespace(text, pos) + 1
+    while True:
+        key, pos = _decode_value(text, pos)
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name", text, pos)
+        pos = _expect(text, pos, ":")
+        pos = _skip_whitespace(text, parse_member(key, pos))
+        if not text.startswith(",", pos):
+            return _expect(text, pos, "}")
+        pos += 1
+
+
+def _parse_array(
+    text: str,
+    pos: int,
+    parse_item: Callable[[int], int],
+) -> int:
+    pos = _expect(text, pos, "[")
+    if text.startswith("]", _skip_whitespace(text, pos)):
+        return _skip_whitespace(text, pos) + 1
+    while True:
+        pos = _skip_whitespace(text, parse_item(pos))
+        if not text.startswith(",", pos):
+            return _expect(text, pos, "]")
+        pos += 1
+
+
+def parse_sparql_results_json(
+    text: str,
+    result: SparqlResult | None = None,
+) -> SparqlResult:
+    """
+    Parses a SELECT or ASK query result in the SPARQL 1.1 Query Results JSON
+    Format. The bindings are decoded one at a time and added to the columns,
+    so the JSON tree of the whole result is never built.
+
+    The bindings can be added to another `result` with the same interface
+    instead, such as a `ResultSketch`.
+
+    Raises json.JSONDecodeError if the text is not a JSON object.
+    """
+    result = result if result is not None else SparqlResult()
+    decoder = TermDecoder()
+
+    def parse_binding(pos: int) -> int:
+        binding, pos = _decode_value(text, pos)
+        if not isinstance(binding, dict):
+            raise json.JSONDecodeError("Expecting binding object", text, pos)
+        result.add_binding(binding, decoder)
+        return pos
+
+    def parse_results_member(key: str, pos: int) -> int:
+        if key == "bindings":
+            return _parse_array(text, pos, parse_binding)
+        return _decode_value(text, pos)[1]
+
+    def parse_member(key: str, pos: int) -> int:
+        if key == "results":
+            return _parse_object(text, pos, parse_results_member)
+        value, pos = _decode_value(text, pos)
+        if key == "head" and isinstance(value, dict):
+            result.vars = value.get("vars", [])
+        elif key == "boolean":
+            result.boolean = value
+        return pos
+
+    pos = _skip_whitespace(text, _parse_object(text, 0, parse_member))
+    if pos != len(text):
+        raise json.JSONDecodeError("Extra data", text, pos)
+    return result
+
+
+def encode_columns(
+    var_to_values: dict[str, list],
+    vars_: Union[list[str], tuple[str, ...]],
+    value_ids: dict[str, int],
+) -> dict[str, list[int]]:
+    """
+    Encodes each value of the columns as the integer ID of its string form.
+    The IDs are taken from `value_ids`, which is extended with unseen values,
+    so tables encoded with the same dictionary can be compared by ID.
+    """
+    return {
+        var: [
+            value_ids.setdefault(str(value), len(value_ids))
+            for value in var_to_values[var]
+        ]
+        for var in vars_
+    }
+
+
+def column_signature(
+    values: list[int],
+    ignore_duplicates: bool,
+) -> Hashable:
+    """
+    Returns a canonical signature of a column of value IDs: the set or the
+    multiset of its values. If two tables are equal, each column of one has
+    the same signature as the matching column of the other, so only columns
+    with equal signatures need to be paired.
+    """
+    if ignore_duplicates:
+        return frozenset(values)
+    return frozenset(Counter(values).items())
+
+
+def table_key(
+    var_to_ids: dict[str, list[int]],
+    vars_: Union[list[str], tuple[str, ...]],
+    ignore_duplicates: bool,
+) -> set | Counter:
+    """Returns the rows of the columns in the form in which they are compared"""
+    rows = zip(*(var_to_ids[var] for var in vars_))
+    if ignore_duplicates:
+        return set(rows)
+    return Counter(rows)
+
+
+def table_fingerprint(
+    var_to_ids: dict[str, list[int]],
+    vars_: Union[list[str], tuple[str, ...]],
+    ignore_duplicates: bool,
+) -> tuple[int, int]:
+    """
+    Returns an order-independent fingerprint of the rows of the columns: the
+    sum of the row hashes and the number of rows, or of the distinct rows if
+    duplicates are ignored. Equal tables have equal fingerprints, so tables
+    need to be compared exactly only when their fingerprints are equal.
+    """
+    # zip reuses its row tuple when it is not kept, so no rows are stored
+    row_hashes = map(hash, zip(*(var_to_ids[var] for var in vars_)))
+    if ignore_duplicates:
+        distinct_row_hashes = set(row_hashes)
+        return sum(distinct_row_hashes), len(distinct_row_hashes)
+    num_rows = len(var_to_ids[vars_[0]]) if vars_ else 0
+    return sum(row_hashes), num_rows
+
+
+def has_complete_matching(
+    candidates: list[list[str]],
+    used: set[str],
+) -> bool:
+    """
+    Returns whether each reference column can be assigned a distinct actual
+    column among its candidates, excluding the `used` ones. Uses Kuhn's
+    augmenting path algorithm for bipartite matching.
+    """
+    matched: dict[str, int] = {}
+
+    def augment(position: int, visited: set[str]) -> bool:
+        for var in candidates[position]:
+            if var in used or var in visited:
+                continue
+            visited.add(var)
+            if var not in matched or augment(matched[var], visited):
+                matched[var] = position
+                return True
+        return False
+
+    return all(
+        augment(position, set()) for position in range(len(candidates))
+    )
+
+
+def candidate_assignments(
+    candidates: list[list[str]],
+) -> Iterator[tuple[str, ...]]:
+    """
+    Yields the assignments of distinct actual columns to the reference
+    columns, where each reference column gets one of its candidates. The
+    columns with the fewest candidates are assigned first, and a branch is
+    abandoned as soon as the remaining columns have no complete matching.
+    """
+    order = sorted(range(len(candidates)), key=lambda i: len(candidates[i]))
+    assignment: list[str | None] = [None] * len(candidates)
+    used: set[str] = set()
+
+    def assign(depth: int) -> Iterator[tuple[str, ...]]:
+        if depth == len(order):
+            yield tuple(assignment)
+            return
+        position = order[depth]
+        remaining = [candidates[i] for i in order[depth + 1:]]
+        for var in candidates[position]:
+            if var in used:
+                continue
+            used.add(var)
+            if has_complete_matching(remaining, used):
+                assignment[position] = var
+                yield from assign(depth + 1)
+            used.remove(var)
+
+    if has_complete_matching(candidates, used):
+        yield from assign(0)
+
+
+def rows_with_sorted_groups(
+    var_to_ids: dict[str, list[int]],
+    var_groups: list[list[str]],
+    ignore_duplicates: bool,
+) -> set | Counter:
+    """
+    Returns the rows of the columns, with the values of each group of
+    columns sorted, so the order of the columns within a group is ignored
+    """
+    bounds = []
+    start = 0
+    for group in var_groups:
+        bounds.append((start, start + len(group)))
+        start += len(group)
+    columns = [var_to_ids[var] for group in var_groups for var in group]
+    rows = (
+        tuple(tuple(sorted(row[start:end])) for start, end in bounds)
+        for row in zip(*columns)
+    )
+    if ignore_duplicates:
+        return set(rows)
+    return Counter(rows)
+
+
+def compare_tied_columns(
+    reference_var_to_ids: dict[str, list[int]],
+    reference_vars: list[str],
+    actual_var_to_ids: dict[str, list[int]],
+    candidates: list[list[str]],
+    ignore_duplicates: bool,
+) -> bool:
+    """
+    Compares the tables without trying the mappings of the columns. The
+    reference columns with the same candidates are tied, and the rows are
+    compared with the values of the tied columns sorted, which holds if
+    some mapping makes the tables equal. Returns False if there are more
+    candidates than tied columns, as the actual columns to leave out are
+    unknown.
+    """
+    var_groups = defaultdict(list)
+    for var, var_candidates in zip(reference_vars, candidates):
+        var_groups[tuple(var_candidates)].append(var)
+    if any(
+        len(var_candidates) != len(group)
+        for var_candidates, group in var_groups.items()
+    ):
+        return False
+    return rows_with_sorted_groups(
+        reference_var_to_ids, list(var_groups.values()), ignore_duplicates
+    ) == rows_with_sorted_groups(
+        actual_var_to_ids, [list(group) for group in var_groups],
+        ignore_duplicates,
+    )
+
+
+class ComparisonBudget:
+    """
+    Limits the work of one comparison of results, as the number of column
+    mappings compared and the CPU time spent.
+    """
+
+    def __init__(
+        self,
+        max_mappings: int | None = None,
+        max_seconds: float | None = None,
+        clock: Callable[[], float] = time.process_time,
+    ):
+        self.max_mappings = max_mappings
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.started_at = clock()
+        self.mappings = 0
+        self.exceeded = False
+
+    def spend(self) -> bool:
+        """
+        Account for comparing one more mapping. Returns False if the budget
+        does not allow it.
+        """
+        self.mappings += 1
+        if (
+            self.max_mappings is not None
+            and self.mappings > self.max_mappings
+        ) or (
+            self.max_seconds is not None
+            and self.clock() - self.started_at > self.max_seconds
+        ):
+            self.exceeded = True
+        return not self.exceeded
+
+
+def is_number(value: Any) -> bool:
+    # Decoded numbers are exactly int or float, and booleans are not numbers
+    return value.__class__ in NUMBER_TYPES and value == value  # not NaN
+
+
+class Tolerance:
+    """
+    How far apart two numbers may be and still be taken as equal, as in
+    `math.isclose`. Other values are equal if their string forms are equal.
+
+    The numbers equal to a number form an interval, and the bounds of the
+    interval grow with the number. So two sorted lists of numbers can be
+    paired up within tolerance if and only if the numbers at the same
+    positions are equal, and the lists can be compared by a linear merge.
+    """
+
+    def __init__(self, absolute: float = 0.0, relative: float = 0.0):
+        if absolute < 0 or relative < 0:
+            raise ValueError("tolerances must be zero or positive")
+        self.absolute = absolute
+        self.relative = relative
+
+    def __bool__(self) -> bool:
+        return bool(self.absolute or self.relative)
+
+    def equal(self, value: Any, other: Any) -> bool:
+        if is_number(value) and is_number(other):
+            return math.isclose(
+                value, other, rel_tol=self.relative, abs_tol=self.absolute
+            )
+        return str(value) == str(other)
+
+    def rows_equal(self, row: tuple, other: tuple) -> bool:
+        return all(map(self.equal, row, other))
+
+    def clusters(self, numbers: Iterable) -> dict[Any, int]:
+        """
+        Numbers the clusters of consecutive equal numbers. Two equal numbers
+        are always in the same cluster, but a cluster can also contain
+        numbers which are not equal, through the numbers between them.
+        """
+        clusters = {}
+        cluster = -1
+        previous = None
+        for number in sorted(set(numbers)):
+            if previous is None or not self.equal(previous, number):
+                cluster += 1
+            clusters[number] = cluster
+            previous = number
+        return clusters
+
+
+def distinct_sorted(
+    sorted_values: Iterable,
+    equal: Callable[[Any, Any], bool],
+) -> list:
+    """Drops each value which is equal to the previous value kept"""
+    values = []
+    for value in sorted_values:
+        if not values or not equal(values[-1], value):
+            values.append(value)
+    return values
+
+
+def compare_ordered_values(
+    reference_vars: list[str],
     reference_var_to_values: dict[str, list],
-) -> list[str]:
-    """Converts a dictionary of lists (columns) into a list of row strings.
-
-    This function takes a dictionary where keys are column headers and values are
-    lists of column data. It transforms this column-oriented data into a list
-    of rows, where each row is a single string formed by concatenating the
-    string representation of its cell values.
-
-    It assumes that all lists in the `reference_var_to_values` dictionary
-    have the same length.
-
-    Args:
-        reference_vars: An ordered list or tuple of keys that defines the
-            column order for the output rows.
-        reference_var_to_values: A dictionary mapping column names (keys) to
-            lists of their corresponding values.
-
-    Returns:
-        A list of strings, where each string is a concatenation of the values
-        for a single row, ordered according to `reference_vars`.
-
-    Example:
-        >>> columns = ['name', 'age', 'city']
-        >>> data = {
-        ...     'name': ['Alice', 'Bob'],
-        ...     'age': [30, 25],
-        ...     'city': ['New York', 'Los Angeles']
-        ... }
-        >>> dict2lines(columns, data)
-        ['Alice30New York', 'Bob25Los Angeles']
-    """
-    result = []
+    actual_vars: Union[list[str], tuple[str, ...]],
+    actual_var_to_values: dict[str, list],
+    tolerance: Tolerance | None = None,
+) -> bool:
+    """
+    Returns whether each reference column is equal to a distinct actual
+    column, in the same row order. For ordered results this is the same as
+    the tables being equal, so no mapping of the columns needs to be
+    compared row by row. Columns are compared lazily and each comparison
+    stops at the first different cell.
+    """
     num_rows = len(reference_var_to_values[reference_vars[0]])
-    for row_idx in range(num_rows):
-        row = []
-        for reference_var in reference_vars:
-            val = reference_var_to_values[reference_var][row_idx]
-            val = str(val)
-            row.append(val)
-        result.append("".join(row))
-    return result
+    if any(len(actual_var_to_values[var]) != num_rows for var in actual_vars):
+        return False
+    candidates = []
+    for reference_var in reference_vars:
+        if tolerance:
+            reference_values = reference_var_to_values[reference_var]
+            candidates.append([
+                actual_var
+                for actual_var in actual_vars
+                if all(map(
+                    tolerance.equal,
+                    reference_values,
+                    actual_var_to_values[actual_var],
+                ))
+            ])
+        else:
+            reference_cells = [
+                str(value) for value in reference_var_to_values[reference_var]
+            ]
+            candidates.append([
+                actual_var
+                for actual_var in actual_vars
+                if all(
+                    reference_cell == actual_cell
+                    for reference_cell, actual_cell in zip(
+                        reference_cells,
+                        map(str, actual_var_to_values[actual_var]),
+                    )
+                )
+            ])
+        if not candidates[-1]:
+            return False
+    return has_complete_matching(candidates, set())
+
+
+def column_summary(
+    values: list,
+    ignore_duplicates: bool,
+    tolerance: Tolerance,
+) -> tuple[Hashable, list]:
+    """
+    Returns the signature of the values of a column which are not numbers
+    and the sorted numbers, with numbers equal within tolerance to the
+    previous one dropped if duplicates are ignored
+    """
+    others = [str(value) for value in values if not is_number(value)]
+    numbers = sorted(value for value in values if is_number(value))
+    if ignore_duplicates:
+        return frozenset(others), distinct_sorted(numbers, tolerance.equal)
+    return frozenset(Counter(others).items()), numbers
+
+
+def columns_are_compatible(
+    reference_summary: tuple[Hashable, list],
+    actual_summary: tuple[Hashable, list],
+    tolerance: Tolerance,
+) -> bool:
+    reference_others, reference_numbers = reference_summary
+    actual_others, actual_numbers = actual_summary
+    return reference_others == actual_others \
+        and len(reference_numbers) == len(actual_numbers) \
+        and all(map(tolerance.equal, reference_numbers, actual_numbers))
+
+
+def compare_tables_within_tolerance(
+    reference_columns: list[list],
+    actual_columns: list[list],
+    ignore_duplicates: bool,
+    tolerance: Tolerance,
+) -> bool:
+    """
+    Returns whether the rows of the tables are equal within tolerance, as
+    sets or multisets. The numbers of each pair of columns are replaced by
+    their clusters (see `Tolerance.clusters`), so equal rows have equal keys,
+    and only the rows with the same key are compared. They are paired up by
+    sorting, which finds a pairing if there is one when the rows have at
+    most one number each.
+    """
+    clusters = [
+        tolerance.clusters(
+            value
+            for value in reference_column + actual_column
+            if is_number(value)
+        )
+        for reference_column, actual_column in zip(
+            reference_columns, actual_columns
+        )
+    ]
+
+    def group_rows(columns: list[list]) -> dict[tuple, list[tuple]]:
+        # Other values are compared by their string forms, which are their
+        # own keys
+        cell_columns = [
+            [value if is_number(value) else str(value) for value in column]
+            for column in columns
+        ]
+        key_columns = [
+            list(map(column_clusters.get, cells, cells))
+            for cells, column_clusters in zip(cell_columns, clusters)
+        ]
+        groups = defaultdict(list)
+        for key, row in zip(zip(*key_columns), zip(*cell_columns)):
+            groups[key].append(row)
+        return groups
+
+    reference_groups = group_rows(reference_columns)
+    actual_groups = group_rows(actual_columns)
+    if reference_groups.keys() != actual_groups.keys():
+        return False
+    for key, reference_rows in reference_groups.items():
+        reference_rows = sorted(reference_rows)
+        actual_rows = sorted(actual_groups[key])
+        if ignore_duplicates:
+            reference_rows = distinct_sorted(
+                reference_rows, tolerance.rows_equal
+            )
+            actual_rows = distinct_sorted(actual_rows, tolerance.rows_equal)
+        if len(reference_rows) != len(actual_rows) or not all(
+            map(tolerance.rows_equal, reference_rows, actual_rows)
+        ):
+            return False
+    return True
+
+
+def compare_values_within_tolerance(
+    reference_vars: list[str],
+    reference_var_to_values: dict[str, list],
+    actual_vars: Union[list[str], tuple[str, ...]],
+    actual_var_to_values: dict[str, list],
+    ignore_duplicates: bool,
+    tolerance: Tolerance,
+    budget: ComparisonBudget | None = None,
+) -> bool:
+    """
+    Like `compare_values` for unordered results, but numbers are compared
+    within tolerance. Pairs of columns are compared by a linear merge of
+    their sorted numbers, and mappings of the columns by
+    `compare_tables_within_tolerance`, so no rows are compared pairwise.
+    """
+    actual_summaries = {
+        var: column_summary(
+            actual_var_to_values[var], ignore_duplicates, tolerance
+        )
+        for var in actual_vars
+    }
+    candidates = []
+    for reference_var in reference_vars:
+        reference_summary = column_summary(
+            reference_var_to_values[reference_var],
+            ignore_duplicates,
+            tolerance,
+        )
+        candidates.append([
+            actual_var
+            for actual_var in actual_vars
+            if columns_are_compatible(
+                reference_summary, actual_summaries[actual_var], tolerance
+            )
+        ])
+
+    reference_columns = [reference_var_to_values[var] for var in reference_vars]
+    for assignment in candidate_assignments(candidates):
+        if budget is not None and not budget.spend():
+            logger.warning(
+                "Comparison budget exceeded after %d column mappings, "
+                "the results are taken as different",
+                budget.mappings - 1,
+            )
+            return False
+        if compare_tables_within_tolerance(
+            reference_columns,
+            [actual_var_to_values[var] for var in assignment],
+            ignore_duplicates,
+            tolerance,
+        ):
+            return True
+    return False
 
 
 def compare_values(
@@ -138,70 +766,174 @@ def compare_values(
     actual_var_to_values: dict[str, list],
     results_are_ordered: bool,
     ignore_duplicates: bool,
+    columnar_row_threshold: int | None = None,
+    budget: ComparisonBudget | None = None,
+    tolerance: Tolerance | None = None,
 ) -> bool:
-    if len(reference_vars) < len(actual_vars):
-        for combination in itertools.combinations(actual_vars, len(reference_vars)):
-            if compare_values(
+    """
+    Returns whether the reference columns are equal to some of the actual
+    columns, in some order. Ordered results are compared column by column,
+    see `compare_ordered_values`. If numbers are compared within a
+    `tolerance`, see `compare_values_within_tolerance`. Otherwise, if either
+    table has at least `columnar_row_threshold` rows and numpy is installed,
+    the tables are compared with vectorized operations.
+
+    If the `budget` runs out before a matching mapping of the columns is
+    found, the result is approximated by `compare_tied_columns`, or the
+    tables are taken as different if numbers are compared within a
+    tolerance. The budget is then marked as exceeded.
+    """
+    if results_are_ordered and reference_vars:
+        return compare_ordered_values(
+            reference_vars,
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            tolerance,
+        )
+    if tolerance:
+        return compare_values_within_tolerance(
+            reference_vars,
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            ignore_duplicates,
+            tolerance,
+            budget,
+        )
+
+    # Values are compared by the IDs of their string forms, so each value is
+    # converted once per table rather than once per compared assignment
+    value_ids: dict[str, int] = {}
+    reference_var_to_ids = encode_columns(
+        reference_var_to_values, reference_vars, value_ids
+    )
+    actual_var_to_ids = encode_columns(
+        actual_var_to_values, actual_vars, value_ids
+    )
+    get_signature, get_table_key = column_signature, table_key
+    get_fingerprint = table_fingerprint
+
+    num_rows = max((
+        len(var_to_ids[vars_[0]])
+        for vars_, var_to_ids in (
+            (reference_vars, reference_var_to_ids),
+            (actual_vars, actual_var_to_ids),
+        )
+        if vars_
+    ), default=0)
+    if columnar_row_threshold is not None \
+        and reference_vars \
+        and num_rows >= columnar_row_threshold:
+        try:
+            from . import sparql_columnar
+        except ImportError:
+            logger.debug("numpy is not installed, comparing results by rows")
+        else:
+            reference_var_to_ids = sparql_columnar.to_arrays(
+                reference_var_to_ids
+            )
+            actual_var_to_ids = sparql_columnar.to_arrays(actual_var_to_ids)
+            get_signature = sparql_columnar.column_signature
+            get_table_key = sparql_columnar.table_key
+            get_fingerprint = sparql_columnar.table_fingerprint
+
+    # Only actual columns with the signature of a reference column can be
+    # assigned to it, which is usually very few of them
+    actual_var_groups = defaultdict(list)
+    for var in actual_vars:
+        signature = get_signature(actual_var_to_ids[var], ignore_duplicates)
+        actual_var_groups[signature].append(var)
+    candidates = [
+        actual_var_groups.get(
+            get_signature(reference_var_to_ids[var], ignore_duplicates),
+            [],
+        )
+        for var in reference_vars
+    ]
+
+    # Mappings are screened by their fingerprints, and the tables are only
+    # built for the mappings which pass
+    reference_fingerprint = get_fingerprint(
+        reference_var_to_ids, reference_vars, ignore_duplicates
+    )
+    reference_table = None
+    for assignment in candidate_assignments(candidates):
+        if budget is not None and not budget.spend():
+            logger.warning(
+                "Comparison budget exceeded after %d column mappings, "
+                "comparing the rows with the values of tied columns sorted",
+                budget.mappings - 1,
+            )
+            return compare_tied_columns(
+                reference_var_to_ids,
                 reference_vars,
-                reference_var_to_values,
-                combination,
-                actual_var_to_values,
-                results_are_ordered,
+                actual_var_to_ids,
+                candidates,
                 ignore_duplicates,
-            ):
-                return True
-        return False
-
-    table = convert_table_dict2lines(reference_vars, reference_var_to_values)
-    for permutation in itertools.permutations(actual_vars):
-        actual_table = convert_table_dict2lines(permutation, actual_var_to_values)
-        if (results_are_ordered and table == actual_table) or \
-            ((not results_are_ordered) and ignore_duplicates and set(table) == set(actual_table)) or \
-            ((not results_are_ordered) and (not ignore_duplicates) and Counter(table) == Counter(actual_table)):
+            )
+        if reference_fingerprint != get_fingerprint(
+            actual_var_to_ids, assignment, ignore_duplicates
+        ):
+            continue
+        if reference_table is None:
+            reference_table = get_table_key(
+                reference_var_to_ids, reference_vars, ignore_duplicates
+            )
+        if reference_table == get_table_key(
+            actual_var_to_ids, assignment, ignore_duplicates
+        ):
             return True
 
     return False
 
 
 def compare_sparql_results(
-    reference_sparql_result: dict,
-    actual_sparql_result: dict,
+    reference_sparql_result: dict | SparqlResult,
+    actual_sparql_result: dict | str | SparqlResult,
     required_vars: list[str],
     results_are_ordered: bool = False,
     ignore_duplicates: bool = True,
+    columnar_row_threshold: int | None = None,
+    budget: ComparisonBudget | None = None,
+    tolerance: Tolerance | None = None,
 ) -> float:
     # DESCRIBE results
     if isinstance(actual_sparql_result, str):
         return 0.0
+    if isinstance(reference_sparql_result, dict):
+        reference_sparql_result = SparqlResult.from_json(
+            reference_sparql_result
+        )
+    if isinstance(actual_sparql_result, dict):
+        actual_sparql_result = SparqlResult.from_json(actual_sparql_result)
 
     # ASK
-    if "boolean" in reference_sparql_result:
+    if reference_sparql_result.boolean is not None:
         return float(
-            "boolean" in actual_sparql_result
-            and reference_sparql_result["boolean"] == actual_sparql_result["boolean"]
+            actual_sparql_result.boolean is not None
+            and reference_sparql_result.boolean == actual_sparql_result.boolean
         )
 
-    reference_bindings: list[dict] = reference_sparql_result["results"]["bindings"]
-    actual_bindings: list[dict] = actual_sparql_result.get("results", dict()).get(
-        "bindings", []
-    )
-    actual_vars: list[str] = actual_sparql_result["head"].get("vars", [])
+    reference_num_rows = reference_sparql_result.num_rows
+    actual_num_rows = actual_sparql_result.num_rows
+    actual_vars: list[str] = actual_sparql_result.vars
 
-    if (not actual_bindings) and (not reference_bindings):
+    if (not actual_num_rows) and (not reference_num_rows):
         return float(len(actual_vars) >= len(required_vars))
-    elif (not actual_bindings) or (not reference_bindings):
+    elif (not actual_num_rows) or (not reference_num_rows):
         return 0.0
     if len(required_vars) > len(actual_vars):
         return 0.0
     if len(required_vars) == 0:
         return 1.0
 
-    reference_var_to_values: dict[str, list] = get_var_to_values(
-        required_vars, reference_bindings
-    )
-    actual_var_to_values: dict[str, list] = get_var_to_values(
-        actual_vars, actual_bindings
-    )
+    reference_var_to_values: dict[str, list] = {
+        var: reference_sparql_result.get_column(var) for var in required_vars
+    }
+    actual_var_to_values: dict[str, list] = {
+        var: actual_sparql_result.get_column(var) for var in actual_vars
+    }
 
     return float(
         compare_values(
@@ -211,5 +943,8 @@ def compare_sparql_results(
             actual_var_to_values,
             results_are_ordered,
             ignore_duplicates,
+            columnar_row_threshold,
+            budget,
+            tolerance,
         )
     )
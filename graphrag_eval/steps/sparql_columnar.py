@@ -0,0 +1,94 @@
+"""
+Array-backed comparison of large SPARQL results. The columns hold integer
+value IDs, as encoded by `sparql.encode_columns`, and the signatures and
+table keys are computed with vectorized operations. Signatures and keys are
+returned as bytes, so they compare equal exactly when those of the row-based
+implementation in `sparql` do.
+"""
+import numpy as np
+
+ROW_HASH_SEED = np.uint64(0x2545F4914F6CDD1D)
+
+
+def mix(values: np.ndarray) -> np.ndarray:
+    """The splitmix64 finalizer, applied to each element"""
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) \
+        * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) \
+        * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def to_arrays(
+    var_to_ids: dict[str, list[int]],
+) -> dict[str, np.ndarray]:
+    return {
+        var: np.asarray(ids, dtype=np.int64)
+        for var, ids in var_to_ids.items()
+    }
+
+
+def column_signature(
+    column: np.ndarray,
+    ignore_duplicates: bool,
+) -> bytes:
+    # Value IDs are small non-negative integers, so they are counted rather
+    # than sorted
+    counts = np.bincount(column)
+    values = np.flatnonzero(counts)
+    if ignore_duplicates:
+        return values.tobytes()
+    return np.stack((values, counts[values])).tobytes()
+
+
+def table_key(
+    var_to_column: dict[str, np.ndarray],
+    vars_: list[str] | tuple[str, ...],
+    ignore_duplicates: bool,
+) -> bytes:
+    columns = [var_to_column[var] for var in vars_]
+    if not len(columns[0]):
+        return b""
+    # Equal tables have the same largest value ID, which prefixes the key,
+    # so keys of tables with different largest IDs are never equal
+    radix = max(int(column.max()) for column in columns) + 1
+    prefix = np.int64(radix).tobytes()
+    if radix ** len(columns) <= np.iinfo(np.int64).max:
+        # Each row is packed into one integer, and the rows are sorted, so
+        # equal multisets are equal
+        row_keys = np.zeros(len(columns[0]), dtype=np.int64)
+        for column in columns:
+            row_keys = row_keys * radix + column
+        if ignore_duplicates:
+            return prefix + np.unique(row_keys).tobytes()
+        return prefix + np.sort(row_keys).tobytes()
+    matrix = np.column_stack(columns)
+    matrix = matrix[np.lexsort(matrix.T[::-1])]
+    if ignore_duplicates:
+        # Equal rows are adjacent once sorted, so only the first is kept
+        is_distinct = np.ones(len(matrix), dtype=bool)
+        is_distinct[1:] = np.any(matrix[1:] != matrix[:-1], axis=1)
+        matrix = matrix[is_distinct]
+    return prefix + matrix.tobytes()
+
+
+def table_fingerprint(
+    var_to_column: dict[str, np.ndarray],
+    vars_: list[str] | tuple[str, ...],
+    ignore_duplicates: bool,
+) -> tuple[int, int]:
+    """
+    Returns the sum of the row hashes modulo 2**64 and the number of rows,
+    or of the distinct rows if duplicates are ignored
+    """
+    if not vars_:
+        return 0, 0
+    row_hashes = np.full(
+        len(var_to_column[vars_[0]]), ROW_HASH_SEED, dtype=np.uint64
+    )
+    for var in vars_:
+        row_hashes = mix(row_hashes ^ var_to_column[var].view(np.uint64))
+    if ignore_duplicates:
+        row_hashes = np.unique(row_hashes)
+    return int(row_hashes.sum(dtype=np.uint64)), len(row_hashes)
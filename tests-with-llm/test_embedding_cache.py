@@ -0,0 +1,85 @@
+import pytest
+from ragas.embeddings.base import BaseRagasEmbedding
+
+from graphrag_eval.embedding_cache import CachedEmbedding
+from graphrag_eval.llm_factory import (
+    EmbeddingCacheConfig,
+    EmbeddingConfig,
+    GenerationConfig,
+    LLMConfig,
+    create_embedder,
+)
+
+NAMESPACE = {"provider": "openai", "model": "text-embedding-3-small"}
+
+
+class CountingEmbedding(BaseRagasEmbedding):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def embed_text(self, text, **kwargs):
+        self.texts.append(text)
+        return [float(len(text)), 0.5]
+
+    async def aembed_text(self, text, **kwargs):
+        return self.embed_text(text, **kwargs)
+
+    async def aembed_texts(self, texts, **kwargs):
+        return [self.embed_text(text, **kwargs) for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_cached_embedding_in_memory():
+    embedder = CountingEmbedding()
+    cached = CachedEmbedding(embedder, NAMESPACE)
+    assert await cached.aembed_text("question") == [8.0, 0.5]
+    assert await cached.aembed_text("question") == [8.0, 0.5]
+    assert cached.embed_text("question") == [8.0, 0.5]
+    assert await cached.aembed_texts(["q", "question", "qq"]) \
+        == [[1.0, 0.5], [8.0, 0.5], [2.0, 0.5]]
+    assert embedder.texts == ["question", "q", "qq"]
+    assert cached.stats == {"hits": 3, "misses": 3}
+
+
+@pytest.mark.asyncio
+async def test_cached_embedding_on_disk(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    embedder = CountingEmbedding()
+    await CachedEmbedding(embedder, NAMESPACE, path).aembed_text("question")
+
+    cached = CachedEmbedding(embedder, NAMESPACE, path)
+    assert await cached.aembed_text("question") == [8.0, 0.5]
+    assert embedder.texts == ["question"]
+
+    other_model = CachedEmbedding(
+        embedder, {**NAMESPACE, "model": "text-embedding-3-large"}, path
+    )
+    await other_model.aembed_text("question")
+    assert embedder.texts == ["question", "question"]
+
+
+def test_create_embedder_with_cache(tmp_path):
+    generation = GenerationConfig(provider="openai", model="gpt-4o-mini")
+    embedder = create_embedder(LLMConfig(
+        generation=generation,
+        embedding=EmbeddingConfig(
+            provider="openai",
+            model="text-embedding-3-small",
+            cache=EmbeddingCacheConfig(),
+        ),
+    ))
+    assert isinstance(embedder, CachedEmbedding)
+    assert embedder.namespace == NAMESPACE
+    assert embedder.connection is None
+    assert embedder.embedder.model == "openai/text-embedding-3-small"
+
+    embedder = create_embedder(LLMConfig(
+        generation=generation,
+        embedding=EmbeddingConfig(
+            provider="openai",
+            model="text-embedding-3-small",
+            cache=EmbeddingCacheConfig(path=str(tmp_path / "e.sqlite")),
+        ),
+    ))
+    assert embedder.connection is not None
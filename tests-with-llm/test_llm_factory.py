@@ -54,3 +54,18 @@ def test_create_llm_and_embeddings_llm_config_embedding_config():
     assert llm.model == "openai/gpt-3.5-turbo"
     assert embedder is not None
     assert embedder.model == "openai/text-embedding-ada-002"
+
+
+def test_create_llm_with_rate_limit():
+    config = LLMConfig(
+        generation=GenerationConfig(
+            provider="openai",
+            model="gpt-3.5-turbo",
+            rate_limit={"requests_per_minute": 60},
+        )
+    )
+    llm = create_llm(config)
+    assert llm is not None
+    assert llm.model == "openai/gpt-3.5-turbo"
+    assert llm.is_async
+    assert "rate_limit" not in llm.model_args
@@ -0,0 +1,196 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from graphrag_eval.steps.evaluation import (
+    StepsConfig,
+    compare_steps,
+    evaluate_steps,
+)
+from graphrag_eval.steps.sparql import (
+    ComparisonBudget,
+    Tolerance,
+    compare_values,
+)
+from ..util import sparql_step
+
+
+def columns_step(var_to_values: dict[str, list]) -> dict:
+    return sparql_step(
+        list(var_to_values), list(zip(*var_to_values.values()))
+    )
+
+
+# All columns have the same set of values, so they are all compatible, but the rows
+# differ, so no mapping of the columns makes the tables equal
+NUM_COLUMNS = 6
+reference_columns = {
+    f"r{i}": ["a", "b"] if i < NUM_COLUMNS - 1 else ["b", "a"]
+    for i in range(NUM_COLUMNS)
+}
+actual_columns = {f"a{i}": ["a", "b"] for i in range(NUM_COLUMNS)}
+
+
+def test_comparison_budget_mappings():
+    budget = ComparisonBudget(max_mappings=2)
+    assert budget.spend()
+    assert budget.spend()
+    assert not budget.spend()
+    assert budget.exceeded
+
+
+def test_comparison_budget_seconds():
+    now = 0.0
+    budget = ComparisonBudget(max_seconds=1.0, clock=lambda: now)
+    assert budget.spend()
+    now = 1.5
+    assert not budget.spend()
+    assert budget.exceeded
+
+
+def test_compare_values_within_budget():
+    budget = ComparisonBudget(max_mappings=1000)
+    assert not compare_values(
+        list(reference_columns),
+        reference_columns,
+        list(actual_columns),
+        actual_columns,
+        False,
+        True,
+        budget=budget,
+    )
+    assert not budget.exceeded
+    assert budget.mappings == 720
+
+
+# The columns are tied, and the tables are equal under a mapping which comes
+# late in the order the mappings are tried
+matching_reference_columns = {
+    f"r{i}": ["a", "b"] if i < 2 else ["b", "a"]
+    for i in range(NUM_COLUMNS)
+}
+matching_actual_columns = {
+    f"a{i}": values
+    for i, values in enumerate(reversed(matching_reference_columns.values()))
+}
+
+
+def test_compare_values_budget_exceeded():
+    budget = ComparisonBudget(max_mappings=10)
+    # The rows differ even with the values of the tied columns sorted
+    assert not compare_values(
+        list(reference_columns),
+        reference_columns,
+        list(actual_columns),
+        actual_columns,
+        False,
+        True,
+        budget=budget,
+    )
+    assert budget.exceeded
+    assert budget.mappings == 11
+
+
+@pytest.mark.parametrize("ignore_duplicates", [True, False])
+def test_compare_values_budget_exceeded_tied_columns(ignore_duplicates):
+    budget = ComparisonBudget(max_mappings=1)
+    assert compare_values(
+        list(matching_reference_columns),
+        matching_reference_columns,
+        list(matching_actual_columns),
+        matching_actual_columns,
+        False,
+        ignore_duplicates,
+        budget=budget,
+    )
+    assert budget.exceeded
+
+
+def test_compare_values_budget_exceeded_multiset():
+    reference = {f"r{i}": [0, 1, 0, 1] for i in range(6)}
+    actual = {
+        f"a{i}": [1, 0, 1, 0] if i % 2 else [0, 1, 1, 0] for i in range(6)
+    }
+    args = (list(reference), reference, list(actual), actual, False, False)
+    assert not compare_values(*args)
+    budget = ComparisonBudget(100)
+    assert not compare_values(*args, budget=budget)
+    assert budget.exceeded
+
+
+def test_compare_values_budget_exceeded_extra_columns():
+    # Which of the tied actual columns to leave out is unknown
+    actual = dict(matching_actual_columns, extra=["a", "b"])
+    budget = ComparisonBudget(max_mappings=1)
+    assert not compare_values(
+        list(matching_reference_columns),
+        matching_reference_columns,
+        list(actual),
+        actual,
+        False,
+        True,
+        budget=budget,
+    )
+    assert budget.exceeded
+    assert compare_values(
+        list(matching_reference_columns),
+        matching_reference_columns,
+        list(actual),
+        actual,
+        False,
+        True,
+    )
+
+
+def test_compare_values_within_tolerance_budget_exceeded():
+    budget = ComparisonBudget(max_mappings=1)
+    assert not compare_values(
+        list(matching_reference_columns),
+        matching_reference_columns,
+        list(matching_actual_columns),
+        matching_actual_columns,
+        False,
+        True,
+        budget=budget,
+        tolerance=Tolerance(absolute=0.1),
+    )
+    assert budget.exceeded
+
+
+def test_compare_steps_budget_exceeded():
+    reference_step = columns_step(matching_reference_columns)
+    actual_step = columns_step(matching_actual_columns)
+    config = StepsConfig(max_column_mappings=1)
+    assert compare_steps(reference_step, actual_step, config) == 1.0
+    assert actual_step["comparison_budget_exceeded"] is True
+
+    reference_step = columns_step(reference_columns)
+    actual_step = columns_step(actual_columns)
+    config = StepsConfig(max_column_mappings=10)
+    assert compare_steps(reference_step, actual_step, config) == 0.0
+    assert actual_step["comparison_budget_exceeded"] is True
+
+    # There is no budget by default
+    actual_step = columns_step(actual_columns)
+    assert compare_steps(reference_step, actual_step) == 0.0
+    assert "comparison_budget_exceeded" not in actual_step
+
+
+@pytest.mark.parametrize("use_executor", [False, True])
+@pytest.mark.asyncio
+async def test_evaluate_steps_budget_exceeded(use_executor):
+    reference = {
+        "reference_steps": [[columns_step(matching_reference_columns)]]
+    }
+    actual = {"actual_steps": [columns_step(matching_actual_columns)]}
+    config = StepsConfig(max_column_mappings=1)
+    executor = ProcessPoolExecutor(1) if use_executor else None
+    try:
+        eval_result = await evaluate_steps(
+            reference, actual, None, executor, config
+        )
+    finally:
+        if executor:
+            executor.shutdown()
+    assert eval_result["steps_score"] == 1.0
+    assert eval_result["actual_steps"][0]["comparison_budget_exceeded"] is True
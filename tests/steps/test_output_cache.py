@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from graphrag_eval.steps.evaluation import match_and_score_steps, match_group
+from graphrag_eval.steps.output_cache import StepOutputCache
+from graphrag_eval.steps.sparql import parse_sparql_results_json
+from ..util import sparql_step
+
+
+def value_step(value: str) -> dict:
+    return sparql_step(["x"], [(value,)], id=f"step-{value}")
+
+
+def test_step_output_cache():
+    step = {"output": '{"a": 1}'}
+    output_cache = StepOutputCache()
+    assert output_cache.get(step) == {"a": 1}
+    assert output_cache.get(step) == {"a": 1}
+    assert output_cache.get({"output": '{"a": 1}'}) == {"a": 1}
+    assert output_cache.get(step, str.upper) == '{"A": 1}'
+    assert output_cache.stats == {"parses": 3, "parses_avoided": 1}
+
+
+def test_step_output_cache_parse_error():
+    step = {"output": "not json"}
+    output_cache = StepOutputCache()
+    for _ in range(2):
+        with pytest.raises(json.JSONDecodeError):
+            output_cache.get(step)
+    assert output_cache.stats == {"parses": 1, "parses_avoided": 1}
+
+
+def test_step_output_cache_add():
+    step = {"output": "not json"}
+    output_cache = StepOutputCache()
+    output_cache.add(step, json.loads, {"a": 1})
+    assert output_cache.get(step) == {"a": 1}
+    assert output_cache.stats == {"parses": 0, "parses_avoided": 1}
+
+
+def test_match_group_parses_each_output_once():
+    reference_groups = [[value_step(str(i)) for i in range(4)]]
+    actual_steps = [value_step(str(i % 10)) for i in range(40)]
+    output_cache = StepOutputCache()
+    matches = match_group(
+        reference_groups, 0, actual_steps, len(actual_steps), None,
+        output_cache,
+    )
+    assert sorted(matches) == [
+        (0, 0, 30, 1.0), (0, 1, 31, 1.0), (0, 2, 32, 1.0), (0, 3, 33, 1.0),
+    ]
+    num_comparisons = output_cache.parses_avoided + output_cache.parses
+    assert output_cache.parses <= len(reference_groups[0]) + len(actual_steps)
+    assert num_comparisons > 2 * output_cache.parses
+
+
+def test_match_and_score_steps_uses_reference_results():
+    reference_step = value_step("a")
+    reference_result = parse_sparql_results_json(reference_step["output"])
+    reference_step["output"] = "not parsed"
+    matches, score, annotations = match_and_score_steps(
+        [[reference_step]],
+        [value_step("a")],
+        reference_results={(0, 0): reference_result},
+    )
+    assert score == 1.0
+    assert matches == [(0, 0, 0, 1.0)]
+    assert annotations == {}
@@ -0,0 +1,247 @@
+import math
+import random
+
+import pytest
+
+from graphrag_eval.steps.evaluation import compare_steps
+from graphrag_eval.steps.rdf import (
+    RDF,
+    XSD,
+    CanonicalGraph,
+    RdfSyntaxError,
+    graphs_are_isomorphic,
+    parse_ntriples,
+    parse_turtle,
+)
+
+TURTLE = """
+@prefix ex: <http://example.com/> .
+PREFIX schema: <https://schema.org/>
+@base <http://example.com/base/> .
+
+ex:alice a schema:Person ;
+    schema:name "Alice"@EN , "Alicia" ;
+    schema:age 42 ;
+    schema:height 1.7 ;
+    schema:weight 6.5e1 ;
+    schema:member true ;
+    schema:knows [ schema:name 'Bob' ] ;
+    schema:children ( ex:carol <dave> ) ;
+    schema:description \"\"\"Line 1
+Line ""2"" end\"\"\" ;
+    schema:birthDate "1980-01-01"^^<http://www.w3.org/2001/XMLSchema#date> ;
+    schema:url "x"^^<http://www.w3.org/2001/XMLSchema#string> ;
+.
+[ schema:name "Anonymous\\u0021" ] .
+"""
+
+NTRIPLES = """
+<http://example.com/alice> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <https://schema.org/Person> .
+<http://example.com/alice> <https://schema.org/name> "Alice"@en .
+<http://example.com/alice> <https://schema.org/name> "Alicia" .
+<http://example.com/alice> <https://schema.org/age> "42"^^<http://www.w3.org/2001/XMLSchema#integer> .
+<http://example.com/alice> <https://schema.org/height> "1.7"^^<http://www.w3.org/2001/XMLSchema#decimal> .
+<http://example.com/alice> <https://schema.org/weight> "6.5e1"^^<http://www.w3.org/2001/XMLSchema#double> .
+<http://example.com/alice> <https://schema.org/member> "true"^^<http://www.w3.org/2001/XMLSchema#boolean> .
+<http://example.com/alice> <https://schema.org/knows> _:knows .
+_:knows <https://schema.org/name> "Bob" .
+<http://example.com/alice> <https://schema.org/children> _:l1 .
+_:l1 <http://www.w3.org/1999/02/22-rdf-syntax-ns#first> <http://example.com/carol> .
+_:l1 <http://www.w3.org/1999/02/22-rdf-syntax-ns#rest> _:l2 .
+_:l2 <http://www.w3.org/1999/02/22-rdf-syntax-ns#first> <http://example.com/base/dave> .
+_:l2 <http://www.w3.org/1999/02/22-rdf-syntax-ns#rest> <http://www.w3.org/1999/02/22-rdf-syntax-ns#nil> .
+<http://example.com/alice> <https://schema.org/description> "Line 1\\nLine \\"\\"2\\"\\" end" .
+<http://example.com/alice> <https://schema.org/birthDate> "1980-01-01"^^<http://www.w3.org/2001/XMLSchema#date> .
+<http://example.com/alice> <https://schema.org/url> "x" .
+# A comment
+_:anonymous <https://schema.org/name> "Anonymous!" .
+"""
+
+
+def test_parse_turtle():
+    triples = parse_turtle(TURTLE)
+    assert len(triples) == 18
+    assert ("<http://example.com/alice>", f"<{RDF}type>",
+            "<https://schema.org/Person>") in triples
+    assert ("<http://example.com/alice>", "<https://schema.org/name>",
+            '"Alice"@en') in triples
+    assert ("<http://example.com/alice>", "<https://schema.org/age>",
+            f'"42"^^<{XSD}integer>') in triples
+    assert ("<http://example.com/alice>", "<https://schema.org/url>",
+            '"x"') in triples
+    assert ("<http://example.com/alice>", "<https://schema.org/description>",
+            '"Line 1\\nLine \\"\\"2\\"\\" end"') in triples
+
+
+def test_parse_ntriples():
+    triples = parse_ntriples(NTRIPLES)
+    assert len(triples) == 18
+    assert graphs_are_isomorphic(triples, parse_turtle(TURTLE))
+
+
+def test_parse_ntriples_falls_back_to_turtle():
+    text = (
+        "<http://x/s> <http://x/p> <http://x/o> .\n"
+        "<http://x/s> <http://x/p> [\n"
+        "    <http://x/q> 1\n"
+        "] .\n"
+    )
+    assert len(parse_ntriples(text)) == 3
+
+
+@pytest.mark.parametrize("text", [
+    "<http://x/s> <http://x/p> .",
+    "ex:s ex:p ex:o .",
+    "<http://x/s> <http://x/p> <http://x/o>",
+    '<http://x/s> <http://x/p> "\\q" .',
+    "<http://x/s> <http://x/p> { .",
+    '{"head": {"vars": []}}',
+])
+def test_parse_turtle_errors(text):
+    with pytest.raises(RdfSyntaxError):
+        parse_turtle(text)
+
+
+def test_blank_node_labels_are_ignored():
+    assert graphs_are_isomorphic(
+        parse_turtle("<http://x/s> <http://x/p> _:a . _:a <http://x/q> _:b ."),
+        parse_turtle("<http://x/s> <http://x/p> _:c . _:c <http://x/q> _:d ."),
+    )
+    assert not graphs_are_isomorphic(
+        parse_turtle("<http://x/s> <http://x/p> _:a . _:a <http://x/q> _:b ."),
+        parse_turtle("<http://x/s> <http://x/p> _:a . _:b <http://x/q> _:a ."),
+    )
+
+
+def test_blank_nodes_with_the_same_triples():
+    # Two blank nodes, distinguishable only by their neighbours
+    graph = parse_turtle("""
+        _:a <http://x/p> _:b . _:b <http://x/q> "1" .
+        _:c <http://x/p> _:d . _:d <http://x/q> "2" .
+    """)
+    other_graph = parse_turtle("""
+        _:a <http://x/p> _:b . _:b <http://x/q> "2" .
+        _:c <http://x/p> _:d . _:d <http://x/q> "1" .
+    """)
+    different_graph = parse_turtle("""
+        _:a <http://x/p> _:b . _:b <http://x/q> "1" .
+        _:c <http://x/p> _:d . _:b <http://x/q> "2" .
+    """)
+    assert graphs_are_isomorphic(graph, other_graph)
+    assert not graphs_are_isomorphic(graph, different_graph)
+    assert CanonicalGraph(graph).is_exact
+
+
+def test_canonical_graph_is_not_exact_for_regular_graphs():
+    # A cycle of six blank nodes and two cycles of three are not isomorphic,
+    # but can't be told apart by colour refinement
+    def cycles(*lengths):
+        triples = set()
+        for cycle, length in enumerate(lengths):
+            for i in range(length):
+                triples.add((
+                    f"_:c{cycle}n{i}",
+                    "<http://x/next>",
+                    f"_:c{cycle}n{(i + 1) % length}",
+                ))
+        return triples
+
+    canonical_graph = CanonicalGraph(cycles(6))
+    assert not canonical_graph.is_exact
+    assert canonical_graph == CanonicalGraph(cycles(3, 3))
+
+
+def random_graph(num_triples: int, seed: int) -> list[tuple[str, str, str]]:
+    rng = random.Random(seed)
+    triples = []
+    for i in range(num_triples):
+        subject = f"<http://x/s{rng.randrange(num_triples // 10)}>"
+        predicate = f"<http://x/p{rng.randrange(10)}>"
+        if i % 3 == 0:
+            # A tree of blank nodes
+            subject = f"_:b{(i // 3 + 1) // 2}"
+            object_ = f"_:b{i // 3 + 1}"
+        elif i % 3 == 1:
+            subject = f"_:b{rng.randrange(num_triples // 3)}"
+            object_ = f'"{rng.randrange(1000)}"'
+        else:
+            object_ = f"<http://x/o{rng.randrange(num_triples)}>"
+        triples.append((subject, predicate, object_))
+    return triples
+
+
+def relabel(triples, seed: int) -> set[tuple[str, str, str]]:
+    blank_nodes = sorted({
+        term for triple in triples for term in triple if term.startswith("_:")
+    })
+    shuffled = blank_nodes.copy()
+    random.Random(seed).shuffle(shuffled)
+    labels = {
+        blank_node: f"_:r{i}" for i, blank_node in enumerate(shuffled)
+    }
+    return {
+        tuple(labels.get(term, term) for term in triple) for triple in triples
+    }
+
+
+def assert_refinement_is_quasilinear(canonical_graph: CanonicalGraph):
+    # Each blank node changes colour at most a logarithmic number of times
+    n = canonical_graph.num_blank_nodes
+    assert canonical_graph.num_recolourings <= n * math.log2(n)
+
+
+def test_large_graphs():
+    triples = random_graph(120_000, 0)
+    graph = set(triples)
+    assert graphs_are_isomorphic(graph, relabel(triples, 1))
+    assert_refinement_is_quasilinear(CanonicalGraph(graph))
+    changed = set(triples[1:]) | {
+        (triples[0][0], "<http://x/changed>", triples[0][2])
+    }
+    assert not graphs_are_isomorphic(graph, relabel(changed, 1))
+
+
+def test_long_collection_of_identical_items():
+    # Each blank node of the collection is only told apart by its distance
+    # from the ends
+    def collection(items):
+        return parse_turtle(
+            "<http://x/s> <http://x/p> (" + " ".join(items) + ") ."
+        )
+
+    items = ["1"] * 3000
+    graph = collection(items)
+    assert graphs_are_isomorphic(graph, relabel(graph, 1))
+    canonical_graph = CanonicalGraph(graph)
+    assert canonical_graph.is_exact
+    assert_refinement_is_quasilinear(canonical_graph)
+    changed_items = items.copy()
+    changed_items[1500] = "2"
+    assert not graphs_are_isomorphic(graph, collection(changed_items))
+
+
+def rdf_step(output: str, media_type: str | None = None) -> dict:
+    step = {
+        "id": "step",
+        "name": "sparql_query",
+        "output": output,
+        "status": "success",
+    }
+    if media_type:
+        step["output_media_type"] = media_type
+    return step
+
+
+def test_compare_steps_turtle():
+    reference_step = rdf_step(TURTLE, "text/turtle")
+    assert compare_steps(reference_step, rdf_step(NTRIPLES)) == 1.0
+    assert compare_steps(reference_step, rdf_step(TURTLE)) == 1.0
+    assert compare_steps(reference_step, rdf_step(NTRIPLES[:-100])) == 0.0
+    assert compare_steps(reference_step, rdf_step('{"boolean": true}')) == 0.0
+
+
+def test_compare_steps_ntriples():
+    reference_step = rdf_step(NTRIPLES, "application/n-triples")
+    assert compare_steps(reference_step, rdf_step(NTRIPLES)) == 1.0
+    assert compare_steps(reference_step, rdf_step("")) == 0.0
+    assert compare_steps(reference_step, rdf_step("<x> .")) == 0.0
@@ -0,0 +1,140 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from graphrag_eval import CompiledReferences, compile_references, run_evaluation
+from graphrag_eval.steps import evaluation
+from graphrag_eval.steps.evaluation import compare_steps
+from graphrag_eval.steps.output_cache import StepOutputCache
+from graphrag_eval.steps.sparql import parse_sparql_results_json
+from ..util import read_responses
+
+DATA_DIR = Path(__file__).parent.parent / "test_data"
+
+reference_step = {
+    "name": "sparql_query",
+    "output": json.dumps({
+        "head": {"vars": ["x", "y"]},
+        "results": {"bindings": [
+            {"x": {"type": "literal", "value": "a"},
+             "y": {"type": "literal", "value": "b"}},
+            {"x": {"type": "literal", "value": "c"}},
+        ]},
+    }),
+    "output_media_type": "application/sparql-results+json",
+    "required_columns": ["x"],
+}
+actual_step = {
+    "name": "sparql_query",
+    "output": json.dumps({
+        "head": {"vars": ["z"]},
+        "results": {"bindings": [
+            {"z": {"type": "literal", "value": "c"}},
+            {"z": {"type": "literal", "value": "a"}},
+        ]},
+    }),
+    "status": "success",
+}
+qa_dataset = [{
+    "template_id": "t1",
+    "questions": [{
+        "id": "q1",
+        "question_text": "?",
+        "reference_steps": [
+            [{"name": "retrieval", "output": "[]"}],
+            [reference_step],
+        ],
+    }],
+}]
+
+
+def test_compile_references():
+    question = qa_dataset[0]["questions"][0]
+    results = compile_references(qa_dataset).for_question(question)
+    assert list(results) == [(1, 0)]
+    result = results[(1, 0)]
+    assert result.vars == ["x", "y"]
+    assert result.num_rows == 2
+    # Only the required columns are kept
+    assert result.columns == {"x": ["a", "c"]}
+    output_cache = StepOutputCache()
+    output_cache.add(reference_step, parse_sparql_results_json, result)
+    assert compare_steps(reference_step, actual_step, None, output_cache) == 1.0
+    assert output_cache.stats == {"parses": 1, "parses_avoided": 1}
+
+
+def test_compiled_references_save_and_load(tmp_path):
+    path = tmp_path / "references.json"
+    compile_references(qa_dataset).save(path)
+    question = qa_dataset[0]["questions"][0]
+    result = CompiledReferences.load(path).for_question(question)[(1, 0)]
+    assert result.vars == ["x", "y"]
+    assert result.boolean is None
+    assert result.num_rows == 2
+    assert result.columns == {"x": ["a", "c"]}
+
+
+def test_compiled_references_load_unsupported_version(tmp_path):
+    path = tmp_path / "references.json"
+    path.write_text('{"version": 0, "entries": []}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        CompiledReferences.load(path)
+
+
+@pytest.mark.parametrize("change", [
+    {"output": json.dumps({"head": {"vars": ["x"]}, "results": {"bindings": []}})},
+    {"required_columns": ["x", "y"]},
+])
+def test_compiled_references_stale(change, caplog):
+    compiled_references = compile_references(qa_dataset)
+    question = copy.deepcopy(qa_dataset[0]["questions"][0])
+    question["reference_steps"][1][0].update(change)
+    assert compiled_references.for_question(question) == {}
+    assert "is stale" in caplog.text
+
+
+def test_compiled_references_unknown_question():
+    compiled_references = compile_references(qa_dataset)
+    assert compiled_references.for_question({"id": "q2"}) == {}
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_with_compiled_references(tmp_path, monkeypatch):
+    reference_data = yaml.safe_load(
+        (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+    )
+    actual_responses = read_responses(DATA_DIR / "actual_responses_1.jsonl")
+    expected_evaluation_results = yaml.safe_load(
+        (DATA_DIR / "evaluation_1.yaml").read_text(encoding="utf-8")
+    )
+    path = tmp_path / "references.json"
+    compile_references(reference_data).save(path)
+
+    parse_sparql_results_json = evaluation.parse_sparql_results_json
+    parsed_outputs = []
+
+    def mock_parse_sparql_results_json(text):
+        parsed_outputs.append(text)
+        return parse_sparql_results_json(text)
+
+    monkeypatch.setattr(
+        evaluation, "parse_sparql_results_json", mock_parse_sparql_results_json
+    )
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        compiled_references=CompiledReferences.load(path),
+    )
+    assert expected_evaluation_results == evaluation_results
+    reference_outputs = {
+        step.get("output")
+        for template in reference_data
+        for question in template["questions"]
+        for group in question.get("reference_steps", [])
+        for step in group
+    }
+    assert parsed_outputs
+    assert not reference_outputs.intersection(parsed_outputs)
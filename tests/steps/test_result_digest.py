@@ -0,0 +1,191 @@
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from graphrag_eval import compute_result_digest
+from graphrag_eval.steps.evaluation import compare_steps, evaluate_steps
+from graphrag_eval.steps.output_cache import StepOutputCache
+from graphrag_eval.steps.result_digest import compare_result_digests
+from graphrag_eval.steps.sparql import SparqlResult, compare_values
+from ..util import sparql_results, sparql_step
+
+
+def reference_step(rows: list[tuple], **kwargs) -> dict:
+    return sparql_step(
+        ["a", "b", "c"], rows, required_columns=["a", "b"], **kwargs
+    )
+
+
+def digest_step(vars_: list[str], rows: list[tuple]) -> dict:
+    return {
+        "id": "actual",
+        "name": "sparql_query",
+        "output_digest": compute_result_digest(
+            json.dumps(sparql_results(vars_, rows))
+        ),
+        "status": "success",
+    }
+
+
+def result(var_to_values: dict[str, list]) -> SparqlResult:
+    sparql_result = SparqlResult(list(var_to_values))
+    sparql_result.columns = var_to_values
+    sparql_result.num_rows = len(next(iter(var_to_values.values())))
+    return sparql_result
+
+
+@pytest.mark.parametrize("ignore_duplicates", [True, False])
+def test_compare_result_digests_equals_compare_values(ignore_duplicates):
+    rng = random.Random(42)
+    num_matches = 0
+    for _ in range(400):
+        num_vars = rng.randint(1, 3)
+        num_rows = rng.randint(1, 4)
+        reference_vars = [f"r{i}" for i in range(num_vars)]
+        actual_vars = [f"a{i}" for i in range(num_vars)]
+        reference_var_to_values = {
+            var: [rng.choice("ab") for _ in range(num_rows)]
+            for var in reference_vars
+        }
+        rows = list(zip(*reference_var_to_values.values()))
+        if rng.random() < 0.5:
+            rng.shuffle(rows)
+            if rng.random() < 0.3:
+                rows.append(rows[0])
+            columns = list(zip(*rows))
+            rng.shuffle(columns)
+        else:
+            columns = [
+                [rng.choice("ab") for _ in range(num_rows)]
+                for _ in range(num_vars)
+            ]
+        actual_var_to_values = {
+            var: list(column) for var, column in zip(actual_vars, columns)
+        }
+        expected = compare_values(
+            reference_vars,
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            results_are_ordered=False,
+            ignore_duplicates=ignore_duplicates,
+        )
+        num_matches += expected
+        assert compare_result_digests(
+            compute_result_digest(result(reference_var_to_values)),
+            compute_result_digest(result(actual_var_to_values)),
+            ignore_duplicates,
+        ) == float(expected)
+    assert 0 < num_matches < 400
+
+
+def test_compute_result_digest_is_canonical():
+    rows = [("1", "x"), ("2", "y"), ("2", "y")]
+    digest = compute_result_digest(sparql_results(["a", "b"], rows))
+    assert digest == compute_result_digest(
+        json.dumps(sparql_results(["q", "p"], [(b, a) for a, b in rows[::-1]]))
+    )
+    assert digest["num_rows"] == 3
+    assert digest["num_columns"] == 2
+    # The digest can be stored as JSON
+    assert json.loads(json.dumps(digest)) == digest
+
+
+def test_compare_result_digests_undecided():
+    rows = [("1", "x", "z"), ("2", "y", "z")]
+    reference_digest = compute_result_digest(
+        sparql_results(["a", "b", "c"], rows), ["a", "b"]
+    )
+    # Extra actual columns
+    assert compare_result_digests(
+        reference_digest,
+        compute_result_digest(sparql_results(["a", "b", "c"], rows)),
+    ) is None
+    # Too many orders of columns with the same values
+    vars_ = [f"v{i}" for i in range(5)]
+    digest = compute_result_digest(sparql_results(vars_, [("x",) * 5]))
+    assert digest["rows"] == {"set": None, "multiset": None}
+    assert compare_result_digests(digest, digest) is None
+    assert compare_result_digests(
+        reference_digest, dict(reference_digest, version=0)
+    ) is None
+
+
+def test_compare_result_digests_ask():
+    true_digest = compute_result_digest({"head": {}, "boolean": True})
+    false_digest = compute_result_digest({"head": {}, "boolean": False})
+    assert compare_result_digests(true_digest, true_digest) == 1.0
+    assert compare_result_digests(true_digest, false_digest) == 0.0
+
+
+def test_compare_steps_digest():
+    rows = [("1", "x", "z"), ("2", "y", "z"), ("2", "y", "w")]
+    reference = reference_step(rows)
+    output_cache = StepOutputCache()
+    assert compare_steps(
+        reference, digest_step(["p", "q"], [("y", "2"), ("x", "1")]),
+        None, output_cache,
+    ) == 1.0
+    assert compare_steps(
+        reference, digest_step(["p", "q"], [("y", "2"), ("x", "3")]),
+        None, output_cache,
+    ) == 0.0
+    # The reference digest is computed once
+    assert output_cache.stats == {"parses": 1, "parses_avoided": 1}
+
+    multiset_reference = reference_step(rows, ignore_duplicates=False)
+    assert compare_steps(
+        multiset_reference,
+        digest_step(["p", "q"], [("y", "2"), ("x", "1"), ("y", "2")]),
+    ) == 1.0
+    assert compare_steps(
+        multiset_reference,
+        digest_step(["p", "q"], [("y", "2"), ("x", "1")]),
+    ) == 0.0
+
+
+def test_compare_steps_reference_digest():
+    rows = [("1", "x", "z")]
+    reference = reference_step(rows)
+    reference["output_digest"] = compute_result_digest(
+        reference.pop("output"), ["a", "b"]
+    )
+    assert compare_steps(reference, digest_step(["p", "q"], [("1", "x")])) == 1.0
+
+
+def test_compare_steps_digest_falls_back_to_output():
+    rows = [("1", "x", "z"), ("2", "y", "z")]
+    actual = digest_step(["a", "b", "c"], rows)
+    # Extra columns can't be compared by digests
+    assert compare_steps(reference_step(rows), actual) == 0.0
+    assert actual["output_digest_undecided"] is True
+    actual = digest_step(["a", "b", "c"], rows)
+    actual["output"] = json.dumps(sparql_results(["a", "b", "c"], rows))
+    assert compare_steps(reference_step(rows), actual) == 1.0
+    assert "output_digest_undecided" not in actual
+    # Ordered results are compared by their outputs
+    actual = digest_step(["a", "b"], [row[:2] for row in rows[::-1]])
+    assert compare_steps(reference_step(rows, ordered=True), actual) == 0.0
+    assert actual["output_digest_undecided"] is True
+    # A digest which doesn't match is decided
+    actual = digest_step(["a", "b"], [("3", "z")])
+    assert compare_steps(reference_step(rows), actual) == 0.0
+    assert "output_digest_undecided" not in actual
+
+
+@pytest.mark.parametrize("use_executor", [False, True])
+@pytest.mark.asyncio
+async def test_evaluate_steps_digest_undecided(use_executor):
+    rows = [("1", "x", "z"), ("2", "y", "z")]
+    reference = {"reference_steps": [[reference_step(rows)]]}
+    actual = {"actual_steps": [digest_step(["a", "b", "c"], rows)]}
+    executor = ProcessPoolExecutor(1) if use_executor else None
+    try:
+        eval_result = await evaluate_steps(reference, actual, None, executor)
+    finally:
+        if executor:
+            executor.shutdown()
+    assert eval_result["steps_score"] == 0.0
+    assert eval_result["actual_steps"][0]["output_digest_undecided"] is True
@@ -0,0 +1,200 @@
+import json
+import random
+
+from graphrag_eval import CompiledReferences, compile_references
+from graphrag_eval.steps.evaluation import compare_steps, match_and_score_steps
+from graphrag_eval.steps.output_cache import StepOutputCache
+from graphrag_eval.steps.sketch import (
+    BottomK,
+    ResultSketch,
+    estimate_jaccard,
+    sketch_columns,
+    sketch_reference_step,
+    sketch_result,
+    value_hash,
+)
+from graphrag_eval.steps.sparql import parse_sparql_results_json
+from ..util import sparql_results, sparql_step
+
+
+def sketch_step(rows: list[tuple], **kwargs) -> dict:
+    return sparql_step(
+        ["name", "value"], rows, id="reference", comparison="sketch", **kwargs
+    )
+
+
+def actual_step(rows: list[tuple]) -> dict:
+    # The columns are renamed, reordered and there is an extra column
+    return sparql_step(
+        ["v", "extra", "n"],
+        [(value, "x", name) for name, value in rows],
+        id="actual",
+    )
+
+
+def random_rows(rng: random.Random, num_rows: int) -> list[tuple]:
+    return [
+        (f"name{i}", str(rng.randrange(1000))) for i in range(num_rows)
+    ]
+
+
+def test_bottom_k():
+    bottom_k = BottomK(3)
+    for h in [5, 1, 9, 1, 7, 3, 2, 3]:
+        bottom_k.add(h)
+    assert bottom_k.hashes() == [1, 2, 3]
+    assert BottomK(3, [4, 8, 6]).hashes() == [4, 6, 8]
+
+
+def test_estimate_jaccard():
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(30_000)]
+    size = 1024
+
+    def sketch(values):
+        bottom_k = BottomK(size)
+        for h in values:
+            bottom_k.add(h)
+        return bottom_k.hashes()
+
+    # The sets share 10 000 of 20 000 distinct elements
+    jaccard = estimate_jaccard(
+        sketch(hashes[:15_000]), sketch(hashes[5_000:20_000]), size
+    )
+    assert abs(jaccard - 0.5) < 0.05
+    assert estimate_jaccard(sketch(hashes), sketch(hashes), size) == 1.0
+    assert estimate_jaccard([], [], size) == 1.0
+
+
+def test_sketch_reference_step_streams_the_rows():
+    rng = random.Random(42)
+    reference_step = sketch_step(random_rows(rng, 5_000))
+    sketch = sketch_reference_step(reference_step)
+    expected = sketch_result(
+        parse_sparql_results_json(reference_step["output"]),
+        ["name", "value"],
+    )
+    assert sketch.to_json() == expected.to_json()
+    assert sketch.num_rows == 5_000
+    assert len(sketch.rows.hashes()) == 1024
+
+
+def test_sketch_columns_streams_the_columns():
+    rng = random.Random(42)
+    rows = [
+        (name, value if i % 3 else None)
+        for i, (name, value) in enumerate(random_rows(rng, 5_000))
+    ]
+    output = json.dumps(sparql_results(["name", "value", "unbound"], rows))
+    columns = sketch_columns(output)
+    result = parse_sparql_results_json(output)
+    assert columns.vars == ["name", "value", "unbound"]
+    assert columns.num_rows == 5_000
+    for var in columns.vars:
+        expected = BottomK(1024)
+        for value in result.get_column(var):
+            expected.add(value_hash(value))
+        assert columns.column_hashes(var) == expected.hashes()
+    assert columns.column_hashes("unbound") == [value_hash(None)]
+
+
+def test_compare_steps_sketch():
+    rng = random.Random(42)
+    rows = random_rows(rng, 20_000)
+    reference_step = sketch_step(rows)
+    shuffled_rows = rows.copy()
+    rng.shuffle(shuffled_rows)
+    actual = actual_step(shuffled_rows)
+    assert compare_steps(reference_step, actual) == 1.0
+    assert actual["sketch_jaccard"] == 1.0
+
+    # A tenth of the rows is different
+    changed_rows = shuffled_rows[:18_000] + random_rows(rng, 2_000)
+    changed_rows[18_000:] = [
+        (name, value + "!") for name, value in changed_rows[18_000:]
+    ]
+    actual = actual_step(changed_rows)
+    assert compare_steps(reference_step, actual) == 0.0
+    assert abs(actual["sketch_jaccard"] - 18_000 / 22_000) < 0.05
+    assert compare_steps(
+        sketch_step(rows, sketch_threshold=0.75), actual
+    ) == 1.0
+
+
+def test_compare_steps_sketch_ask():
+    reference_step = sketch_step([])
+    reference_step["output"] = json.dumps({"head": {}, "boolean": True})
+    actual = actual_step([])
+    actual["output"] = json.dumps({"head": {}, "boolean": True})
+    assert compare_steps(reference_step, actual) == 1.0
+    actual["output"] = json.dumps({"head": {}, "boolean": False})
+    assert compare_steps(reference_step, actual) == 0.0
+
+
+def test_compare_steps_sketch_is_cached():
+    rows = random_rows(random.Random(42), 100)
+    reference_step = sketch_step(rows)
+    output_cache = StepOutputCache()
+    assert compare_steps(
+        reference_step, actual_step(rows), None, output_cache
+    ) == 1.0
+    assert compare_steps(
+        reference_step, actual_step(rows[:50]), None, output_cache
+    ) == 0.0
+    # The reference step was sketched once, and never parsed into columns
+    assert output_cache.lookup(reference_step, sketch_reference_step)
+    assert output_cache.lookup(
+        reference_step, parse_sparql_results_json
+    ) is None
+
+    # The actual output is only sketched, and its column sketches are reused
+    actual = actual_step(rows)
+    assert compare_steps(reference_step, actual, None, output_cache) == 1.0
+    assert compare_steps(reference_step, actual, None, output_cache) == 1.0
+    assert output_cache.lookup(actual, sketch_columns)
+    assert output_cache.lookup(actual, parse_sparql_results_json) is None
+
+
+def test_compiled_references_store_sketches(tmp_path):
+    rows = random_rows(random.Random(42), 1_000)
+    reference_step = sketch_step(rows)
+    qa_dataset = [{
+        "template_id": "t1",
+        "questions": [{
+            "id": "q1",
+            "question_text": "?",
+            "reference_steps": [[reference_step]],
+        }],
+    }]
+    path = tmp_path / "references.json"
+    compile_references(qa_dataset).save(path)
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert "columns" not in saved["entries"][0]
+    question = qa_dataset[0]["questions"][0]
+    reference_results = CompiledReferences.load(path).for_question(question)
+    assert isinstance(reference_results[(0, 0)], ResultSketch)
+
+    # The reference output is not used
+    reference_steps = [[dict(reference_step, output="")]]
+    reference_results = {(0, 0): reference_results[(0, 0)]}
+    matches, score, annotations = match_and_score_steps(
+        reference_steps, [actual_step(rows)], None, reference_results
+    )
+    assert score == 1.0
+    assert annotations == {0: {"sketch_jaccard": 1.0}}
+
+
+def test_compiled_references_sketch_is_stale():
+    reference_step = sketch_step([("a", "1")])
+    qa_dataset = [{
+        "template_id": "t1",
+        "questions": [{
+            "id": "q1",
+            "question_text": "?",
+            "reference_steps": [[reference_step]],
+        }],
+    }]
+    compiled_references = compile_references(qa_dataset)
+    del reference_step["comparison"]
+    question = qa_dataset[0]["questions"][0]
+    assert compiled_references.for_question(question) == {}
@@ -1,8 +1,27 @@
 import copy
+import itertools
+import json
+import logging
+import random
+import sys
+from collections import Counter
 
+import pytest
+
+from graphrag_eval import steps
+from graphrag_eval.steps import sparql
 from graphrag_eval.steps.sparql import (
     get_var_to_values,
     compare_sparql_results,
+    ComparisonBudget,
+    candidate_assignments,
+    compare_values,
+    has_complete_matching,
+    parse_sparql_results_json,
+    parse_sparql_term,
+    SparqlResult,
+    TermDecoder,
+    Tolerance,
 )
 
 
@@ -957,3 +976,777 @@ def test_compare_sparql_results_equal_binding_values_numerical_values() -> None:
         )
         == 1.0
     )
+
+
+def brute_force_compare_values(
+    reference_vars,
+    reference_var_to_values,
+    actual_vars,
+    actual_var_to_values,
+    results_are_ordered,
+    ignore_duplicates,
+) -> bool:
+    """Tries every combination and permutation of the actual columns"""
+    table = [
+        tuple(str(reference_var_to_values[var][i]) for var in reference_vars)
+        for i in range(len(reference_var_to_values[reference_vars[0]]))
+    ]
+    for combination in itertools.combinations(actual_vars, len(reference_vars)):
+        for permutation in itertools.permutations(combination):
+            actual_table = [
+                tuple(str(actual_var_to_values[var][i]) for var in permutation)
+                for i in range(len(actual_var_to_values[permutation[0]]))
+            ]
+            if results_are_ordered:
+                if table == actual_table:
+                    return True
+            elif ignore_duplicates:
+                if set(table) == set(actual_table):
+                    return True
+            elif Counter(table) == Counter(actual_table):
+                return True
+    return False
+
+
+def random_table(rng, vars_, num_rows, alphabet):
+    return {var: [rng.choice(alphabet) for _ in range(num_rows)] for var in vars_}
+
+
+@pytest.mark.parametrize("results_are_ordered, ignore_duplicates", [
+    (True, True),
+    (False, True),
+    (False, False),
+])
+@pytest.mark.parametrize("columnar_row_threshold", [None, 1])
+def test_compare_values_equals_brute_force(
+    results_are_ordered,
+    ignore_duplicates,
+    columnar_row_threshold,
+):
+    if columnar_row_threshold:
+        pytest.importorskip("numpy")
+    rng = random.Random(42)
+    num_matches = 0
+    for _ in range(400):
+        num_reference_vars = rng.randint(1, 3)
+        num_actual_vars = rng.randint(num_reference_vars, 4)
+        num_rows = rng.randint(1, 4)
+        alphabet = "ab" if rng.random() < 0.5 else "abc"
+        reference_vars = [f"r{i}" for i in range(num_reference_vars)]
+        reference_var_to_values = random_table(
+            rng, reference_vars, num_rows, alphabet
+        )
+        actual_vars = [f"a{i}" for i in range(num_actual_vars)]
+        if rng.random() < 0.5:
+            # Shuffle the rows and columns of the reference and add columns
+            rows = list(zip(*reference_var_to_values.values()))
+            if not results_are_ordered:
+                rng.shuffle(rows)
+                if rows and not ignore_duplicates and rng.random() < 0.2:
+                    rows.append(rows[0])
+            columns = list(zip(*rows))
+            columns += [
+                [rng.choice(alphabet) for _ in rows]
+                for _ in range(num_actual_vars - num_reference_vars)
+            ]
+            rng.shuffle(columns)
+            actual_var_to_values = {
+                var: list(column) for var, column in zip(actual_vars, columns)
+            }
+        else:
+            actual_var_to_values = random_table(
+                rng, actual_vars, num_rows, alphabet
+            )
+        expected = brute_force_compare_values(
+            reference_vars,
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            results_are_ordered,
+            ignore_duplicates,
+        )
+        num_matches += expected
+        assert compare_values(
+            reference_vars,
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            results_are_ordered,
+            ignore_duplicates,
+            columnar_row_threshold,
+        ) == expected
+    assert 0 < num_matches < 400
+
+
+def test_compare_values_many_columns_is_fast():
+    num_vars = 10
+    num_rows = 50
+    reference_vars = [f"r{i}" for i in range(num_vars)]
+    reference_var_to_values = {
+        var: [f"{var}-{row}" for row in range(num_rows)]
+        for var in reference_vars
+    }
+    actual_vars = [f"a{i}" for i in range(num_vars)]
+    actual_var_to_values = {
+        actual_var: reference_var_to_values[reference_var][::-1]
+        for actual_var, reference_var in zip(
+            actual_vars, reversed(reference_vars)
+        )
+    }
+    for results_are_ordered, ignore_duplicates in [
+        (False, True), (False, False)
+    ]:
+        # The columns are paired by their signatures, so only one of the 10!
+        # mappings is compared
+        budget = ComparisonBudget()
+        assert compare_values(
+            reference_vars,
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            results_are_ordered,
+            ignore_duplicates,
+            budget=budget,
+        )
+        assert budget.mappings == 1
+    assert not compare_values(
+        reference_vars,
+        reference_var_to_values,
+        actual_vars,
+        actual_var_to_values,
+        True,
+        True,
+    )
+
+
+def test_has_complete_matching():
+    assert has_complete_matching([["a", "b"], ["a"]], set())
+    assert not has_complete_matching([["a"], ["a"]], set())
+    assert not has_complete_matching([["a", "b"], ["a"]], {"a"})
+    assert has_complete_matching([], set())
+
+
+def test_candidate_assignments():
+    assert list(candidate_assignments([["a", "b"], ["a"]])) == [("b", "a")]
+    assert sorted(candidate_assignments([["a", "b"], ["a", "b", "c"]])) == [
+        ("a", "b"), ("a", "c"), ("b", "a"), ("b", "c"),
+    ]
+    assert list(candidate_assignments([["a"], ["a"]])) == []
+    assert list(candidate_assignments([["a"], []])) == []
+
+
+def test_compare_values_many_extra_columns_is_fast():
+    num_rows = 50
+    reference_vars = ["x", "y", "z"]
+    reference_var_to_values = {
+        var: [row % 7 for row in range(num_rows)] for var in reference_vars
+    }
+    reference_var_to_values["z"] = list(range(num_rows))
+    actual_vars = [f"a{i}" for i in range(20)]
+    # Most extra columns have the same values as "x" and "y", but in an
+    # order which does not form the reference rows
+    actual_var_to_values = {
+        var: [(row * 3) % 7 for row in range(num_rows)] for var in actual_vars
+    }
+    actual_var_to_values["a17"] = list(range(num_rows))
+    # Only "a17" is a candidate for "z", so "x" and "y" are assigned two of
+    # the other 19 columns, rather than any three of the 20 columns
+    budget = ComparisonBudget()
+    assert not compare_values(
+        reference_vars,
+        reference_var_to_values,
+        actual_vars,
+        actual_var_to_values,
+        False,
+        False,
+        budget=budget,
+    )
+    assert budget.mappings == 19 * 18
+    actual_var_to_values["a3"] = reference_var_to_values["x"]
+    actual_var_to_values["a11"] = reference_var_to_values["y"]
+    budget = ComparisonBudget()
+    assert compare_values(
+        reference_vars,
+        reference_var_to_values,
+        actual_vars,
+        actual_var_to_values,
+        False,
+        False,
+        budget=budget,
+    )
+    assert budget.mappings <= 19 * 18
+
+
+def test_compare_values_does_not_join_cells():
+    assert not compare_values(
+        ["x", "y"],
+        {"x": ["1", "12"], "y": ["23", "3"]},
+        ["a", "b"],
+        {"a": ["12", "1"], "b": ["3", "23"]},
+        True,
+        True,
+    )
+    assert compare_values(
+        ["x", "y"],
+        {"x": ["1", "12"], "y": ["23", "3"]},
+        ["a", "b"],
+        {"a": ["1", "12"], "b": ["23", "3"]},
+        True,
+        True,
+    )
+
+
+@pytest.mark.parametrize("results_are_ordered, ignore_duplicates", [
+    (True, True),
+    (False, True),
+    (False, False),
+])
+def test_compare_values_columnar_large_result(
+    results_are_ordered,
+    ignore_duplicates,
+    monkeypatch,
+):
+    columnar = pytest.importorskip("graphrag_eval.steps.sparql_columnar")
+    num_rows = 20_000
+    reference_vars = ["x", "y"]
+    reference_var_to_values = {
+        "x": [row % 1000 for row in range(num_rows)],
+        "y": [f"v{row}" for row in range(num_rows)],
+    }
+    order = list(range(num_rows))
+    if not results_are_ordered:
+        random.Random(0).shuffle(order)
+    actual_vars = ["b", "c", "a"]
+    actual_var_to_values = {
+        "a": [reference_var_to_values["x"][row] for row in order],
+        "b": [reference_var_to_values["y"][row] for row in order],
+        "c": [None] * num_rows,
+    }
+    table_key_calls = []
+
+    def spy(module):
+        table_key = module.table_key
+
+        def spy_table_key(*args):
+            table_key_calls.append(module)
+            return table_key(*args)
+
+        monkeypatch.setattr(module, "table_key", spy_table_key)
+
+    spy(sparql)
+    spy(columnar)
+    budget = ComparisonBudget()
+    assert compare_values(
+        reference_vars,
+        reference_var_to_values,
+        actual_vars,
+        actual_var_to_values,
+        results_are_ordered,
+        ignore_duplicates,
+        columnar_row_threshold=10_000,
+        budget=budget,
+    )
+    actual_var_to_values["a"][0] = -1
+    assert not compare_values(
+        reference_vars,
+        reference_var_to_values,
+        actual_vars,
+        actual_var_to_values,
+        results_are_ordered,
+        ignore_duplicates,
+        columnar_row_threshold=10_000,
+        budget=budget,
+    )
+    # Ordered results are compared column by column, and unordered results
+    # by the keys of a single mapping, which are built with numpy
+    assert budget.mappings <= 1
+    if results_are_ordered:
+        assert table_key_calls == []
+    else:
+        assert table_key_calls == [columnar, columnar]
+
+
+@pytest.mark.parametrize("num_columns", [2, 8])
+@pytest.mark.parametrize("ignore_duplicates", [True, False])
+def test_columnar_table_key_equals_table_key(num_columns, ignore_duplicates):
+    # With 8 columns, the rows can't be packed into integers
+    columnar = pytest.importorskip("graphrag_eval.steps.sparql_columnar")
+    rng = random.Random(42)
+    vars_ = [f"v{i}" for i in range(num_columns)]
+    for _ in range(50):
+        num_rows = rng.randint(1, 6)
+        tables = [
+            {var: [rng.randrange(3) for _ in range(num_rows)] for var in vars_}
+            for _ in range(2)
+        ]
+        if rng.random() < 0.5:
+            rows = list(zip(*tables[0].values()))
+            rng.shuffle(rows)
+            tables[1] = dict(zip(vars_, map(list, zip(*rows))))
+        # Large value IDs, as in a table with many distinct values
+        for table in tables:
+            table[vars_[0]] = [
+                value_id * 10_000 for value_id in table[vars_[0]]
+            ]
+        keys = [
+            sparql.table_key(table, vars_, ignore_duplicates)
+            for table in tables
+        ]
+        columnar_keys = [
+            columnar.table_key(
+                columnar.to_arrays(table), vars_, ignore_duplicates
+            )
+            for table in tables
+        ]
+        assert (keys[0] == keys[1]) == (columnar_keys[0] == columnar_keys[1])
+
+
+def test_compare_values_columnar_without_numpy(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "graphrag_eval.steps.sparql_columnar", None)
+    monkeypatch.delattr(steps, "sparql_columnar", raising=False)
+    caplog.set_level(logging.DEBUG, logger="graphrag_eval.steps.sparql")
+    assert compare_values(
+        ["x"],
+        {"x": [1, 2]},
+        ["a"],
+        {"a": [2, 1]},
+        False,
+        True,
+        columnar_row_threshold=1,
+    )
+    assert "comparing results by rows" in caplog.text
+
+
+def assert_same_result(result, expected):
+    assert result.vars == expected.vars
+    assert result.boolean == expected.boolean
+    assert result.num_rows == expected.num_rows
+    assert result.columns == expected.columns
+
+
+def test_parse_sparql_results_json():
+    sparql_result = {
+        "head": {"vars": ["x", "y", "n"], "link": ["http://example.com"]},
+        "results": {
+            "distinct": False,
+            "bindings": [
+                {"x": {"type": "uri", "value": "urn:a"}},
+                {
+                    "y": {"type": "literal", "value": "b"},
+                    "n": {
+                        "type": "literal",
+                        "datatype": "http://www.w3.org/2001/XMLSchema#integer",
+                        "value": "3",
+                    },
+                },
+                {},
+            ],
+        },
+    }
+    result = parse_sparql_results_json(json.dumps(sparql_result))
+    assert result.vars == ["x", "y", "n"]
+    assert result.boolean is None
+    assert result.num_rows == 3
+    assert result.columns == {
+        "x": ["urn:a", None, None],
+        "y": [None, "b", None],
+        "n": [None, 3, None],
+    }
+    assert result.get_column("z") == [None, None, None]
+    assert_same_result(result, SparqlResult.from_json(sparql_result))
+    assert_same_result(
+        parse_sparql_results_json(json.dumps(sparql_result, indent=4)),
+        result,
+    )
+    # The members of objects may come in any order
+    reordered = {"results": sparql_result["results"], "head": sparql_result["head"]}
+    assert_same_result(parse_sparql_results_json(json.dumps(reordered)), result)
+
+
+def test_parse_sparql_results_json_ask():
+    result = parse_sparql_results_json('{"head": {}, "boolean": false}')
+    assert result.vars == []
+    assert result.boolean is False
+    assert result.num_rows == 0
+
+
+def test_parse_sparql_results_json_empty():
+    result = parse_sparql_results_json(
+        ' { "head" : { "vars" : [ "x" ] } , "results" : { "bindings" : [ ] } } '
+    )
+    assert result.vars == ["x"]
+    assert result.num_rows == 0
+    assert result.get_column("x") == []
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "Turtle text",
+    '"a string"',
+    "[]",
+    '{"head": {}',
+    '{"head": {}} extra',
+    '{"head": {}, }',
+    '{"results": {"bindings": [1]}}',
+    '{"results": {"bindings": [{}, ]}}',
+    '{1: 2}',
+])
+def test_parse_sparql_results_json_invalid(text):
+    with pytest.raises(json.JSONDecodeError):
+        parse_sparql_results_json(text)
+
+
+def test_compare_sparql_results_parsed():
+    reference = parse_sparql_results_json(json.dumps({
+        "head": {"vars": ["x"]},
+        "results": {"bindings": [
+            {"x": {"type": "literal", "value": "a"}},
+            {"x": {"type": "literal", "value": "b"}},
+        ]},
+    }))
+    actual = parse_sparql_results_json(json.dumps({
+        "head": {"vars": ["y", "z"]},
+        "results": {"bindings": [
+            {"z": {"type": "literal", "value": "b"}},
+            {"z": {"type": "literal", "value": "a"}},
+        ]},
+    }))
+    assert compare_sparql_results(reference, actual, ["x"]) == 1.0
+    assert compare_sparql_results(reference, actual, ["x"], True) == 0.0
+
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+@pytest.mark.parametrize("term, expected", [
+    ({"type": "uri", "value": "urn:a"}, "urn:a"),
+    ({"type": "bnode", "value": "b0"}, "b0"),
+    ({"type": "literal", "value": "42"}, "42"),
+    ({"type": "literal", "value": "42", "xml:lang": "en"}, "42"),
+    ({"type": "literal", "value": "42", "datatype": XSD + "integer"}, 42),
+    ({"type": "typed-literal", "value": "42", "datatype": XSD + "long"}, 42),
+    ({"type": "literal", "value": "4.2", "datatype": XSD + "integer"}, "4.2"),
+    ({"type": "literal", "value": "1.2345678", "datatype": XSD + "double"}, 1.23456),
+    ({"type": "literal", "value": "NaN", "datatype": XSD + "double"}, "NaN"),
+    ({"type": "literal", "value": "x", "datatype": XSD + "decimal"}, "x"),
+    ({"type": "literal", "value": "TRUE", "datatype": XSD + "boolean"}, True),
+    ({"type": "literal", "value": "0", "datatype": XSD + "boolean"}, False),
+    ({"type": "literal", "value": "2020", "datatype": XSD + "gYear"}, "2020"),
+    ({"type": "uri", "value": "42", "datatype": XSD + "integer"}, "42"),
+    ({"type": "literal"}, None),
+    ("raw", "raw"),
+])
+def test_term_decoder(term, expected):
+    assert parse_sparql_term(term) == expected
+    decoder = TermDecoder()
+    assert decoder.decode(term) == expected
+    assert decoder.decode(term) == expected
+
+
+def test_term_decoder_shares_decoded_values():
+    decoder = TermDecoder()
+    # Build equal values which are distinct objects
+    first = decoder.decode({"type": "uri", "value": "".join(["urn:", "a"])})
+    second = decoder.decode({"type": "literal", "value": "".join(["urn:", "a"])})
+    assert first is second
+    first = decoder.decode(
+        {"type": "literal", "value": "1.5", "datatype": XSD + "double"}
+    )
+    second = decoder.decode(
+        {"type": "literal", "value": "1.5", "datatype": XSD + "double"}
+    )
+    assert first is second
+    assert decoder.decode(
+        {"type": "literal", "value": "1.5", "datatype": XSD + "string"}
+    ) == "1.5"
+
+
+class CountedValue:
+    num_conversions = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        CountedValue.num_conversions += 1
+        return str(self.value)
+
+
+def test_compare_values_ordered_stops_at_first_different_row():
+    num_rows = 1000
+    reference_var_to_values = {
+        "x": list(range(num_rows)), "y": list(range(num_rows))
+    }
+    actual_var_to_values = {
+        var: [CountedValue(-1)] + [CountedValue(row) for row in range(1, num_rows)]
+        for var in ("a", "b", "c")
+    }
+    CountedValue.num_conversions = 0
+    assert not compare_values(
+        ["x", "y"],
+        reference_var_to_values,
+        ["a", "b", "c"],
+        actual_var_to_values,
+        True,
+        True,
+    )
+    assert CountedValue.num_conversions == 3
+
+
+def test_compare_values_ordered_different_row_counts():
+    actual_var_to_values = {"a": [CountedValue(1), CountedValue(2)]}
+    CountedValue.num_conversions = 0
+    assert not compare_values(
+        ["x"], {"x": [1]}, ["a"], actual_var_to_values, True, True
+    )
+    assert CountedValue.num_conversions == 0
+
+
+def test_compare_values_ordered_needs_distinct_columns():
+    assert not compare_values(
+        ["x", "y"],
+        {"x": [1, 2], "y": [1, 2]},
+        ["a", "b"],
+        {"a": [1, 2], "b": [2, 1]},
+        True,
+        True,
+    )
+    assert compare_values(
+        ["x", "y"],
+        {"x": [1, 2], "y": [1, 2]},
+        ["a", "b", "c"],
+        {"a": [1, 2], "b": [2, 1], "c": [1, 2]},
+        True,
+        True,
+    )
+
+
+@pytest.mark.parametrize("ignore_duplicates", [True, False])
+@pytest.mark.parametrize("columnar_row_threshold", [None, 1])
+def test_compare_values_screens_mappings_by_fingerprint(
+    ignore_duplicates,
+    columnar_row_threshold,
+    monkeypatch,
+):
+    if columnar_row_threshold:
+        columnar = pytest.importorskip("graphrag_eval.steps.sparql_columnar")
+    else:
+        columnar = sparql
+    table_key = columnar.table_key
+    num_table_keys = 0
+
+    def mock_table_key(*args):
+        nonlocal num_table_keys
+        num_table_keys += 1
+        return table_key(*args)
+
+    monkeypatch.setattr(columnar, "table_key", mock_table_key)
+    # All columns are compatible, but only the last mapping gives equal rows
+    reference_vars = ["x", "y", "z"]
+    reference_var_to_values = {
+        "x": [1, 2, 3, 4], "y": [2, 3, 4, 1], "z": [3, 4, 1, 2]
+    }
+    actual_vars = ["a", "b", "c"]
+    actual_var_to_values = {
+        "a": [3, 4, 1, 2], "b": [2, 3, 4, 1], "c": [1, 2, 3, 4]
+    }
+    assert compare_values(
+        reference_vars,
+        reference_var_to_values,
+        actual_vars,
+        actual_var_to_values,
+        False,
+        ignore_duplicates,
+        columnar_row_threshold,
+    )
+    # The reference table and the matching actual table
+    assert num_table_keys == 2
+
+
+@pytest.mark.parametrize("ignore_duplicates", [True, False])
+def test_table_fingerprint(ignore_duplicates):
+    var_to_ids = {"x": [1, 2, 2, 3], "y": [4, 5, 5, 6]}
+    shuffled = {"x": [2, 3, 1, 2], "y": [5, 6, 4, 5]}
+    paired_differently = {"x": [1, 2, 2, 3], "y": [5, 4, 6, 5]}
+    fingerprint = sparql.table_fingerprint(
+        var_to_ids, ["x", "y"], ignore_duplicates
+    )
+    assert fingerprint[1] == (3 if ignore_duplicates else 4)
+    assert fingerprint == sparql.table_fingerprint(
+        shuffled, ["x", "y"], ignore_duplicates
+    )
+    assert fingerprint != sparql.table_fingerprint(
+        paired_differently, ["x", "y"], ignore_duplicates
+    )
+
+
+def numeric_result(vars_, rows) -> dict:
+    def term(value):
+        if isinstance(value, float):
+            return {
+                "type": "literal",
+                "datatype": "http://www.w3.org/2001/XMLSchema#double",
+                "value": repr(value),
+            }
+        return {"type": "literal", "value": value}
+
+    return {
+        "head": {"vars": vars_},
+        "results": {"bindings": [
+            {var: term(value) for var, value in zip(vars_, row)}
+            for row in rows
+        ]},
+    }
+
+
+@pytest.mark.parametrize("results_are_ordered, ignore_duplicates", [
+    (True, True),
+    (False, True),
+    (False, False),
+])
+def test_compare_sparql_results_within_tolerance(
+    results_are_ordered,
+    ignore_duplicates,
+):
+    reference = numeric_result(
+        ["name", "value"], [("a", 0.0), ("b", 100.0), ("c", -2.5)]
+    )
+    actual = numeric_result(
+        ["x", "y"], [("a", 0.00001), ("b", 100.01), ("c", -2.5)]
+    )
+    if not results_are_ordered:
+        actual["results"]["bindings"].reverse()
+
+    def compare(tolerance):
+        return compare_sparql_results(
+            reference,
+            actual,
+            ["name", "value"],
+            results_are_ordered,
+            ignore_duplicates,
+            tolerance=tolerance,
+        )
+
+    assert compare(None) == 0.0
+    assert compare(Tolerance(absolute=1e-4)) == 0.0
+    assert compare(Tolerance(absolute=0.02)) == 1.0
+    assert compare(Tolerance(relative=1e-3)) == 0.0
+    assert compare(Tolerance(absolute=1e-4, relative=1e-3)) == 1.0
+
+
+def test_compare_sparql_results_within_tolerance_pairs_rows():
+    # The names tell apart values which are equal within tolerance
+    reference = numeric_result(
+        ["name", "value"], [("a", 1.0), ("b", 1.05), ("a", 2.0)]
+    )
+    actual = numeric_result(
+        ["name", "value"], [("a", 1.06), ("b", 1.01), ("a", 2.0)]
+    )
+    tolerance = Tolerance(absolute=0.1)
+    assert compare_sparql_results(
+        reference, actual, ["name", "value"], tolerance=tolerance
+    ) == 1.0
+    actual = numeric_result(
+        ["name", "value"], [("a", 1.06), ("b", 1.2), ("a", 2.0)]
+    )
+    assert compare_sparql_results(
+        reference, actual, ["name", "value"], tolerance=tolerance
+    ) == 0.0
+
+
+def brute_force_compare_within_tolerance(
+    reference_vars,
+    reference_var_to_values,
+    actual_vars,
+    actual_var_to_values,
+    tolerance,
+) -> bool:
+    """Tries every mapping of the columns and every pairing of the rows"""
+    table = list(zip(*(reference_var_to_values[var] for var in reference_vars)))
+    for combination in itertools.combinations(actual_vars, len(reference_vars)):
+        for permutation in itertools.permutations(combination):
+            actual_table = list(
+                zip(*(actual_var_to_values[var] for var in permutation))
+            )
+            if any(
+                all(map(tolerance.rows_equal, table, rows))
+                for rows in itertools.permutations(actual_table)
+            ):
+                return True
+    return False
+
+
+def test_compare_values_within_tolerance_equals_brute_force():
+    rng = random.Random(42)
+    tolerance = Tolerance(absolute=0.15)
+    num_matches = 0
+    for _ in range(300):
+        num_rows = rng.randint(1, 5)
+        reference_var_to_values = {
+            "name": [rng.choice("ab") for _ in range(num_rows)],
+            "value": [rng.randint(0, 6) / 10 for _ in range(num_rows)],
+        }
+        actual_vars = ["x", "y", "z"]
+        actual_var_to_values = {
+            "x": [rng.choice("ab") for _ in range(num_rows)],
+            "y": [
+                value + rng.choice([-0.1, 0, 0.1])
+                for value in reference_var_to_values["value"]
+            ],
+            "z": [rng.randint(0, 6) / 10 for _ in range(num_rows)],
+        }
+        expected = brute_force_compare_within_tolerance(
+            ["name", "value"],
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            tolerance,
+        )
+        num_matches += expected
+        assert compare_values(
+            ["name", "value"],
+            reference_var_to_values,
+            actual_vars,
+            actual_var_to_values,
+            results_are_ordered=False,
+            ignore_duplicates=False,
+            tolerance=tolerance,
+        ) == expected
+    assert 0 < num_matches < 300
+
+
+def test_compare_values_within_tolerance_large_result_is_fast():
+    class CountingTolerance(Tolerance):
+        num_comparisons = 0
+
+        def equal(self, value, other):
+            self.num_comparisons += 1
+            return super().equal(value, other)
+
+    rng = random.Random(42)
+    num_rows = 20_000
+    values = [rng.uniform(-1e6, 1e6) for _ in range(num_rows)]
+    names = [f"n{rng.randrange(num_rows)}" for _ in range(num_rows)]
+    rows = [
+        (name, value * (1 + rng.uniform(-1e-9, 1e-9)))
+        for name, value in zip(names, values)
+    ]
+    rng.shuffle(rows)
+    actual_names, actual_values = map(list, zip(*rows))
+    tolerance = CountingTolerance(relative=1e-8)
+    assert compare_values(
+        ["name", "value"],
+        {"name": names, "value": values},
+        ["x", "y"],
+        {"x": actual_names, "y": actual_values},
+        results_are_ordered=False,
+        ignore_duplicates=False,
+        tolerance=tolerance,
+    )
+    # No rows are compared pairwise
+    assert tolerance.num_comparisons <= 10 * num_rows
+
+
+def test_tolerance_must_not_be_negative():
+    with pytest.raises(ValueError):
+        Tolerance(absolute=-1)
@@ -1,4 +1,9 @@
+import json
+
+import pytest
+
 from graphrag_eval.steps.evaluation import (
+    StepsConfig,
     compare_steps,
     calculate_steps_score,
     match_group,
@@ -136,6 +141,45 @@ def test_compare_outputs_sparql_results():
     assert compare_steps(sparql_expected_step, sparql_actual_step) == 1.0
 
 
+def test_compare_outputs_sparql_results_columnar():
+    pytest.importorskip("numpy")
+    config = StepsConfig(columnar_row_threshold=1)
+    assert compare_steps(
+        sparql_expected_step, sparql_actual_step, config
+    ) == 1.0
+
+
+def test_compare_outputs_sparql_results_within_tolerance():
+    def sparql_step(value: str, **kwargs) -> dict:
+        return {
+            "name": "sparql_query",
+            "output": json.dumps({
+                "head": {"vars": ["x"]},
+                "results": {"bindings": [{"x": {
+                    "type": "literal",
+                    "datatype": "http://www.w3.org/2001/XMLSchema#decimal",
+                    "value": value,
+                }}]},
+            }),
+            "output_media_type": "application/sparql-results+json",
+            "required_columns": ["x"],
+            **kwargs,
+        }
+
+    actual_step = sparql_step("0.29999")
+    assert compare_steps(sparql_step("0.3"), actual_step) == 0.0
+    assert compare_steps(
+        sparql_step("0.3", absolute_tolerance=1e-4), actual_step
+    ) == 1.0
+    assert compare_steps(
+        sparql_step("0.3", relative_tolerance=1e-4), actual_step
+    ) == 1.0
+    assert compare_steps(
+        sparql_step("0.3", absolute_tolerance=1e-4, ordered=True),
+        actual_step,
+    ) == 1.0
+
+
 def test_compare_outputs_json():
     assert compare_steps(influx_expected_step, influx_actual_step) == 1.0
 
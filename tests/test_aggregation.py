@@ -1,8 +1,10 @@
+from collections import defaultdict
 from pathlib import Path
 
 import yaml
 
-from graphrag_eval import compute_aggregates
+from graphrag_eval import compute_aggregates, compute_result_digest
+from graphrag_eval.aggregation import update_steps_summary
 
 DATA_DIR = Path(__file__).parent / "test_data"
 
@@ -16,3 +18,25 @@ def test_compute_aggregates_doesnt_throw_exception():
     with open(evaluation_results_file, encoding="utf-8") as yaml_file:
         per_question_eval = yaml.safe_load(yaml_file)
         compute_aggregates(per_question_eval)
+
+
+def test_update_steps_summary_counts_empty_digests():
+    empty_result = {"head": {"vars": ["x"]}, "results": {"bindings": []}}
+    sample = {"actual_steps": [
+        {
+            "name": "sparql_query",
+            "status": "success",
+            "output_digest": compute_result_digest(empty_result),
+        },
+        {
+            "name": "sparql_query",
+            "status": "success",
+            "output_digest": compute_result_digest(
+                {"head": {}, "boolean": False}
+            ),
+        },
+    ]}
+    summary = defaultdict(lambda: defaultdict(int))
+    update_steps_summary(sample, summary)
+    assert summary["total"]["sparql_query"] == 2
+    assert summary["empty_results"]["sparql_query"] == 1
@@ -0,0 +1,178 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from graphrag_eval import run_evaluation
+from graphrag_eval.checkpoint import CheckpointJournal
+from graphrag_eval.evaluation import Config
+from .util import read_responses
+
+DATA_DIR = Path(__file__).parent / "test_data"
+
+
+def test_journal_load_missing_file(tmp_path):
+    journal = CheckpointJournal(tmp_path / "journal.jsonl", "f1")
+    assert journal.load() == {}
+
+
+def test_journal_record_and_load(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = CheckpointJournal(path, "f1")
+    journal.record("q1", {"question_id": "q1", "steps_score": 1.0})
+    journal.close()
+    journal = CheckpointJournal(path, "f2")
+    journal.record("q2", {"question_id": "q2", "steps_score": 0.0})
+    journal.close()
+
+    assert CheckpointJournal(path, "f1").load() == {
+        "q1": {"question_id": "q1", "steps_score": 1.0}
+    }
+    assert CheckpointJournal(path, "f2").load() == {
+        "q2": {"question_id": "q2", "steps_score": 0.0}
+    }
+
+
+def test_journal_skips_incomplete_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    line = json.dumps({
+        "question_id": "q1", "fingerprint": "f1", "result": {"a": 1}
+    })
+    path.write_text(line + "\n" + line[:10], encoding="utf-8")
+
+    journal = CheckpointJournal(path, "f1")
+    assert journal.load() == {"q1": {"a": 1}}
+    journal.record("q2", {"b": 2})
+    journal.close()
+    assert journal.load() == {"q1": {"a": 1}, "q2": {"b": 2}}
+
+
+def test_config_fingerprint_ignores_runtime_settings():
+    assert Config().fingerprint() == Config(max_concurrency=4).fingerprint()
+    assert Config().fingerprint() \
+        == Config(steps={"columnar_row_threshold": 1}).fingerprint()
+
+
+def test_config_fingerprint_includes_comparison_budget():
+    assert Config().fingerprint() \
+        != Config(steps={"max_column_mappings": 10}).fingerprint()
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_resumes_from_checkpoint(tmp_path, monkeypatch):
+    reference_data = yaml.safe_load(
+        (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+    )
+    actual_responses = read_responses(DATA_DIR / "actual_responses_1.jsonl")
+    expected_evaluation_results = yaml.safe_load(
+        (DATA_DIR / "evaluation_1.yaml").read_text(encoding="utf-8")
+    )
+    checkpoint_path = tmp_path / "journal.jsonl"
+
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        checkpoint_path=checkpoint_path,
+    )
+    assert expected_evaluation_results == evaluation_results
+
+    # Simulate a run which was interrupted after the first two questions
+    lines = checkpoint_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == len(evaluation_results)
+    checkpoint_path.write_text("\n".join(lines[:2]) + "\n", encoding="utf-8")
+
+    from graphrag_eval import evaluation
+    evaluate_question = evaluation.evaluate_question
+    evaluated_question_ids = []
+
+    async def mock_evaluate_question(template_id, question, *args, **kwargs):
+        evaluated_question_ids.append(question["id"])
+        return await evaluate_question(template_id, question, *args, **kwargs)
+
+    monkeypatch.setattr(
+        evaluation, "evaluate_question", mock_evaluate_question
+    )
+
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        checkpoint_path=checkpoint_path,
+        max_concurrency=3,
+    )
+    assert expected_evaluation_results == evaluation_results
+    all_question_ids = [r["question_id"] for r in expected_evaluation_results]
+    assert evaluated_question_ids == all_question_ids[2:]
+
+    evaluated_question_ids.clear()
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        checkpoint_path=checkpoint_path,
+    )
+    assert expected_evaluation_results == evaluation_results
+    assert evaluated_question_ids == []
+
+
+def test_journal_skips_results_with_evaluator_errors(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = CheckpointJournal(path, "f1")
+    journal.record("q1", {"question_id": "q1", "custom_error": "timeout"})
+    journal.record("q2", {"question_id": "q2", "error": "Agent failed"})
+    journal.close()
+
+    assert CheckpointJournal(path, "f1").load() == {
+        "q2": {"question_id": "q2", "error": "Agent failed"}
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_retries_timed_out_evaluators(
+    tmp_path,
+    monkeypatch
+):
+    class SleepingEvaluator:
+        def __init__(self):
+            self.name = "custom"
+            self.delay = 10.0
+
+        async def evaluate(self, reference, actual):
+            await asyncio.sleep(self.delay)
+            return {"custom_score": 1.0}
+
+    evaluator = SleepingEvaluator()
+    from graphrag_eval import evaluation
+    monkeypatch.setattr(
+        evaluation,
+        "parse_config_and_init_evaluators",
+        lambda _: ([evaluator], None)
+    )
+    config_file_path = tmp_path / "config.yaml"
+    config_file_path.write_text(
+        yaml.safe_dump({"timeouts": {"evaluator": 0.05}}), encoding="utf-8"
+    )
+    reference_data = [{
+        "template_id": "t1",
+        "questions": [{"id": "q1", "question_text": "Q?"}],
+    }]
+    actual_responses = {"q1": {"question_id": "q1", "actual_answer": "A"}}
+    checkpoint_path = tmp_path / "journal.jsonl"
+
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        config_file_path,
+        checkpoint_path=checkpoint_path,
+    )
+    assert evaluation_results[0]["custom_error"] == "timeout"
+
+    evaluator.delay = 0.0
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        config_file_path,
+        checkpoint_path=checkpoint_path,
+    )
+    assert evaluation_results[0]["custom_score"] == 1.0
+    assert "custom_error" not in evaluation_results[0]
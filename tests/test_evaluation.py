@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 
 import pytest
@@ -5,9 +6,11 @@ import yaml
 
 from graphrag_eval import (
     compute_aggregates,
+    iter_evaluation,
     run_evaluation,
 )
 from graphrag_eval.aggregation import stats_for_series
+from graphrag_eval.evaluation import Config, TimeoutConfig
 from graphrag_eval.steps.evaluation import calculate_steps_score, match_groups
 from .util import read_responses
 
@@ -313,3 +316,358 @@ async def test_evaluate_timeseries_steps_with_1_iri_discovery():
         )
     )
     assert expected_evaluation_results == evaluation_results
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_with_max_concurrency_keeps_dataset_order():
+    reference_data = yaml.safe_load(
+        (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+    )
+    responses_path = DATA_DIR / "actual_responses_1.jsonl"
+    actual_responses = read_responses(responses_path)
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        max_concurrency=4,
+    )
+    expected_evaluation_results = yaml.safe_load(
+        (DATA_DIR / "evaluation_1.yaml").read_text(
+            encoding="utf-8"
+        )
+    )
+    assert expected_evaluation_results == evaluation_results
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_max_concurrency_bounds_in_flight_questions(
+    monkeypatch
+):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def mock_evaluate_steps(reference, actual, ragas_llm, *args):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {}
+
+    from graphrag_eval import evaluation
+    monkeypatch.setattr(evaluation, "evaluate_steps", mock_evaluate_steps)
+
+    reference_data = yaml.safe_load(
+        (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+    )
+    actual_responses = read_responses(DATA_DIR / "actual_responses_1.jsonl")
+    num_questions = sum(len(t["questions"]) for t in reference_data)
+    assert num_questions > 2
+
+    await run_evaluation(reference_data, actual_responses)
+    assert max_in_flight == 1
+
+    max_in_flight = 0
+    await run_evaluation(reference_data, actual_responses, max_concurrency=2)
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_invalid_max_concurrency():
+    with pytest.raises(ValueError):
+        await run_evaluation([], {}, max_concurrency=0)
+
+
+def test_config_max_concurrency():
+    assert Config().max_concurrency == 1
+    assert Config(max_concurrency=8).max_concurrency == 8
+    with pytest.raises(ValueError):
+        Config(max_concurrency=0)
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_runs_evaluators_of_a_question_concurrently(
+    monkeypatch
+):
+    started = []
+    all_started = asyncio.Event()
+
+    class SlowEvaluator:
+        def __init__(self, name: str, num_yields: int, output: dict):
+            self.name = name
+            self.num_yields = num_yields
+            self.output = output
+
+        async def evaluate(self, reference, actual):
+            started.append(self.name)
+            if len(started) == len(evaluators):
+                all_started.set()
+            # Each evaluator completes only once all of them are in flight,
+            # and they complete in another order than they started
+            await all_started.wait()
+            for _ in range(self.num_yields):
+                await asyncio.sleep(0)
+            return self.output
+
+    evaluators = [
+        SlowEvaluator("first", 3, {"shared": "first", "first": 1}),
+        SlowEvaluator("second", 1, {"shared": "second", "second": 2}),
+        SlowEvaluator("third", 2, {"third": 3}),
+    ]
+
+    from graphrag_eval import evaluation
+    monkeypatch.setattr(
+        evaluation,
+        "parse_config_and_init_evaluators",
+        lambda _: (evaluators, None)
+    )
+
+    reference_data = [{
+        "template_id": "t1",
+        "questions": [{"id": "q1", "question_text": "Q?"}],
+    }]
+    actual_responses = {"q1": {"question_id": "q1", "actual_answer": "A"}}
+
+    evaluation_results = await asyncio.wait_for(
+        run_evaluation(reference_data, actual_responses), timeout=5.0
+    )
+
+    assert started == ["first", "second", "third"]
+    result = evaluation_results[0]
+    assert result["shared"] == "second"
+    assert (result["first"], result["second"], result["third"]) == (1, 2, 3)
+    assert list(result)[-4:] == ["shared", "first", "second", "third"]
+
+
+def _mock_slow_steps_evaluation(monkeypatch, delays: dict[str, float]):
+    async def mock_evaluate_steps(reference, actual, ragas_llm, *args):
+        await asyncio.sleep(delays[reference["id"]])
+        return {}
+
+    from graphrag_eval import evaluation
+    monkeypatch.setattr(evaluation, "evaluate_steps", mock_evaluate_steps)
+
+    reference_data = [{
+        "template_id": "t1",
+        "questions": [
+            {"id": question_id, "question_text": "Q?"}
+            for question_id in delays
+        ],
+    }]
+    actual_responses = {
+        question_id: {"question_id": question_id}
+        for question_id in delays
+    }
+    return reference_data, actual_responses
+
+
+@pytest.mark.asyncio
+async def test_iter_evaluation_yields_in_dataset_order(monkeypatch):
+    reference_data, actual_responses = _mock_slow_steps_evaluation(
+        monkeypatch, {"q1": 0.03, "q2": 0.01, "q3": 0.02}
+    )
+    question_ids = [
+        eval_result["question_id"]
+        async for eval_result in iter_evaluation(
+            reference_data, actual_responses, max_concurrency=3
+        )
+    ]
+    assert question_ids == ["q1", "q2", "q3"]
+
+
+@pytest.mark.asyncio
+async def test_iter_evaluation_yields_in_completion_order(monkeypatch):
+    reference_data, actual_responses = _mock_slow_steps_evaluation(
+        monkeypatch, {"q1": 0.03, "q2": 0.01, "q3": 0.02}
+    )
+    question_ids = [
+        eval_result["question_id"]
+        async for eval_result in iter_evaluation(
+            reference_data,
+            actual_responses,
+            max_concurrency=3,
+            preserve_order=False,
+        )
+    ]
+    assert question_ids == ["q2", "q3", "q1"]
+
+
+@pytest.mark.asyncio
+async def test_iter_evaluation_streams_results(monkeypatch):
+    reference_data, actual_responses = _mock_slow_steps_evaluation(
+        monkeypatch, {"q1": 0.0, "q2": 10.0}
+    )
+    results = iter_evaluation(reference_data, actual_responses)
+    first_result = await asyncio.wait_for(anext(results), timeout=1.0)
+    assert first_result["question_id"] == "q1"
+    await results.aclose()
+
+
+def _mock_blocking_steps_evaluation(monkeypatch, num_questions: int):
+    """The first question completes only after all the others have started"""
+    others_started = asyncio.Event()
+    started = []
+
+    async def mock_evaluate_steps(reference, actual, ragas_llm, *args):
+        started.append(reference["id"])
+        if len(started) == num_questions:
+            others_started.set()
+        if reference["id"] == "q0":
+            await others_started.wait()
+        return {}
+
+    from graphrag_eval import evaluation
+    monkeypatch.setattr(evaluation, "evaluate_steps", mock_evaluate_steps)
+
+    question_ids = [f"q{i}" for i in range(num_questions)]
+    reference_data = [{
+        "template_id": "t1",
+        "questions": [
+            {"id": question_id, "question_text": "Q?"}
+            for question_id in question_ids
+        ],
+    }]
+    actual_responses = {
+        question_id: {"question_id": question_id}
+        for question_id in question_ids
+    }
+    return reference_data, actual_responses, started
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_slow_question_does_not_block_others(
+    monkeypatch
+):
+    reference_data, actual_responses, started = \
+        _mock_blocking_steps_evaluation(monkeypatch, 10)
+    evaluation_results = await asyncio.wait_for(
+        run_evaluation(reference_data, actual_responses, max_concurrency=2),
+        timeout=5.0,
+    )
+    assert [r["question_id"] for r in evaluation_results] == [
+        f"q{i}" for i in range(10)
+    ]
+    assert len(started) == 10
+
+
+@pytest.mark.asyncio
+async def test_iter_evaluation_max_buffered_results(monkeypatch):
+    reference_data, actual_responses, started = \
+        _mock_blocking_steps_evaluation(monkeypatch, 10)
+    results = iter_evaluation(
+        reference_data,
+        actual_responses,
+        max_concurrency=2,
+        max_buffered_results=3,
+    )
+    # The first question waits for all others, which are not started while
+    # three results are waiting for it
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(anext(results), timeout=0.2)
+    assert started == ["q0", "q1", "q2", "q3"]
+    await results.aclose()
+
+
+class DelayedEvaluator:
+    def __init__(self, name: str, delay: float):
+        self.name = name
+        self.delay = delay
+
+    async def evaluate(self, reference, actual):
+        await asyncio.sleep(self.delay)
+        return {f"{self.name}_score": 1.0}
+
+
+def _mock_delayed_evaluators(monkeypatch, tmp_path, timeouts: dict):
+    evaluators = [
+        DelayedEvaluator("fast", 0.0),
+        DelayedEvaluator("slow", 10.0),
+        DelayedEvaluator("medium", 0.05),
+    ]
+    from graphrag_eval import evaluation
+    monkeypatch.setattr(
+        evaluation,
+        "parse_config_and_init_evaluators",
+        lambda _: (evaluators, None)
+    )
+    config_file_path = tmp_path / "config.yaml"
+    config_file_path.write_text(
+        yaml.safe_dump({"timeouts": timeouts}), encoding="utf-8"
+    )
+    reference_data = [{
+        "template_id": "t1",
+        "questions": [{"id": "q1", "question_text": "Q?"}],
+    }]
+    actual_responses = {"q1": {"question_id": "q1", "actual_answer": "A"}}
+    return reference_data, actual_responses, config_file_path
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_evaluator_timeouts(monkeypatch, tmp_path):
+    reference_data, actual_responses, config_file_path = \
+        _mock_delayed_evaluators(
+            monkeypatch,
+            tmp_path,
+            {"evaluator": 0.2, "evaluators": {"medium": 0.01}},
+        )
+    evaluation_results = await asyncio.wait_for(
+        run_evaluation(reference_data, actual_responses, config_file_path),
+        timeout=1.0,
+    )
+    result = evaluation_results[0]
+    assert result["fast_score"] == 1.0
+    assert result["slow_error"] == "timeout"
+    assert result["medium_error"] == "timeout"
+    assert "slow_score" not in result
+    assert "medium_score" not in result
+    assert "steps_error" not in result
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_question_timeout_keeps_partial_results(
+    monkeypatch,
+    tmp_path
+):
+    reference_data, actual_responses, config_file_path = \
+        _mock_delayed_evaluators(monkeypatch, tmp_path, {"question": 0.2})
+    evaluation_results = await asyncio.wait_for(
+        run_evaluation(reference_data, actual_responses, config_file_path),
+        timeout=1.0,
+    )
+    result = evaluation_results[0]
+    assert result["fast_score"] == 1.0
+    assert result["medium_score"] == 1.0
+    assert result["slow_error"] == "timeout"
+    assert result["status"] == "success"
+
+
+def test_timeout_config():
+    timeouts = TimeoutConfig(evaluator=30, evaluators={"answer_correctness": 5})
+    assert timeouts.question is None
+    assert timeouts.for_evaluator("answer_correctness") == 5
+    assert timeouts.for_evaluator("steps") == 30
+    assert TimeoutConfig().for_evaluator("steps") is None
+    with pytest.raises(ValueError):
+        TimeoutConfig(question=0)
+
+
+@pytest.mark.asyncio
+async def test_run_evaluation_scores_steps_in_process_pool(tmp_path):
+    config_file_path = tmp_path / "config.yaml"
+    config_file_path.write_text(
+        yaml.safe_dump({"steps": {"process_pool_workers": 2}}),
+        encoding="utf-8",
+    )
+    reference_data = yaml.safe_load(
+        (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+    )
+    actual_responses = read_responses(DATA_DIR / "actual_responses_1.jsonl")
+    evaluation_results = await run_evaluation(
+        reference_data,
+        actual_responses,
+        config_file_path,
+        max_concurrency=4,
+    )
+    expected_evaluation_results = yaml.safe_load(
+        (DATA_DIR / "evaluation_1.yaml").read_text(encoding="utf-8")
+    )
+    assert expected_evaluation_results == evaluation_results
@@ -0,0 +1,138 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from graphrag_eval.answer_correctness import AnswerCorrectnessEvaluator
+from graphrag_eval.evaluation import Config
+from graphrag_eval.llm_cache import (
+    SQLiteResponseCache,
+    cached_generate,
+    compute_cache_key,
+)
+from graphrag_eval.llm_factory import (
+    GenerationConfig,
+    LLMConfig,
+    ResponseCacheConfig,
+    create_response_cache,
+)
+from .util import FakeClock
+
+NAMESPACE = {"provider": "openai", "model": "gpt-4o-mini", "temperature": 0.0}
+
+
+def test_compute_cache_key():
+    key = compute_cache_key(NAMESPACE, "prompt")
+    assert key == compute_cache_key(dict(reversed(NAMESPACE.items())), "prompt")
+    assert key != compute_cache_key(NAMESPACE, "prompt ")
+    assert key != compute_cache_key({**NAMESPACE, "temperature": 0.5}, "prompt")
+    assert key != compute_cache_key({**NAMESPACE, "model": "gpt-4o"}, "prompt")
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SQLiteResponseCache(path, NAMESPACE)
+    assert cache.get("prompt") is None
+    cache.set("prompt", "response")
+    assert cache.get("prompt") == "response"
+    cache.close()
+
+    cache = SQLiteResponseCache(path, NAMESPACE)
+    assert cache.get("prompt") == "response"
+    other_model_cache = SQLiteResponseCache(
+        path, {**NAMESPACE, "model": "gpt-4o"}
+    )
+    assert other_model_cache.get("prompt") is None
+    assert cache.stats == {
+        "hits": 1, "misses": 0, "expirations": 0, "evictions": 0
+    }
+
+
+def test_cache_ttl(tmp_path):
+    clock = FakeClock(1000.0)
+    cache = SQLiteResponseCache(
+        tmp_path / "cache.sqlite", NAMESPACE, ttl_seconds=60, clock=clock
+    )
+    cache.set("prompt", "response")
+    clock.now += 60
+    assert cache.get("prompt") == "response"
+    clock.now += 1
+    assert cache.get("prompt") is None
+    assert cache.stats == {
+        "hits": 1, "misses": 1, "expirations": 1, "evictions": 0
+    }
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    clock = FakeClock(1000.0)
+    cache = SQLiteResponseCache(
+        tmp_path / "cache.sqlite", NAMESPACE, max_entries=2, clock=clock
+    )
+    cache.set("p1", "r1")
+    clock.now += 1
+    cache.set("p2", "r2")
+    clock.now += 1
+    assert cache.get("p1") == "r1"
+    clock.now += 1
+    cache.set("p3", "r3")
+    assert cache.get("p2") is None
+    assert cache.get("p1") == "r1"
+    assert cache.get("p3") == "r3"
+    assert cache.stats["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_generate(tmp_path):
+    calls = []
+
+    async def generate(prompt: str) -> str:
+        calls.append(prompt)
+        return prompt.upper()
+
+    assert await cached_generate(None, "a", generate) == "A"
+    cache = SQLiteResponseCache(tmp_path / "cache.sqlite", NAMESPACE)
+    assert await cached_generate(cache, "a", generate) == "A"
+    assert await cached_generate(cache, "a", generate) == "A"
+    assert calls == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_answer_correctness_evaluator_uses_cache(tmp_path, monkeypatch):
+    calls = []
+
+    async def mock_agenerate(self, prompt):
+        calls.append(prompt)
+        return "2\t2\t1\treason"
+
+    monkeypatch.setattr(AnswerCorrectnessEvaluator, "_agenerate", mock_agenerate)
+    cache = SQLiteResponseCache(tmp_path / "cache.sqlite", NAMESPACE)
+    evaluator = AnswerCorrectnessEvaluator(MagicMock(), response_cache=cache)
+    for _ in range(2):
+        result = await evaluator.evaluate(
+            {"question_text": "Q?", "reference_answer": "R"},
+            {"actual_answer": "A"},
+        )
+        assert result["answer_recall"] == 0.5
+    assert len(calls) == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_create_response_cache(tmp_path):
+    generation = GenerationConfig(provider="openai", model="gpt-4o-mini")
+    assert create_response_cache(None) is None
+    assert create_response_cache(LLMConfig(generation=generation)) is None
+    cache = create_response_cache(LLMConfig(
+        generation=generation,
+        cache=ResponseCacheConfig(
+            path=str(tmp_path / "cache.sqlite"), max_entries=10
+        ),
+    ))
+    assert cache.namespace == generation.model_dump(exclude={"rate_limit"})
+    assert cache.max_entries == 10
+    assert cache.ttl_seconds is None
+
+
+def test_config_fingerprint_ignores_cache(tmp_path):
+    llm = {"generation": {"provider": "openai", "model": "gpt-4o-mini"}}
+    cache = {"path": str(tmp_path / "cache.sqlite")}
+    assert Config(llm=llm).fingerprint() \
+        == Config(llm={**llm, "cache": cache}).fingerprint()
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from graphrag_eval.llm_factory import GenerationConfig
+from graphrag_eval.rate_limit import (
+    AdaptiveRateLimiter,
+    RateLimitConfig,
+    TokenBucket,
+    estimate_prompt_tokens,
+    is_overload_error,
+)
+from .util import FakeClock
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_rate_limit_config():
+    config = GenerationConfig(
+        provider="openai",
+        model="gpt-4o-mini",
+        rate_limit={"requests_per_minute": 60, "max_concurrency": 8},
+    )
+    assert config.rate_limit.requests_per_minute == 60
+    assert config.rate_limit.tokens_per_minute is None
+    with pytest.raises(ValueError):
+        RateLimitConfig(initial_concurrency=8, max_concurrency=4)
+    with pytest.raises(ValueError):
+        RateLimitConfig(requests_per_minute=0)
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    assert bucket.seconds_until_available(60) == 0.0
+    bucket.take(60)
+    assert bucket.seconds_until_available(1) == 1.0
+    clock.now = 0.5
+    assert bucket.seconds_until_available(1) == 0.5
+    clock.now = 1000.0
+    assert bucket.seconds_until_available(100) == 0.0
+    assert bucket.level == 60
+
+
+def test_estimate_prompt_tokens():
+    assert estimate_prompt_tokens({}) == 1
+    assert estimate_prompt_tokens({
+        "messages": [
+            {"role": "user", "content": "x" * 40},
+            {"role": "user", "content": [{"type": "text", "text": "x" * 40}]},
+        ]
+    }) == 21
+
+
+def test_is_overload_error():
+    assert is_overload_error(RateLimitError())
+    assert is_overload_error(asyncio.TimeoutError())
+    assert not is_overload_error(ValueError())
+
+
+def test_aimd():
+    limiter = AdaptiveRateLimiter(RateLimitConfig(
+        initial_concurrency=4, min_concurrency=1, max_concurrency=5
+    ))
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.concurrency == pytest.approx(4.92, abs=0.01)
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.concurrency == 5.0
+    limiter.on_overload()
+    assert limiter.concurrency == 2.5
+    limiter.on_overload()
+    limiter.on_overload()
+    assert limiter.concurrency == 1.0
+
+
+@pytest.mark.asyncio
+async def test_wrap_limits_concurrency_and_backs_off():
+    limiter = AdaptiveRateLimiter(RateLimitConfig(
+        initial_concurrency=2, max_concurrency=2
+    ))
+    in_flight = 0
+    max_in_flight = 0
+
+    async def completion(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if kwargs.get("fail"):
+            raise RateLimitError()
+        return "response"
+
+    limited_completion = limiter.wrap(completion)
+    results = await asyncio.gather(*(limited_completion() for _ in range(6)))
+    assert results == ["response"] * 6
+    assert max_in_flight == 2
+    assert limiter.in_flight == 0
+
+    with pytest.raises(RateLimitError):
+        await limited_completion(fail=True)
+    assert limiter.concurrency == 1.0
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_wrap_admits_waiters_under_the_raised_limit():
+    limiter = AdaptiveRateLimiter(RateLimitConfig(
+        initial_concurrency=1, max_concurrency=3
+    ))
+    in_flight = 0
+    max_in_flight = 0
+
+    async def completion(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        in_flight -= 1
+        return "response"
+
+    limited_completion = limiter.wrap(completion)
+    # The first success raises the limit to 2, so both waiting calls start
+    # when it completes
+    await asyncio.gather(*(limited_completion() for _ in range(3)))
+    assert max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_wrap_waits_for_request_bucket():
+    limiter = AdaptiveRateLimiter(RateLimitConfig(requests_per_minute=600))
+    limiter.request_bucket.level = 0.0
+
+    async def completion(**kwargs):
+        return "response"
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await limiter.wrap(completion)() == "response"
+    assert loop.time() - start >= 0.09
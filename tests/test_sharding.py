@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from graphrag_eval import merge_shard_results, run_evaluation
+from graphrag_eval.sharding import get_shard_index, validate_shard
+from .util import read_responses
+
+DATA_DIR = Path(__file__).parent / "test_data"
+
+
+def test_get_shard_index_is_stable():
+    # The same in every process and Python version, unlike hash()
+    assert get_shard_index("q1", 8) == 2
+    assert [get_shard_index(f"q{i}", 4) for i in range(8)] \
+        == [3, 2, 3, 3, 3, 1, 1, 3]
+    assert all(0 <= get_shard_index(f"q{i}", 3) < 3 for i in range(100))
+    assert get_shard_index("q1", 1) == 0
+
+
+def test_get_shard_index_of_integer_key():
+    # IDs read from YAML may be integers
+    assert get_shard_index(7, 4) == get_shard_index("7", 4)
+
+
+def test_validate_shard():
+    validate_shard(None, None)
+    validate_shard(0, 1)
+    validate_shard(7, 8)
+    for shard_index, shard_count in [(0, None), (None, 2), (2, 2), (-1, 2)]:
+        with pytest.raises(ValueError):
+            validate_shard(shard_index, shard_count)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shard_key", ["question_id", "template_id"])
+async def test_merged_shards_equal_unsharded_run(shard_key):
+    reference_data = yaml.safe_load(
+        (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+    )
+    actual_responses = read_responses(DATA_DIR / "actual_responses_1.jsonl")
+    unsharded_results = await run_evaluation(
+        yaml.safe_load(
+            (DATA_DIR / "reference_1.yaml").read_text(encoding="utf-8")
+        ),
+        actual_responses,
+    )
+
+    shard_count = 3
+    shard_results = [
+        await run_evaluation(
+            reference_data,
+            actual_responses,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            shard_key=shard_key,
+        )
+        for shard_index in range(shard_count)
+    ]
+    assert sum(len(r) for r in shard_results) == len(unsharded_results)
+    merged_results = merge_shard_results(
+        reference_data, reversed(shard_results)
+    )
+    assert json.dumps(merged_results) == json.dumps(unsharded_results)
+
+
+def test_merge_shard_results_errors():
+    qa_dataset = [{
+        "template_id": "t1",
+        "questions": [{"id": "q1"}, {"id": "q2"}],
+    }]
+    r1 = {"template_id": "t1", "question_id": "q1"}
+    r2 = {"template_id": "t1", "question_id": "q2"}
+    r3 = {"template_id": "t1", "question_id": "q3"}
+    assert merge_shard_results(qa_dataset, [[r2], [r1]]) == [r1, r2]
+    with pytest.raises(ValueError):
+        merge_shard_results(qa_dataset, [[r1]])
+    with pytest.raises(ValueError):
+        merge_shard_results(qa_dataset, [[r1, r2], [r2]])
+    with pytest.raises(ValueError):
+        merge_shard_results(qa_dataset, [[r1, r2, r3]])
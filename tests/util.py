@@ -1,6 +1,45 @@
-import jsonlines
+import json
 from pathlib import Path
 
+import jsonlines
+
+
 def read_responses(path: Path) -> dict:
     with jsonlines.open(path) as reader:
         return {obj["question_id"]: obj for obj in reader}
+
+
+def sparql_results(vars_: list[str], rows: list[tuple]) -> dict:
+    """SPARQL JSON results of plain literals, where None values are unbound"""
+    return {
+        "head": {"vars": vars_},
+        "results": {"bindings": [
+            {
+                var: {"type": "literal", "value": value}
+                for var, value in zip(vars_, row)
+                if value is not None
+            }
+            for row in rows
+        ]},
+    }
+
+
+def sparql_step(vars_: list[str], rows: list[tuple], **kwargs) -> dict:
+    """A SPARQL query step with all of its columns required"""
+    return {
+        "id": "step",
+        "name": "sparql_query",
+        "output": json.dumps(sparql_results(vars_, rows)),
+        "output_media_type": "application/sparql-results+json",
+        "required_columns": vars_,
+        "status": "success",
+        **kwargs,
+    }
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now